@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Client HTTP partagé pour l'API Sora2: pool de connexions, retries et timeouts
+
+requests n'est importé qu'à la création du premier client: les commandes qui ne
+lisent que la base des jobs (status, list) démarrent sans le charger.
+"""
+
+import os
+import random
+import threading
+import time
+import uuid
+
+# URL de l'API Sora2
+API_BASE_URL = "https://api.openai.com/v1/videos"
+
+# Taille du pool de connexions keep-alive
+POOL_SIZE = 32
+
+# Timeouts par endpoint: (connexion, lecture) en secondes
+TIMEOUTS = {
+    "submit": (10, 120),
+    "status": (10, 30),
+    "download": (10, 300),
+}
+
+# Politique de retry
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 1  # secondes
+MAX_BACKOFF = 60  # secondes
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Une soumission est facturée: on ne la rejoue que si l'API l'a explicitement refusée
+RETRYABLE_SUBMIT_STATUS = {429, 503}
+
+
+def parse_retry_after(value):
+    """Convertit un en-tête Retry-After (secondes ou date HTTP) en secondes"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class MultipartStream:
+    """
+    Corps multipart/form-data lu à la demande
+
+    Les champs texte sont encodés en mémoire, le fichier est lu par blocs depuis
+    le disque au moment de l'envoi: la mémoire utilisée ne dépend pas de sa taille.
+    seek(0) permet de renvoyer le même corps lors d'un retry.
+    """
+
+    def __init__(self, fields, file_field, file_path, filename, content_type):
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+
+        preamble = b""
+        for name, value in fields.items():
+            preamble += (f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'
+                         f'{value}\r\n').encode("utf-8")
+        safe_filename = filename.replace('"', "%22")
+        preamble += (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; '
+                     f'filename="{safe_filename}"\r\nContent-Type: {content_type}\r\n\r\n').encode("utf-8")
+        epilogue = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+        self._file = open(file_path, "rb")
+        self._file_size = os.fstat(self._file.fileno()).st_size
+        self._preamble = preamble
+        self._epilogue = epilogue
+        self._length = len(preamble) + self._file_size + len(epilogue)
+        self._position = 0
+
+    def __len__(self):
+        return self._length
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += self._length
+        self._position = max(0, min(offset, self._length))
+        return self._position
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            size = self._length - self._position
+        chunks = []
+        while size > 0 and self._position < self._length:
+            position = self._position
+            file_start = len(self._preamble)
+            file_end = file_start + self._file_size
+            if position < file_start:
+                chunk = self._preamble[position:position + size]
+            elif position < file_end:
+                self._file.seek(position - file_start)
+                chunk = self._file.read(min(size, file_end - position))
+            else:
+                chunk = self._epilogue[position - file_end:position - file_end + size]
+            if not chunk:
+                break
+            chunks.append(chunk)
+            self._position += len(chunk)
+            size -= len(chunk)
+        return b"".join(chunks)
+
+    def close(self):
+        self._file.close()
+
+
+def backoff_delay(attempt, base=BASE_BACKOFF, maximum=MAX_BACKOFF):
+    """Backoff exponentiel avec gigue complète"""
+    return random.uniform(0, min(maximum, base * (2 ** attempt)))
+
+
+class ApiClient:
+    """
+    Client unique utilisé pour la soumission, le polling et le téléchargement
+
+    Toutes les requêtes passent par une session keep-alive partagée. Les réponses
+    429/5xx et les erreurs de connexion sont retentées avec backoff et gigue en
+    respectant Retry-After. Après le dernier essai, la dernière réponse est
+    retournée telle quelle (ou la dernière exception relevée).
+
+    rate_limiter (optionnel, voir governor.RateLimiter) borne le débit de chaque
+    endpoint; un 429 suspend alors tout l'endpoint pendant le Retry-After.
+    """
+
+    def __init__(self, api_key, base_url=API_BASE_URL, pool_size=POOL_SIZE,
+                 max_attempts=MAX_ATTEMPTS, timeouts=None, rate_limiter=None):
+        self.base_url = base_url.rstrip("/")
+        self.max_attempts = max_attempts
+        self.timeouts = dict(TIMEOUTS, **(timeouts or {}))
+        self.rate_limiter = rate_limiter
+
+        import requests
+        from requests.adapters import HTTPAdapter
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {api_key}"
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "throttled": 0, "rate_wait": 0.0}
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def video_url(self, video_id=None, suffix=None):
+        """Construit l'URL d'une ressource vidéo"""
+        url = self.base_url
+        if video_id:
+            url += f"/{video_id}"
+        if suffix:
+            url += f"/{suffix}"
+        return url
+
+    def submit(self, data, upload=None, retry_status=RETRYABLE_SUBMIT_STATUS):
+        """
+        POST /videos
+
+        upload (optionnel) décrit un fichier à joindre sans le charger en mémoire:
+        {"field": ..., "path": ..., "filename": ..., "mime_type": ...}
+        """
+        if upload is None:
+            return self.request("submit", "POST", self.video_url(), data=data,
+                                retry_status=retry_status, retry_connection_errors=False)
+
+        body = MultipartStream(data, upload["field"], upload["path"], upload["filename"], upload["mime_type"])
+        try:
+            return self.request("submit", "POST", self.video_url(), data=body,
+                                headers={"Content-Type": body.content_type},
+                                retry_status=retry_status, retry_connection_errors=False)
+        finally:
+            body.close()
+
+    def get_status(self, video_id):
+        """GET /videos/{id}"""
+        return self.request("status", "GET", self.video_url(video_id))
+
+    def download(self, video_id, headers=None):
+        """GET /videos/{id}/content en streaming"""
+        return self.request("download", "GET", self.video_url(video_id, "content"),
+                            headers=headers, stream=True)
+
+    def request(self, endpoint, method, url, retry_status=RETRYABLE_STATUS,
+                retry_connection_errors=True, **kwargs):
+        """Exécute une requête avec la politique de retry et le timeout de l'endpoint"""
+        import requests
+        kwargs.setdefault("timeout", self.timeouts.get(endpoint))
+
+        body = kwargs.get("data")
+        for attempt in range(self.max_attempts):
+            last_attempt = attempt == self.max_attempts - 1
+            if hasattr(body, "seek"):
+                body.seek(0)  # un corps streamé doit être relu depuis le début à chaque essai
+            if self.rate_limiter:
+                self._count("rate_wait", self.rate_limiter.acquire(endpoint))
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                if last_attempt or not retry_connection_errors:
+                    raise
+                self._count("retries")
+                time.sleep(backoff_delay(attempt))
+                continue
+
+            response.retries = attempt  # nombre de fois où cette requête a été rejouée
+            if response.status_code not in retry_status or last_attempt:
+                return response
+
+            if response.status_code == 429:
+                self._count("throttled")
+            self._count("retries")
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = backoff_delay(attempt)
+            else:
+                delay += random.uniform(0, BASE_BACKOFF)
+            if response.status_code == 429 and self.rate_limiter:
+                self.rate_limiter.pause(endpoint, delay)
+            response.close()
+            time.sleep(delay)
+
+        return response
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Benchmark de bout en bout du client contre le faux serveur (mock_server.py)
+
+Chaque niveau lance N jobs simultanés dans un processus séparé (le vrai pipeline
+batch de generate.py) et mesure: jobs/min, requêtes de statut par job, débit de
+téléchargement et pic de mémoire (RSS) du client.
+
+Usage:
+    python benchmark.py                                  # niveaux 1, 10, 100, 1000
+    python benchmark.py --levels 1,10 --output bench.json
+    python benchmark.py --compare bench.json             # échoue si une mesure régresse
+"""
+
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mock_server import MockSoraServer
+
+DEFAULT_LEVELS = [1, 10, 100, 1000]
+
+# Mesures comparées avec --compare: True si une valeur plus grande est meilleure
+METRICS = {
+    "jobs_per_minute": True,
+    "status_requests_per_job": False,
+    "download_mb_per_s": True,
+    "peak_rss_mb": False,
+}
+DEFAULT_TOLERANCE = 0.2  # régression tolérée (20%)
+
+
+def run_level(jobs_count, result_path):
+    """Processus enfant: exécute `jobs_count` jobs simultanés et écrit ses mesures en JSON"""
+    import cli
+
+    jobs = [{
+        "line": index,
+        "key": index,
+        "label": f"[#{index}]",
+        "prompt": f"Benchmark job {index}",
+        "model": "sora-2",
+        "duration": "4",
+        "size": "1280x720",
+        "reference_image": None,
+        "fit": None,
+    } for index in range(1, jobs_count + 1)]
+
+    started = time.monotonic()
+    cli.run_jobs(jobs, concurrency=jobs_count, assume_yes=True, use_cache=False,
+                 title="Benchmark", budget=None)
+    wall_seconds = time.monotonic() - started
+
+    downloads = cli.job_store.find(status="downloaded")
+    throughputs = [job["download_throughput_bps"] for job in downloads if job.get("download_throughput_bps")]
+    result = {
+        "jobs": jobs_count,
+        "succeeded": len(downloads),
+        "wall_seconds": round(wall_seconds, 2),
+        "download_bytes": sum(job.get("file_size", 0) for job in downloads),
+        "download_mb_per_s": round(sum(throughputs) / len(throughputs) / 1e6, 2) if throughputs else 0.0,
+        # ru_maxrss est en Ko sous Linux
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def free_port():
+    """Port TCP local libre (pour l'écoute des webhooks du client)"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def benchmark_level(server, jobs_count, submit_rpm, verbose=False, webhook_port=None):
+    """Lance un niveau dans un processus enfant et combine ses mesures avec celles du serveur"""
+    with tempfile.TemporaryDirectory(prefix="sora-bench-") as workdir:
+        result_path = Path(workdir) / "result.json"
+        env = dict(os.environ,
+                   SORA_API_KEY="benchmark",
+                   SORA_API_BASE_URL=server.base_url,
+                   SORA_JOB_DB=str(Path(workdir) / "jobs.db"),
+                   SORA_CACHE="0",
+                   SORA_BUDGET="",
+                   SORA_SUBMIT_RPM=str(submit_rpm))
+        if webhook_port:
+            env.update(SORA_WEBHOOK_PORT=str(webhook_port), SORA_WEBHOOK_HOST="127.0.0.1")
+        before = server.stats()
+        command = [sys.executable, str(Path(__file__).resolve()), "--run-level", str(jobs_count),
+                   "--result", str(result_path)]
+        completed = subprocess.run(command, cwd=workdir, env=env,
+                                   stdout=None if verbose else subprocess.DEVNULL)
+        after = server.stats()
+
+        if completed.returncode != 0 or not result_path.exists():
+            raise RuntimeError(f"le niveau {jobs_count} a échoué (code {completed.returncode})")
+        with open(result_path, "r", encoding="utf-8") as f:
+            result = json.load(f)
+
+    requests_made = {key: after[key] - before[key] for key in ("submit", "status", "content", "throttled")}
+    result.update(
+        jobs_per_minute=round(result["succeeded"] / result["wall_seconds"] * 60, 1),
+        status_requests=requests_made["status"],
+        status_requests_per_job=round(requests_made["status"] / jobs_count, 2),
+        content_requests=requests_made["content"],
+        throttled=requests_made["throttled"],
+    )
+    return result
+
+
+def print_results(results):
+    print(f"\n{'jobs':>6} {'ok':>6} {'durée':>8} {'jobs/min':>9} {'statuts/job':>12} "
+          f"{'Mo/s':>8} {'RSS Mo':>8}")
+    for result in results:
+        print(f"{result['jobs']:>6} {result['succeeded']:>6} {result['wall_seconds']:>7.1f}s "
+              f"{result['jobs_per_minute']:>9.1f} {result['status_requests_per_job']:>12.2f} "
+              f"{result['download_mb_per_s']:>8.1f} {result['peak_rss_mb']:>8.1f}")
+
+
+def compare_results(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Liste des régressions par rapport à un fichier de résultats précédent"""
+    previous = {entry["jobs"]: entry for entry in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        reference = previous.get(result["jobs"])
+        if reference is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = reference.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(f"{result['jobs']} jobs: {metric} {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark du client Sora2 contre un faux serveur local")
+    parser.add_argument("--levels", default=",".join(str(level) for level in DEFAULT_LEVELS),
+                        help="Nombres de jobs simultanés, séparés par des virgules (défaut: 1,10,100,1000)")
+    parser.add_argument("--generation-time", type=float, default=30.0,
+                        help="Durée d'une génération simulée en secondes (défaut: 30)")
+    parser.add_argument("--payload-mb", type=float, default=4.0,
+                        help="Taille des vidéos servies en Mo (défaut: 4)")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Latence simulée de chaque requête en secondes (défaut: 0.05)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilité d'un 429 par requête")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Probabilité d'un 5xx par requête")
+    parser.add_argument("--submit-rpm", type=float, default=0,
+                        help="Limite de soumissions par minute du client (défaut: 0 = illimité)")
+    parser.add_argument("--webhooks", action="store_true",
+                        help="Le serveur envoie des webhooks de fin de génération (polling en secours)")
+    parser.add_argument("--output", "-o", help="Écrire les résultats dans ce fichier JSON")
+    parser.add_argument("--compare", help="Résultats de référence: échouer si une mesure régresse")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Régression tolérée avec --compare (défaut: {DEFAULT_TOLERANCE})")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Afficher la sortie des clients")
+    parser.add_argument("--run-level", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_level:
+        run_level(args.run_level, args.result)
+        return
+
+    levels = [int(level) for level in args.levels.split(",") if level.strip()]
+    webhook_port = free_port() if args.webhooks else None
+    server = MockSoraServer(latency=args.latency, latency_jitter=args.latency,
+                            generation_time=args.generation_time,
+                            payload_bytes=int(args.payload_mb * 1024 * 1024),
+                            rate_429=args.rate_429, rate_5xx=args.rate_5xx,
+                            webhook_url=f"http://127.0.0.1:{webhook_port}/webhook" if webhook_port else None)
+
+    print(f"🧪 Benchmark contre {server.base_url}")
+    print(f"   Génération: {args.generation_time}s, vidéo: {args.payload_mb} Mo, latence: {args.latency}s")
+    results = []
+    with server:
+        for level in levels:
+            print(f"▶️  {level} job(s) simultané(s)...")
+            try:
+                results.append(benchmark_level(server, level, args.submit_rpm, args.verbose, webhook_port))
+            except RuntimeError as e:
+                print(f"❌ {e}")
+                sys.exit(1)
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created": int(time.time()), "options": vars(args), "results": results}, f, indent=2)
+        print(f"\n💾 Résultats écrits dans {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} régression(s) au-delà de {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print("\n✅ Aucune régression par rapport à la référence")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1019 @@
+#!/usr/bin/env python3
+"""
+Interface en ligne de commande de la bibliothèque sora_client (lancée par generate.py)
+
+La configuration est lue dans l'environnement (.env), les confirmations et codes
+de sortie sont gérés ici. Les modules lourds (requests, asyncio, serveurs HTTP)
+ne sont chargés qu'au premier usage: status et list ne lisent que la base des jobs.
+"""
+
+import os
+import sys
+from dotenv import load_dotenv
+from pathlib import Path
+import time
+import json
+import argparse
+import atexit
+import itertools
+import threading
+
+from api_client import API_BASE_URL, POOL_SIZE
+from generation_cache import GenerationCache
+from job_store import JobStore, JOB_DB
+from output_store import OutputStore, format_size
+from reference_cache import ReferenceCache, REFERENCE_CACHE_MAX_BYTES
+from sweep import (SweepError, clean_prompt, render_template, load_sweep,
+                   estimate_cost, estimate_duration)
+from telemetry import EventLog, EVENTS_FILE, summarize, percentile, write_prometheus, serve_metrics
+from moderation import load_rules, MODERATION_RULES, SCREEN_MODES, DEFAULT_SCREEN_MODE, SIMILARITY_THRESHOLD
+from key_pool import load_api_keys, KeyPoolError
+from governor import RATE_LIMITS, PRIORITIES, DEFAULT_PRIORITY, parse_priority, priority_name
+from dashboard import Dashboard
+from watcher import DirectoryWatcher, HotFolder, WATCH_DIR, POLL_INTERVAL as WATCH_POLL_INTERVAL
+from sora_client import (SoraClient, VideoJob, BatchPipeline, SoraError, VALID_MODELS, VALID_DURATIONS,
+                         FIT_MODES, SUBMIT_WORKERS, IMAGE_MIME_TYPES)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+# Configuration
+API_KEY = os.getenv("SORA_API_KEY")
+# Plusieurs clés (comptes ou projets): fichier JSON décrit dans key_pool.load_api_keys
+API_KEYS_FILE = os.getenv("SORA_API_KEYS_FILE")
+# URL de l'API (un serveur local comme mock_server.py pour les tests de charge)
+API_BASE_URL = os.getenv("SORA_API_BASE_URL", API_BASE_URL)
+MODEL = os.getenv("SORA_MODEL", "sora-2-pro")
+DURATION = os.getenv("SORA_DURATION", "8")
+SIZE = os.getenv("SORA_SIZE", "1280x720")
+REFERENCE_IMAGE = os.getenv("SORA_REFERENCE_IMAGE")
+# Adaptation d'une image de taille différente: letterbox, crop ou none (refuser l'image)
+REFERENCE_FIT = os.getenv("SORA_REFERENCE_FIT", "letterbox")
+
+# Images de référence adaptées (LRU sur disque)
+reference_cache = ReferenceCache(max_bytes=int(os.getenv("SORA_REFERENCE_CACHE_MB", "0")) * 1024 * 1024
+                                 or REFERENCE_CACHE_MAX_BYTES)
+
+# Configuration du téléchargement
+PARALLEL_DOWNLOAD_SEGMENTS = int(os.getenv("SORA_DOWNLOAD_SEGMENTS", "4"))
+
+# Configuration du mode batch
+BATCH_CONCURRENCY = int(os.getenv("SORA_BATCH_CONCURRENCY", "4"))
+DOWNLOAD_WORKERS = int(os.getenv("SORA_DOWNLOAD_WORKERS", "4"))
+
+# Débit maximum par endpoint en requêtes/minute (0 = illimité), selon le palier du compte
+RATE_LIMITS = {endpoint: float(os.getenv(f"SORA_{endpoint.upper()}_RPM", str(rpm)))
+               for endpoint, rpm in RATE_LIMITS.items()}
+
+# Plafond de dépense par exécution en USD (vide = pas de plafond)
+BUDGET = float(os.getenv("SORA_BUDGET")) if os.getenv("SORA_BUDGET") else None
+
+# Base des jobs (métadonnées indexées)
+job_store = JobStore(os.getenv("SORA_JOB_DB", str(JOB_DB)))
+
+# Dossier des vidéos: quotas de taille (Go) et d'ancienneté (jours) sans utilisation, 0 = pas de limite,
+# et délai (heures) après lequel un .tmp abandonné est supprimé
+output_store = OutputStore(job_store,
+                           max_bytes=float(os.getenv("SORA_OUTPUT_MAX_GB", "0")) * 1024 ** 3 or None,
+                           max_age=float(os.getenv("SORA_OUTPUT_MAX_DAYS", "0")) * 86400 or None,
+                           temp_max_age=float(os.getenv("SORA_TEMP_MAX_HOURS", "24")) * 3600)
+
+# Webhooks de fin de génération: écoute locale activée par SORA_WEBHOOK_PORT
+WEBHOOK_PORT = int(os.getenv("SORA_WEBHOOK_PORT", "0")) or None
+WEBHOOK_HOST = os.getenv("SORA_WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_SECRET = os.getenv("SORA_WEBHOOK_SECRET")
+# Sans webhook reçu après ce délai (secondes), la vidéo est suivie par polling
+WEBHOOK_FALLBACK_DELAY = float(os.getenv("SORA_WEBHOOK_FALLBACK", "600"))
+
+# Journal des phases de chaque job (JSON lines) et export Prometheus optionnel
+event_log = EventLog(os.getenv("SORA_EVENTS_FILE", str(EVENTS_FILE)))
+METRICS_FILE = os.getenv("SORA_METRICS_FILE")
+
+# Cache des générations déjà téléchargées (SORA_CACHE=0 pour le désactiver)
+USE_CACHE = os.getenv("SORA_CACHE", "1") != "0"
+generation_cache = GenerationCache(job_store)
+
+# Pré-filtrage de modération avant soumission: hold (retenir), flag (signaler) ou off
+PRESCREEN = os.getenv("SORA_PRESCREEN", DEFAULT_SCREEN_MODE)
+MODERATION_RULES = os.getenv("SORA_MODERATION_RULES", str(MODERATION_RULES))
+SIMILARITY_THRESHOLD = float(os.getenv("SORA_PRESCREEN_THRESHOLD", str(SIMILARITY_THRESHOLD)))
+
+# Tableau de bord des jobs en cours pour les lots (SORA_DASHBOARD=1 ou --dashboard)
+DASHBOARD = os.getenv("SORA_DASHBOARD", "0") == "1"
+
+# Dossier surveillé par la commande watch et intervalle de relecture (secondes)
+WATCH_DIR = os.getenv("SORA_WATCH_DIR", str(WATCH_DIR))
+WATCH_POLL_INTERVAL = float(os.getenv("SORA_WATCH_INTERVAL", str(WATCH_POLL_INTERVAL)))
+
+# Statuts des jobs qu'on peut reprendre après un crash ou un timeout
+RESUMABLE_STATUSES = ("queued", "in_progress", "completed", "timeout", "error", "download_failed")
+
+def parse_prompt(text, variables=None):
+    """Prompt d'un fichier: titres markdown et lignes vides retirés, {{ variables }} remplacées (SweepError)"""
+    return render_template(clean_prompt(text), variables or {})
+
+def read_prompt(prompt_path="prompt.md", variables=None):
+    """Lit le prompt depuis le fichier prompt.md et remplace ses {{ variables }}"""
+    prompt_file = Path(prompt_path)
+    if not prompt_file.exists():
+        print(f"Erreur: Le fichier {prompt_path} n'existe pas")
+        sys.exit(1)
+
+    with open(prompt_file, "r", encoding="utf-8") as f:
+        text = f.read()
+
+    try:
+        return parse_prompt(text, variables)
+    except SweepError as e:
+        print(f"Erreur: {e}")
+        print("   Définissez-les avec --var nom=valeur")
+        sys.exit(1)
+
+def confirm_costs(message="Voulez-vous continuer avec la génération de vidéo ?"):
+    """Demande confirmation avant un appel API facturé"""
+    print("\n" + "="*50)
+    print("⚠️  ATTENTION: Cet appel va générer des coûts sur votre compte OpenAI")
+    print("="*50)
+
+    try:
+        confirmation = input(f"\n{message} (oui/non): ").lower().strip()
+    except EOFError:
+        print("\n❌ Pas de terminal pour confirmer: utilisez --yes (et --budget) pour un lancement non interactif")
+        return False
+    return confirmation in ['oui', 'o', 'yes', 'y']
+
+def configured_api_keys():
+    """Clés du pool (SORA_API_KEYS_FILE), ou None pour la clé unique SORA_API_KEY"""
+    if not API_KEYS_FILE:
+        return None
+    try:
+        return load_api_keys(API_KEYS_FILE, RATE_LIMITS)
+    except KeyPoolError as e:
+        print(f"Erreur: {e}")
+        sys.exit(1)
+
+def check_api_key():
+    """Vérifie que la clé API (ou le fichier de clés) est configurée"""
+    if API_KEYS_FILE:
+        configured_api_keys()
+        return
+    if not API_KEY or API_KEY == "your_api_key_here":
+        print("Erreur: Veuillez configurer votre clé API dans le fichier .env")
+        sys.exit(1)
+
+def create_sora_client(pool_size=POOL_SIZE, budget=None):
+    """Client de la bibliothèque configuré depuis l'environnement (.env)"""
+    return SoraClient(API_KEY, API_BASE_URL, model=MODEL, duration=DURATION, size=SIZE, fit=REFERENCE_FIT,
+                      budget=budget, rate_limits=RATE_LIMITS, pool_size=pool_size,
+                      download_segments=PARALLEL_DOWNLOAD_SEGMENTS, webhook_port=WEBHOOK_PORT,
+                      webhook_host=WEBHOOK_HOST, webhook_secret=WEBHOOK_SECRET,
+                      webhook_fallback_delay=WEBHOOK_FALLBACK_DELAY, job_store=job_store,
+                      generation_cache=generation_cache, reference_cache=reference_cache, output_store=output_store,
+                      event_log=event_log, prescreen=PRESCREEN, moderation_rules=load_rules(MODERATION_RULES),
+                      similarity_threshold=SIMILARITY_THRESHOLD, api_keys=configured_api_keys())
+
+
+def run_pipeline(pipeline, jobs):
+    """
+    Exécute les jobs d'un BatchPipeline; retourne {clé: succès}
+
+    Avec DASHBOARD, les messages du client sont remplacés par un tableau d'une
+    ligne par job actif, redessiné à fréquence fixe (ou par un résumé périodique
+    si la sortie n'est pas un terminal).
+    """
+    if not DASHBOARD:
+        return pipeline.run(jobs)
+
+    sora = pipeline.sora
+    dashboard = Dashboard()
+    log = sora.log
+    sora.log, sora.progress = dashboard.log, dashboard
+    try:
+        with dashboard:
+            return pipeline.run(jobs)
+    finally:
+        sora.log, sora.progress = log, None
+
+
+def generate_video(prompt, reference_image_path=None, model=None, duration=None, size=None, fit=None,
+                   confirm=True, use_cache=USE_CACHE, budget=BUDGET):
+    """Génère une vidéo en utilisant l'API Sora2"""
+    check_api_key()
+    job = VideoJob(prompt, model, duration, size, reference_image_path, fit, use_cache=use_cache)
+
+    with create_sora_client(budget=budget) as sora:
+        try:
+            sora.prepare(job)
+        except SoraError as e:
+            print(f"❌ Erreur: {e}")
+            return False
+
+        # Une vidéo identique déjà téléchargée est réutilisée sans appel API
+        if use_cache and sora.lookup_cached(job):
+            return True
+
+        # Un prompt proche d'un refus passé n'est pas soumis (sauf --prescreen flag)
+        if sora.screen(job) and job.status == "held":
+            print("   Reformulez le prompt, ou utilisez --prescreen flag pour le soumettre quand même")
+            return False
+
+        if reference_image_path:
+            print(f"🖼️  Image de référence: {reference_image_path}")
+            if not sora.load_reference(job):
+                print("❌ Impossible de charger l'image de référence, abandon...")
+                return False
+        else:
+            print("ℹ️  Aucune image de référence spécifiée")
+
+        print(f"Génération de la vidéo avec les paramètres:")
+        print(f"  - Model: {job.model}")
+        print(f"  - Duration: {job.duration}s")
+        print(f"  - Size: {job.size}")
+        if job.upload:
+            print(f"  - Image de référence: ✅")
+        else:
+            print(f"  - Image de référence: ❌")
+        print(f"  - Prompt: {prompt[:100]}...")
+
+        cost = estimate_cost([job.params])
+        print(f"  - Coût estimé: {cost:.2f} $")
+        if budget is not None and cost > budget:
+            print(f"❌ Le coût estimé dépasse le budget ({budget:.2f} $), génération annulée")
+            return False
+
+        # Demander confirmation avant l'appel API
+        if confirm and not confirm_costs():
+            print("❌ Génération annulée par l'utilisateur")
+            return None
+
+        if not sora.submit(job):
+            return False
+        return sora.wait(job) and sora.download(job)
+
+def read_manifest(manifest_path, priority=DEFAULT_PRIORITY):
+    """Lit un manifeste JSONL de jobs (un objet JSON par ligne)"""
+    manifest_file = Path(manifest_path)
+    if not manifest_file.exists():
+        print(f"Erreur: Le manifeste '{manifest_path}' n'existe pas")
+        sys.exit(1)
+
+    jobs = []
+    errors = []
+    with open(manifest_file, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append(f"ligne {line_number}: JSON invalide ({e})")
+                continue
+
+            if not isinstance(entry, dict) or not str(entry.get("prompt", "")).strip():
+                errors.append(f"ligne {line_number}: champ 'prompt' manquant")
+                continue
+
+            job = {
+                "line": line_number,
+                "key": line_number,
+                "label": f"[ligne {line_number}]",
+                "prompt": str(entry["prompt"]).strip(),
+                "model": entry.get("model") or MODEL,
+                "duration": str(entry.get("seconds") or DURATION),
+                "size": entry.get("size") or SIZE,
+                "reference_image": entry.get("reference_image"),
+                "fit": entry.get("fit"),
+            }
+
+            try:
+                job["priority"] = parse_priority(entry.get("priority"), priority)
+            except ValueError as e:
+                errors.append(f"ligne {line_number}: {e}")
+                continue
+
+            if job["model"] not in VALID_MODELS:
+                errors.append(f"ligne {line_number}: modèle '{job['model']}' non supporté")
+            elif job["duration"] not in VALID_DURATIONS:
+                errors.append(f"ligne {line_number}: durée '{job['duration']}' non supportée")
+            elif job["fit"] not in (None, "none") + FIT_MODES:
+                errors.append(f"ligne {line_number}: mode d'adaptation '{job['fit']}' non supporté")
+            else:
+                jobs.append(job)
+
+    if errors:
+        print(f"❌ Manifeste invalide ({len(errors)} erreur(s)):")
+        for error in errors:
+            print(f"   - {error}")
+        sys.exit(1)
+
+    return jobs
+
+def print_estimate(jobs, concurrency):
+    """Affiche le coût et la durée estimés d'une liste de jobs"""
+    total_seconds = sum(int(job["duration"]) for job in jobs)
+    cost = estimate_cost(jobs)
+    duration = estimate_duration(jobs, concurrency, job_store.average_generation_seconds())
+    print(f"📋 {len(jobs)} job(s) à générer ({total_seconds}s de vidéo au total)")
+    print(f"💰 Coût estimé: {cost:.2f} $")
+    print(f"⏱️  Durée estimée: ~{max(1, round(duration / 60))} min avec {concurrency} génération(s) simultanée(s)")
+
+def run_jobs(jobs, concurrency=BATCH_CONCURRENCY, assume_yes=False, use_cache=USE_CACHE, title="Batch",
+             budget=BUDGET):
+    """
+    Soumet et suit une liste de jobs (manifeste ou sweep) avec une concurrence bornée
+
+    assume_yes remplace la confirmation interactive; budget (USD) plafonne alors
+    la dépense: les jobs qui le dépasseraient ne sont pas soumis.
+    """
+    total_jobs = len(jobs)
+    jobs = [VideoJob(job["prompt"], job["model"], job["duration"], job["size"], job["reference_image"],
+                     job.get("fit"), priority=job.get("priority"), use_cache=use_cache,
+                     key=job["key"], label=job["label"])
+            for job in jobs]
+    concurrency = max(1, min(concurrency, len(jobs)))
+
+    # Un pool de connexions assez grand pour les soumissions, polls et téléchargements simultanés
+    with create_sora_client(pool_size=concurrency + DOWNLOAD_WORKERS + SUBMIT_WORKERS, budget=budget) as sora:
+        # Les jobs déjà générés avec les mêmes paramètres ne sont pas resoumis
+        for job in jobs:
+            sora.prepare(job)
+            if use_cache:
+                sora.lookup_cached(job)
+        cached = [job for job in jobs if job.status == "cached"]
+        if cached:
+            print(f"♻️  {len(cached)} job(s) déjà en cache, ils ne seront pas resoumis")
+        jobs = [job for job in jobs if job.status != "cached"]
+        if not jobs:
+            print("✅ Toutes les vidéos sont déjà générées")
+            return True
+
+        # Les prompts proches d'un refus de modération passé ne sont ni estimés ni soumis
+        held = [job for job in jobs if sora.screen(job) and job.status == "held"]
+        if held:
+            print(f"🛡️  {len(held)} job(s) retenu(s) par le pré-filtrage de modération "
+                  f"(--prescreen flag pour les soumettre quand même)")
+            jobs = [job for job in jobs if job.status != "held"]
+            if not jobs:
+                return False
+
+        concurrency = max(1, min(concurrency, len(jobs)))
+        print_estimate([job.params for job in jobs], concurrency)
+        by_priority = {}
+        for job in jobs:
+            name = priority_name(job.priority)
+            by_priority[name] = by_priority.get(name, 0) + 1
+        if len(by_priority) > 1:
+            print(f"🔢 Priorités: {', '.join(f'{count} {name}' for name, count in by_priority.items())}")
+        if budget is not None:
+            print(f"💸 Budget: {budget:.2f} $")
+            if estimate_cost([job.params for job in jobs]) > budget:
+                print("   ⚠️  L'estimation dépasse le budget: les jobs au-delà ne seront pas soumis")
+
+        if not assume_yes and not confirm_costs(f"Voulez-vous lancer les {len(jobs)} générations ?"):
+            print(f"❌ {title} annulé par l'utilisateur")
+            return None
+
+        pipeline = BatchPipeline(sora, concurrency, DOWNLOAD_WORKERS)
+        results = run_pipeline(pipeline, jobs)
+
+    succeeded = sum(1 for ok in results.values() if ok) + len(cached)
+    failed = [job.label for job in jobs if not results.get(job.key)] + [job.label for job in held]
+    print("\n" + "═" * 43)
+    print(f"📊 {title} terminé: {succeeded}/{total_jobs} vidéo(s) générée(s)")
+    if cached:
+        print(f"   Dont {len(cached)} réutilisée(s) depuis le cache")
+    print(f"   Dépense estimée engagée: {sora.budget.committed:.2f} $"
+          + (f" (budget: {budget:.2f} $)" if budget is not None else ""))
+    if pipeline.over_budget:
+        print(f"   Jobs non soumis (budget atteint): {len(pipeline.over_budget)}")
+    if held:
+        print(f"   Jobs retenus par le pré-filtrage de modération: {len(held)}")
+    print(f"   Requêtes de statut envoyées: {sora.poller.requests_sent}"
+          + (f" ({sora.listener.stats['received']} webhook(s) reçu(s))" if sora.listener else ""))
+    print(f"   Requêtes HTTP: {sora.api.stats['requests']} (dont {sora.api.stats['retries']} retries, "
+          f"{sora.api.stats['throttled']} limitées par l'API, {sora.api.stats['rate_wait']:.0f}s d'attente du limiteur)")
+    if sora.key_pool:
+        for name, usage in sora.key_pool.usage().items():
+            print(f"   🔑 {name}: {usage['submitted']} soumission(s), {usage['requests']} requête(s), "
+                  f"{usage['spilled']} renvoyée(s) sur une autre clé")
+    if failed:
+        print(f"   Jobs en échec: {', '.join(failed)}")
+    print("═" * 43)
+
+    return not failed
+
+def run_batch(manifest_path, concurrency=BATCH_CONCURRENCY, assume_yes=False, use_cache=USE_CACHE,
+              budget=BUDGET, priority=DEFAULT_PRIORITY):
+    """Soumet et suit tous les jobs d'un manifeste avec une concurrence bornée"""
+    check_api_key()
+    jobs = read_manifest(manifest_path, priority)
+    if not jobs:
+        print("ℹ️  Aucun job dans le manifeste")
+        return True
+
+    return run_jobs(jobs, concurrency, assume_yes, use_cache, title="Batch", budget=budget)
+
+def write_manifest(jobs, manifest_path):
+    """Écrit des jobs au format manifeste JSONL (réutilisable avec la commande batch)"""
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        for job in jobs:
+            entry = {
+                "prompt": job["prompt"],
+                "model": job["model"],
+                "seconds": int(job["duration"]),
+                "size": job["size"],
+            }
+            if job.get("reference_image"):
+                entry["reference_image"] = job["reference_image"]
+            if job.get("fit"):
+                entry["fit"] = job["fit"]
+            if job.get("priority") is not None:
+                entry["priority"] = priority_name(job["priority"])
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def run_sweep(sweep_path, concurrency=BATCH_CONCURRENCY, assume_yes=False, use_cache=USE_CACHE,
+              dry_run=False, export_path=None, budget=BUDGET, priority=None):
+    """
+    Expanse un sweep (prompts × modèles × durées × tailles × images) et génère toutes les variantes
+
+    Un sweep est un traitement de masse: ses jobs ont la priorité "bulk" sauf si
+    le fichier (clé "priority") ou `priority` en décide autrement.
+    """
+    try:
+        jobs = load_sweep(sweep_path, {"model": MODEL, "duration": DURATION, "size": SIZE})
+        for job in jobs:
+            job["priority"] = parse_priority(priority or job.get("priority"), "bulk")
+    except (OSError, SweepError, ValueError) as e:
+        print(f"❌ Sweep invalide: {e}")
+        return False
+
+    invalid = [job["label"] for job in jobs
+               if job["model"] not in VALID_MODELS or job["duration"] not in VALID_DURATIONS
+               or job.get("fit") not in (None, "none") + FIT_MODES]
+    if invalid:
+        print(f"❌ Modèle, durée ou mode d'adaptation (fit) non supporté pour: {', '.join(invalid)}")
+        return False
+
+    print(f"🧮 Sweep: {len(jobs)} variante(s)")
+    for job in jobs:
+        details = ", ".join(f"{name}={value}" for name, value in job["variables"].items())
+        reference = f", image={job['reference_image']}" if job["reference_image"] else ""
+        print(f"   {job['label']} {job['model']} {job['duration']}s {job['size']}{reference}"
+              + (f" ({details})" if details else ""))
+
+    if export_path:
+        write_manifest(jobs, export_path)
+        print(f"📝 Manifeste écrit: {export_path}")
+
+    if dry_run:
+        print_estimate(jobs, max(1, min(concurrency, len(jobs))))
+        return True
+
+    check_api_key()
+    return run_jobs(jobs, concurrency, assume_yes, use_cache, title="Sweep", budget=budget)
+
+def run_resume(video_ids=None, statuses=RESUMABLE_STATUSES):
+    """Reprend le suivi et le téléchargement des jobs interrompus enregistrés dans la base"""
+    check_api_key()
+    records = job_store.find(status=statuses)
+    if video_ids:
+        records = [record for record in records if record["video_id"] in video_ids]
+    if not records:
+        print("✅ Aucun job à reprendre")
+        return True
+
+    by_status = {}
+    for record in records:
+        by_status[record["status"]] = by_status.get(record["status"], 0) + 1
+    print(f"🔁 {len(records)} job(s) à reprendre: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(by_status.items())))
+
+    jobs = [VideoJob.from_record(record) for record in records]
+
+    # Les générations sont déjà payées: on les suit toutes en même temps, seuls les
+    # téléchargements sont bornés par DOWNLOAD_WORKERS
+    with create_sora_client(pool_size=POOL_SIZE + DOWNLOAD_WORKERS * PARALLEL_DOWNLOAD_SEGMENTS) as sora:
+        for job, record in zip(jobs, records):
+            sora.phases.resumed(job.video_id, job.params, record.get("created_at"))
+        results = run_pipeline(BatchPipeline(sora, concurrency=len(jobs), download_workers=DOWNLOAD_WORKERS),
+                               jobs)
+
+    recovered = sum(1 for ok in results.values() if ok)
+    failed = sorted(video_id for video_id, ok in results.items() if not ok)
+    print("\n" + "═" * 43)
+    print(f"📊 Reprise terminée: {recovered}/{len(jobs)} vidéo(s) récupérée(s)")
+    if failed:
+        print(f"   Toujours en échec: {', '.join(failed)}")
+    print("═" * 43)
+
+    return not failed
+
+def format_timestamp(timestamp):
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)) if timestamp else "?"
+
+def run_status(video_id, refresh=False, as_json=False):
+    """Affiche un job depuis la base des jobs; refresh interroge aussi l'API"""
+    record = job_store.get(video_id)
+    if record is None:
+        print(f"❌ Job inconnu: {video_id}")
+        return False
+
+    remote = None
+    if refresh:
+        check_api_key()
+        with create_sora_client(pool_size=1) as sora:
+            try:
+                remote = sora.fetch_status(video_id)
+            except Exception as e:
+                print(f"❌ Statut de {video_id} indisponible auprès de l'API: {e}")
+                return False
+        # Comme pendant le suivi, seuls les statuts intermédiaires sont enregistrés:
+        # une génération terminée est traitée par resume / download
+        status = remote.get("status")
+        if status != record["status"] and status in ("queued", "in_progress") \
+                and record["status"] in ("queued", "in_progress"):
+            job_store.record(video_id, status)
+            record = job_store.get(video_id)
+
+    if as_json:
+        print(json.dumps(dict(record, remote=remote) if remote else record, ensure_ascii=False))
+        return True
+
+    print(f"🎬 {video_id}: {record['status']}")
+    print(f"   Prompt: {record['prompt']}")
+    print(f"   Paramètres: {record['model']} {record['size']} {record['duration']}s"
+          + (f", clé {record['api_key']}" if record.get("api_key") else ""))
+    print(f"   Créé le: {format_timestamp(record['created_at'])}, "
+          f"mis à jour le: {format_timestamp(record['timestamp'])}")
+    if record.get("file_path"):
+        path = Path(record["file_path"])
+        print(f"   Fichier: {path} " + (f"({format_size(path.stat().st_size)})" if path.is_file() else "(introuvable)"))
+    if record.get("error"):
+        print(f"   Erreur: {record['error']}")
+    history = job_store.events(video_id)
+    if history:
+        print("   Historique: " + " → ".join(f"{status} ({time.strftime('%H:%M:%S', time.localtime(timestamp))})"
+                                           for status, _, timestamp in history))
+    if remote:
+        print(f"   API: {remote.get('status')} - Progression: {remote.get('progress', 0)}%")
+        if remote.get("status") == "completed" and record["status"] != "downloaded":
+            print(f"   💡 python generate.py download {video_id}")
+    return True
+
+def run_list(statuses=(), model=None, days=None, limit=None, as_json=False):
+    """Liste les jobs de la base, les plus récents en premier"""
+    since = time.time() - days * 86400 if days else None
+    records = job_store.find(status=list(statuses) or None, model=model, since=since, limit=limit)
+    for record in records:
+        if as_json:
+            print(json.dumps(record, ensure_ascii=False))
+            continue
+        prompt = " ".join(record["prompt"].split())
+        print(f"{record['video_id']:<32} {record['status']:<16} {format_timestamp(record['created_at'])}  "
+              f"{record['model']} {record['size']} {record['duration']}s  "
+              f"{prompt[:50] + '…' if len(prompt) > 50 else prompt}")
+    if not as_json:
+        print(f"({len(records)} job(s))")
+
+def run_download(video_id):
+    """Chemin de la vidéo d'un job; la télécharge (ou attend la fin de sa génération) si besoin"""
+    record = job_store.get(video_id)
+    if record is None:
+        print(f"❌ Job inconnu: {video_id}")
+        return False
+    path = Path(record.get("file_path") or "")
+    if record["status"] == "downloaded" and path.is_file():
+        output_store.touch(video_id)
+        print(path)
+        return True
+
+    # Les vidéos évincées ou supprimées restent téléchargeables tant que l'API les conserve
+    statuses = RESUMABLE_STATUSES + ("downloaded", "evicted", "missing")
+    if record["status"] not in statuses:
+        print(f"❌ {video_id}: statut {record['status']}, aucune vidéo à télécharger"
+              + (f" ({record['error']})" if record.get("error") else ""))
+        return False
+    if not run_resume([video_id], statuses=statuses):
+        return False
+    print(job_store.get(video_id)["file_path"])
+    return True
+
+def run_watch(directory=WATCH_DIR, concurrency=BATCH_CONCURRENCY, assume_yes=False, use_cache=USE_CACHE,
+              budget=BUDGET, priority=DEFAULT_PRIORITY, poll_interval=WATCH_POLL_INTERVAL):
+    """
+    Surveille un dossier et génère une vidéo par fichier de prompt déposé, jusqu'à Ctrl+C
+
+    Chaque prompt (et son image de référence du même nom) est lu avec les règles
+    de prompt.md, validé puis ajouté au pipeline sans autre confirmation; les
+    fichiers sont ensuite rangés dans done/ ou failed/.
+    """
+    check_api_key()
+    folder = HotFolder(directory, image_extensions=IMAGE_MIME_TYPES)
+    interrupted = folder.interrupted()
+    if interrupted:
+        print(f"⚠️  {len(interrupted)} fichier(s) dans {folder.processing_dir} (exécution interrompue):")
+        print("   reprenez leurs vidéos avec 'python generate.py resume' avant de les redéposer")
+
+    print(f"👀 Surveillance de {folder.directory}/ ({concurrency} génération(s) simultanée(s))")
+    print("   Prompts: *.md / *.txt, image de référence optionnelle du même nom")
+    if budget is not None:
+        print(f"💸 Budget: {budget:.2f} $ pour toute la durée de la surveillance")
+    if not assume_yes and not confirm_costs("Chaque fichier déposé sera soumis sans autre confirmation. Continuer ?"):
+        print("❌ Surveillance annulée par l'utilisateur")
+        return None
+
+    claimed = {}
+    counts = {"done": 0, "failed": 0}
+    keys = itertools.count(1)
+
+    def on_finish(job):
+        target = folder.finish(claimed.pop(job.key), job.ok, job.error or job.status)
+        counts["done" if job.ok else "failed"] += 1
+        sora.log(f"{'✅' if job.ok else '❌'} {job.label} → {target}")
+
+    def enqueue(prompt_file, image_file):
+        claim = folder.claim(prompt_file, image_file)
+        job = VideoJob("", MODEL, DURATION, SIZE, str(claim["image"]) if claim["image"] else None,
+                       REFERENCE_FIT, priority=parse_priority(priority), use_cache=use_cache, key=next(keys),
+                       label=f"[{claim['name']}]")
+        try:
+            with open(claim["prompt"], "r", encoding="utf-8") as f:
+                job.prompt = parse_prompt(f.read())
+            if not job.prompt:
+                raise SweepError("prompt vide")
+            sora.prepare(job)
+        except (OSError, UnicodeDecodeError, SweepError, SoraError) as e:
+            job.status, job.error = "failed", f"prompt invalide: {e}"
+
+        sora.log(f"📄 {job.label} Nouveau prompt{' avec image de référence' if job.reference_image else ''}")
+        if job.status == "pending":
+            if use_cache and sora.lookup_cached(job):
+                pass
+            elif job.reference_image and not sora.load_reference(job):
+                pass
+            else:
+                claimed[job.key] = claim
+                pipeline.add(job)
+                return
+        # Réglé sans soumission: vidéo en cache, prompt ou image invalide
+        sora.report_finished(job)
+        target = folder.finish(claim, job.ok, job.error)
+        counts["done" if job.ok else "failed"] += 1
+        sora.log(f"{'♻️ ' if job.ok else '❌'} {job.label} → {target}" + (f" ({job.error})" if job.error else ""))
+
+    with create_sora_client(pool_size=concurrency + DOWNLOAD_WORKERS + SUBMIT_WORKERS, budget=budget) as sora, \
+            DirectoryWatcher(folder.directory) as watcher:
+        print(f"   Détection des nouveaux fichiers: {watcher.backend} "
+              f"(relecture toutes les {poll_interval:.0f}s)")
+        pipeline = BatchPipeline(sora, concurrency, DOWNLOAD_WORKERS, keep_open=True, on_finish=on_finish)
+        runner = threading.Thread(target=run_pipeline, args=(pipeline, []), name="pipeline", daemon=True)
+        runner.start()
+        try:
+            while True:
+                for prompt_file, image_file in folder.ready():
+                    enqueue(prompt_file, image_file)
+                # Un fichier en cours de copie est relu dès qu'il a pu se stabiliser
+                watcher.wait(min(poll_interval, folder.settle) if folder.settling else poll_interval)
+        except KeyboardInterrupt:
+            print(f"\n⏹️  Arrêt de la surveillance: fin des {len(claimed)} job(s) en cours "
+                  "(Ctrl+C à nouveau pour quitter, puis 'python generate.py resume')")
+        pipeline.close()
+        runner.join()
+
+    print("\n" + "═" * 43)
+    print(f"📊 Surveillance terminée: {counts['done']} vidéo(s) générée(s), {counts['failed']} échec(s)")
+    print(f"   Dépense estimée engagée: {sora.budget.committed:.2f} $")
+    print("═" * 43)
+    return True
+
+def run_output(gc=False, pin=(), unpin=(), delete_orphans=False):
+    """Affiche l'occupation du dossier de sortie, épingle des vidéos ou le nettoie"""
+    for video_id in pin:
+        print(f"📌 {video_id} épinglée" if output_store.pin(video_id) else f"❌ {video_id}: job inconnu")
+    for video_id in unpin:
+        print(f"📍 {video_id} désépinglée" if output_store.pin(video_id, False) else f"❌ {video_id}: job inconnu")
+
+    if gc:
+        freed = output_store.collect_temp()
+        print(f"🧹 Fichiers temporaires abandonnés: {format_size(freed)} libéré(s)")
+        missing, orphans = output_store.reconcile()
+        if missing:
+            print(f"⚠️  {len(missing)} vidéo(s) supprimée(s) hors de l'outil, marquée(s) 'missing'")
+        if orphans:
+            if delete_orphans:
+                for path in orphans:
+                    path.unlink()
+                print(f"🗑️  {len(orphans)} fichier(s) sans job supprimé(s)")
+            else:
+                print(f"⚠️  {len(orphans)} fichier(s) .mp4 sans job (anciennes copies ?), --delete-orphans pour les supprimer")
+        print(f"🔗 Doublons remplacés par des liens: {format_size(output_store.dedupe())} libéré(s)")
+        evicted = output_store.enforce()
+        if evicted:
+            print(f"🗑️  {len(evicted)} vidéo(s) évincée(s) par les quotas")
+
+    usage = output_store.usage()
+    print(f"📁 {output_store.output_dir}: {usage['videos']} vidéo(s) dans {usage['files']} fichier(s), "
+          f"{format_size(usage['bytes'])} ({usage['linked_videos']} partagée(s) par lien, "
+          f"{usage['pinned']} épinglée(s))")
+    quotas = []
+    if output_store.max_bytes:
+        quotas.append(f"{format_size(output_store.max_bytes)} maximum")
+    if output_store.max_age:
+        quotas.append(f"{output_store.max_age / 86400:g} jour(s) sans utilisation")
+    print(f"   Quotas: {', '.join(quotas) if quotas else 'aucun (SORA_OUTPUT_MAX_GB, SORA_OUTPUT_MAX_DAYS)'}")
+
+def run_stats(days=None):
+    """Affiche p50/p95 de chaque phase par modèle et taille, depuis le journal des événements"""
+    since = time.time() - days * 86400 if days else None
+    groups = summarize(event_log.read(since))
+    if not groups:
+        print(f"ℹ️  Aucun événement dans {event_log.path}")
+        return
+
+    for (model, size), group in sorted(groups.items()):
+        print(f"\n🎞️  {model} {size}: {group['jobs']} soumission(s), {group['failed']} échec(s), "
+              f"{group['moderation']} refus de modération, {group['retries']} retry(s)")
+        for column, values in group["values"].items():
+            if values:
+                print(f"   {column:<16} p50 {percentile(values, 0.5):>9.2f}   "
+                      f"p95 {percentile(values, 0.95):>9.2f}   (n={len(values)})")
+
+    # Répartition par clé API (pool de clés): jobs et dépense estimée des vidéos générées
+    by_key = {}
+    for api_key, model, size, duration, status, count in job_store.usage_by_key(since):
+        usage = by_key.setdefault(api_key, {"jobs": 0, "failed": 0, "cost": 0.0})
+        usage["jobs"] += count
+        if status in ("failed", "rejected"):
+            usage["failed"] += count
+        elif model and size and duration:
+            usage["cost"] += estimate_cost([{"model": model, "size": size, "duration": duration}]) * count
+    if by_key:
+        print("\n🔑 Par clé API:")
+        for api_key, usage in sorted(by_key.items()):
+            print(f"   {api_key:<16} {usage['jobs']} job(s), {usage['failed']} échec(s), "
+                  f"~{usage['cost']:.2f} $")
+
+def build_parser():
+    """
+    Parseur de la ligne de commande
+
+    Les options répétées sur les sous-commandes (--yes, --budget, --no-cache,
+    --webhook-port, --dashboard) ont la valeur par défaut SUPPRESS: placées avant
+    ou après la sous-commande, elles donnent le même résultat (sinon la valeur par
+    défaut du sous-parseur écraserait l'option globale).
+    """
+    parser = argparse.ArgumentParser(description="Générateur de vidéo Sora2 avec support d'image de référence optionnelle")
+    parser.add_argument("--reference-image", "-r",
+                       help="Chemin ou URL de l'image de référence à utiliser")
+    parser.add_argument("--no-cache", action="store_true",
+                       help="Régénérer même si une vidéo identique existe déjà")
+    parser.add_argument("--var", action="append", default=[], metavar="NOM=VALEUR",
+                       help="Valeur d'une variable {{ NOM }} de prompt.md (répétable)")
+    parser.add_argument("--yes", "-y", action="store_true",
+                       help="Ne pas demander de confirmation (utiliser --budget pour plafonner la dépense)")
+    parser.add_argument("--budget", type=float, default=BUDGET, metavar="USD",
+                       help="Refuser toute génération dont le coût estimé dépasse ce montant")
+    parser.add_argument("--webhook-port", type=int, default=WEBHOOK_PORT, metavar="PORT",
+                       help="Écouter les webhooks de fin de génération sur ce port (polling en secours)")
+    parser.add_argument("--prescreen", choices=SCREEN_MODES, default=PRESCREEN,
+                       help="Prompts proches d'un refus de modération passé: hold (ne pas soumettre), "
+                            f"flag (signaler seulement) ou off (défaut: {PRESCREEN})")
+    parser.add_argument("--dashboard", action="store_true", default=DASHBOARD,
+                       help="Tableau de bord des jobs en cours pour batch, sweep, resume et watch "
+                            "(résumé périodique si la sortie n'est pas un terminal)")
+    parser.add_argument("--fit", choices=("none",) + FIT_MODES,
+                       help=f"Adaptation d'une image de référence de taille différente (défaut: {REFERENCE_FIT})")
+
+    subparsers = parser.add_subparsers(dest="command")
+    batch_parser = subparsers.add_parser("batch", help="Génère toutes les vidéos d'un manifeste JSONL")
+    batch_parser.add_argument("manifest", help="Fichier JSONL (un job par ligne)")
+    batch_parser.add_argument("--concurrency", "-c", type=int, default=BATCH_CONCURRENCY,
+                              help=f"Nombre maximum de générations simultanées (défaut: {BATCH_CONCURRENCY})")
+    batch_parser.add_argument("--yes", "-y", action="store_true", default=argparse.SUPPRESS,
+                              help="Ne pas demander de confirmation avant de lancer le batch")
+    batch_parser.add_argument("--no-cache", action="store_true", default=argparse.SUPPRESS,
+                              help="Régénérer même si une vidéo identique existe déjà")
+    batch_parser.add_argument("--budget", type=float, default=argparse.SUPPRESS, metavar="USD",
+                              help="Dépense maximum: les jobs au-delà ne sont pas soumis")
+    batch_parser.add_argument("--webhook-port", type=int, default=argparse.SUPPRESS, metavar="PORT",
+                              help="Écouter les webhooks de fin de génération sur ce port (polling en secours)")
+    batch_parser.add_argument("--dashboard", action="store_true", default=argparse.SUPPRESS,
+                              help="Tableau de bord des jobs en cours")
+    batch_parser.add_argument("--priority", choices=list(PRIORITIES), default=DEFAULT_PRIORITY,
+                              help=f"Priorité des lignes qui n'en précisent pas (défaut: {DEFAULT_PRIORITY})")
+
+    sweep_parser = subparsers.add_parser("sweep", help="Génère toutes les combinaisons d'un sweep JSON")
+    sweep_parser.add_argument("spec", help="Fichier JSON (prompts, variables, models, seconds, sizes, reference_images)")
+    sweep_parser.add_argument("--concurrency", "-c", type=int, default=BATCH_CONCURRENCY,
+                              help=f"Nombre maximum de générations simultanées (défaut: {BATCH_CONCURRENCY})")
+    sweep_parser.add_argument("--yes", "-y", action="store_true", default=argparse.SUPPRESS,
+                              help="Ne pas demander de confirmation avant de lancer le sweep")
+    sweep_parser.add_argument("--no-cache", action="store_true", default=argparse.SUPPRESS,
+                              help="Régénérer même si une vidéo identique existe déjà")
+    sweep_parser.add_argument("--budget", type=float, default=argparse.SUPPRESS, metavar="USD",
+                              help="Dépense maximum: les jobs au-delà ne sont pas soumis")
+    sweep_parser.add_argument("--webhook-port", type=int, default=argparse.SUPPRESS, metavar="PORT",
+                              help="Écouter les webhooks de fin de génération sur ce port (polling en secours)")
+    sweep_parser.add_argument("--dashboard", action="store_true", default=argparse.SUPPRESS,
+                              help="Tableau de bord des jobs en cours")
+    sweep_parser.add_argument("--priority", choices=list(PRIORITIES),
+                              help="Priorité des variantes (défaut: celle du fichier, sinon bulk)")
+    sweep_parser.add_argument("--dry-run", action="store_true",
+                              help="Afficher les variantes et l'estimation sans rien soumettre")
+    sweep_parser.add_argument("--export", metavar="MANIFESTE",
+                              help="Écrire les variantes dans un manifeste JSONL")
+
+    resume_parser = subparsers.add_parser("resume", help="Reprend les jobs interrompus (crash, timeout, échec de téléchargement)")
+    resume_parser.add_argument("video_ids", nargs="*",
+                               help="Limiter la reprise à ces video IDs (défaut: tous les jobs repris)")
+    resume_parser.add_argument("--webhook-port", type=int, default=argparse.SUPPRESS, metavar="PORT",
+                               help="Écouter les webhooks de fin de génération sur ce port (polling en secours)")
+    resume_parser.add_argument("--dashboard", action="store_true", default=argparse.SUPPRESS,
+                               help="Tableau de bord des jobs en cours")
+
+    watch_parser = subparsers.add_parser("watch", help="Surveille un dossier et génère les prompts qui y sont déposés")
+    watch_parser.add_argument("directory", nargs="?", default=WATCH_DIR,
+                              help=f"Dossier surveillé (défaut: {WATCH_DIR})")
+    watch_parser.add_argument("--concurrency", "-c", type=int, default=BATCH_CONCURRENCY,
+                              help=f"Nombre maximum de générations simultanées (défaut: {BATCH_CONCURRENCY})")
+    watch_parser.add_argument("--yes", "-y", action="store_true", default=argparse.SUPPRESS,
+                              help="Ne pas demander de confirmation au démarrage")
+    watch_parser.add_argument("--no-cache", action="store_true", default=argparse.SUPPRESS,
+                              help="Régénérer même si une vidéo identique existe déjà")
+    watch_parser.add_argument("--budget", type=float, default=argparse.SUPPRESS, metavar="USD",
+                              help="Plafond de dépense pour toute la durée de la surveillance")
+    watch_parser.add_argument("--webhook-port", type=int, default=argparse.SUPPRESS, metavar="PORT",
+                              help="Écouter les webhooks de fin de génération sur ce port (polling en secours)")
+    watch_parser.add_argument("--dashboard", action="store_true", default=argparse.SUPPRESS,
+                              help="Tableau de bord des jobs en cours")
+    watch_parser.add_argument("--priority", choices=list(PRIORITIES), default=DEFAULT_PRIORITY,
+                              help=f"Priorité des jobs déposés (défaut: {DEFAULT_PRIORITY})")
+    watch_parser.add_argument("--interval", type=float, default=WATCH_POLL_INTERVAL, metavar="SECONDES",
+                              help=f"Relecture du dossier en secours d'inotify (défaut: {WATCH_POLL_INTERVAL:.0f}s)")
+
+    metadata_parser = subparsers.add_parser("metadata", help="Importe ou exporte les métadonnées au format JSON")
+    metadata_parser.add_argument("action", choices=["import", "export"],
+                                 help="import: metadata/*.json -> base des jobs, export: base -> JSON")
+    metadata_parser.add_argument("directory", nargs="?", default="metadata",
+                                 help="Répertoire des fichiers JSON (défaut: metadata/)")
+    metadata_parser.add_argument("--status", help="N'exporter que les jobs dans ce statut")
+
+    output_parser = subparsers.add_parser("output", help="Occupation, quotas et nettoyage du dossier des vidéos")
+    output_parser.add_argument("--gc", action="store_true",
+                               help="Supprimer les .tmp abandonnés, vérifier la base, lier les doublons, appliquer les quotas")
+    output_parser.add_argument("--delete-orphans", action="store_true",
+                               help="Avec --gc: supprimer les .mp4 qu'aucun job ne référence")
+    output_parser.add_argument("--pin", action="append", default=[], metavar="VIDEO_ID",
+                               help="Ne jamais évincer cette vidéo")
+    output_parser.add_argument("--unpin", action="append", default=[], metavar="VIDEO_ID",
+                               help="Retirer l'épingle d'une vidéo")
+
+    status_parser = subparsers.add_parser("status", help="Affiche un job depuis la base des jobs")
+    status_parser.add_argument("video_id")
+    status_parser.add_argument("--refresh", action="store_true",
+                               help="Interroger aussi l'API (sinon aucune requête réseau)")
+    status_parser.add_argument("--json", action="store_true", help="Sortie JSON")
+
+    list_parser = subparsers.add_parser("list", help="Liste les jobs de la base (les plus récents en premier)")
+    list_parser.add_argument("--status", action="append", default=[], metavar="STATUT",
+                             help="Ne lister que ce(s) statut(s): failed, timeout,downloaded... (répétable)")
+    list_parser.add_argument("--model", help="Ne lister que ce modèle")
+    list_parser.add_argument("--days", type=float, help="Ne lister que les N derniers jours")
+    list_parser.add_argument("--limit", type=int, default=50, help="Nombre maximum de jobs (0 = tous, défaut: 50)")
+    list_parser.add_argument("--json", action="store_true", help="Un objet JSON par ligne")
+
+    download_parser = subparsers.add_parser("download", help="Affiche le chemin de la vidéo d'un job, "
+                                                                "après l'avoir téléchargée si besoin")
+    download_parser.add_argument("video_id")
+
+    cache_parser = subparsers.add_parser("cache", help="Affiche ou nettoie le cache des générations")
+    cache_parser.add_argument("--prune", action="store_true",
+                              help="Évincer les entrées dont la vidéo a été supprimée")
+
+    stats_parser = subparsers.add_parser("stats", help="Durées par phase (p50/p95) par modèle et taille")
+    stats_parser.add_argument("--days", type=float, help="Ne considérer que les N derniers jours")
+    stats_parser.add_argument("--prometheus", metavar="FICHIER",
+                              help="Écrire les métriques au format texte Prometheus dans ce fichier")
+    stats_parser.add_argument("--serve", type=int, metavar="PORT",
+                              help="Servir les métriques Prometheus sur http://127.0.0.1:PORT/metrics")
+    return parser
+
+def main():
+    global WEBHOOK_PORT, PRESCREEN, DASHBOARD
+    parser = build_parser()
+    args = parser.parse_args()
+
+    WEBHOOK_PORT = args.webhook_port
+    PRESCREEN = args.prescreen
+    DASHBOARD = args.dashboard
+
+    # Commandes de consultation: sortie compacte (sans bannière) pour les scripts
+    if args.command == "status":
+        if not run_status(args.video_id, args.refresh, args.json):
+            sys.exit(1)
+        return
+
+    if args.command == "list":
+        statuses = [status.strip() for value in args.status for status in value.split(",") if status.strip()]
+        run_list(statuses, args.model, args.days, args.limit or None, args.json)
+        return
+
+    if args.command == "download":
+        if not run_download(args.video_id):
+            sys.exit(1)
+        return
+
+    # Fichier de métriques Prometheus réécrit à la fin de chaque exécution
+    if METRICS_FILE:
+        atexit.register(write_prometheus, event_log, METRICS_FILE)
+
+    print("═══════════════════════════════════════════")
+    print("   🎬 Générateur de vidéo Sora2")
+    print("═══════════════════════════════════════════\n")
+
+    use_cache = USE_CACHE and not args.no_cache
+
+    if args.command == "batch":
+        if not run_batch(args.manifest, args.concurrency, args.yes, use_cache, args.budget, args.priority):
+            sys.exit(1)
+        return
+
+    if args.command == "sweep":
+        if not run_sweep(args.spec, args.concurrency, args.yes, use_cache, args.dry_run, args.export,
+                         args.budget, args.priority):
+            sys.exit(1)
+        return
+
+    if args.command == "resume":
+        if not run_resume(args.video_ids):
+            sys.exit(1)
+        return
+
+    if args.command == "watch":
+        if not run_watch(args.directory, max(1, args.concurrency), args.yes, use_cache, args.budget,
+                         args.priority, args.interval):
+            sys.exit(1)
+        return
+
+    if args.command == "metadata":
+        if args.action == "import":
+            count = job_store.import_json(args.directory)
+            print(f"📥 {count} fichier(s) de métadonnées importé(s) dans {job_store.db_path}")
+        else:
+            count = job_store.export_json(args.directory, status=args.status)
+            print(f"📤 {count} job(s) exporté(s) dans {args.directory}/")
+        return
+
+    if args.command == "stats":
+        run_stats(args.days)
+        if args.prometheus:
+            write_prometheus(event_log, args.prometheus)
+            print(f"\n📈 Métriques Prometheus écrites dans {args.prometheus}")
+        if args.serve:
+            server = serve_metrics(event_log, args.serve)
+            print(f"\n📈 Métriques Prometheus sur http://127.0.0.1:{args.serve}/metrics (Ctrl+C pour arrêter)")
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+        return
+
+    if args.command == "output":
+        run_output(args.gc, args.pin, args.unpin, args.delete_orphans)
+        return
+
+    if args.command == "cache":
+        if args.prune:
+            print(f"🧹 {generation_cache.prune()} entrée(s) évincée(s)")
+        print(f"♻️  {len(generation_cache)} vidéo(s) en cache ({job_store.db_path})")
+        return
+
+    # Lire le prompt
+    variables = {}
+    for assignment in args.var:
+        name, separator, value = assignment.partition("=")
+        if not separator:
+            parser.error(f"--var attend NOM=VALEUR, reçu: {assignment}")
+        variables[name.strip()] = value
+    prompt = read_prompt(variables=variables)
+
+    # Générer la vidéo
+    success = generate_video(prompt, args.reference_image or REFERENCE_IMAGE, fit=args.fit,
+                             confirm=not args.yes, use_cache=use_cache, budget=args.budget)
+
+    if success:
+        print("\n" + "═" * 43)
+        print("✅ Génération terminée avec succès!")
+        print("═" * 43)
+    else:
+        print("\n" + "═" * 43)
+        print("❌ La génération a échoué")
+        print("═" * 43)
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
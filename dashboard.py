@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Tableau de bord des jobs en cours: une ligne par job, redessinée à fréquence fixe
+
+Les mises à jour (statut, progression, octets téléchargés) ne font que modifier
+un état en mémoire; seul le thread d'affichage écrit sur le terminal, au plus
+REFRESH_INTERVAL fois par seconde. Hors terminal (redirection vers un fichier,
+CI), le tableau est remplacé par une ligne de résumé périodique.
+"""
+
+import shutil
+import sys
+import threading
+import time
+
+REFRESH_INTERVAL = 0.25  # secondes entre deux rafraîchissements du tableau
+SUMMARY_INTERVAL = 10.0  # secondes entre deux lignes de résumé hors terminal
+
+# Messages conservés sous le tableau (erreurs, refus, budget)
+MESSAGE_MARKERS = ("❌", "⚠️", "💸", "🛡️", "⏰")
+MAX_MESSAGES = 5
+
+STATE_ICONS = {
+    "pending": "⏸️ ", "submitting": "📤", "queued": "⏳", "in_progress": "🎬",
+    "completed": "✅", "downloading": "📥", "downloaded": "✅", "cached": "♻️ ",
+}
+
+# États sans ligne dans le tableau (les jobs en attente sont seulement comptés)
+HIDDEN_STATES = ("pending",)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+class Dashboard:
+    """
+    Suivi de nombreux jobs simultanés, compatible avec SoraClient(progress=..., log=...)
+
+    update(job, state, **champs) enregistre l'état d'un job (progress en %,
+    downloaded / total en octets), finish(job) le retire du tableau pour ne plus
+    que le compter selon son statut final; log() remplace print pour les messages
+    du client: seuls les messages importants sont gardés sous le tableau.
+    """
+
+    def __init__(self, stream=None, tty=None, refresh_interval=REFRESH_INTERVAL,
+                 summary_interval=SUMMARY_INTERVAL):
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty() if tty is None else tty
+        self.interval = refresh_interval if self.tty else summary_interval
+        self.started_at = time.monotonic()
+        self.jobs = {}
+        self.done = {}
+        self.messages = []
+        self._drawn_lines = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="dashboard", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête le rafraîchissement et affiche l'état final"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        self._draw()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def update(self, job, state, **fields):
+        now = time.monotonic()
+        with self._lock:
+            row = self.jobs.get(job.key)
+            if row is None:
+                if job.key in self.done:
+                    return
+                row = self.jobs[job.key] = {"label": job.label, "started": now, "progress": None}
+            if row.get("state") in HIDDEN_STATES and state not in HIDDEN_STATES:
+                row["started"] = now  # la durée affichée commence à la sortie de la file
+            if state == "downloading" and row.get("state") != "downloading":
+                row["download_started"] = now
+            row["state"] = state
+            row.update(fields)
+
+    def finish(self, job):
+        with self._lock:
+            self.jobs.pop(job.key, None)
+            self.done[job.key] = job.status
+
+    def log(self, *args, end="\n", flush=False, **kwargs):
+        message = " ".join(str(arg) for arg in args).strip()
+        if not message or not any(marker in message for marker in MESSAGE_MARKERS):
+            return
+        with self._lock:
+            if not self.tty:
+                self.stream.write(message + "\n")
+                self.stream.flush()
+                return
+            self.messages = (self.messages + [message.splitlines()[0]])[-MAX_MESSAGES:]
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._draw()
+
+    def _draw(self):
+        with self._lock:
+            if self.tty:
+                self._draw_table()
+            else:
+                self.stream.write(self.summary() + "\n")
+            self.stream.flush()
+
+    def summary(self):
+        """Une ligne: nombre de jobs par état, débit total des téléchargements"""
+        by_state = {}
+        speed = 0.0
+        now = time.monotonic()
+        for row in self.jobs.values():
+            by_state[row["state"]] = by_state.get(row["state"], 0) + 1
+            speed += self._speed(row, now)
+        for state in self.done.values():
+            by_state[state] = by_state.get(state, 0) + 1
+        counts = ", ".join(f"{count} {state}" for state, count in sorted(by_state.items()))
+        line = f"⏱️  {format_duration(now - self.started_at)} | {counts or 'aucun job'}"
+        if speed:
+            line += f" | 📥 {speed / 1e6:.1f} MB/s"
+        return line
+
+    @staticmethod
+    def _speed(row, now):
+        if row.get("state") != "downloading" or not row.get("downloaded"):
+            return 0.0
+        elapsed = now - row["download_started"]
+        return row["downloaded"] / elapsed if elapsed > 0 else 0.0
+
+    def _row(self, row, now, width):
+        state = row.get("state", "pending")
+        progress = row.get("progress")
+        if state == "downloading" and row.get("total"):
+            progress = row.get("downloaded", 0) * 100 / row["total"]
+        bar = ""
+        if progress is not None:
+            filled = int(progress / 10)
+            bar = f"{'█' * filled}{'░' * (10 - filled)} {progress:5.1f}%"
+        speed = self._speed(row, now)
+        line = (f"{STATE_ICONS.get(state, '  ')} {row['label'][:18]:<18} {state:<12} {bar:<17} "
+                f"{format_duration(now - row['started']):>6}"
+                + (f"  {speed / 1e6:6.1f} MB/s" if speed else ""))
+        return line[:width]
+
+    def _draw_table(self):
+        now = time.monotonic()
+        columns, rows = shutil.get_terminal_size((100, 30))
+        lines = [self.summary()[:columns]]
+        active = sorted((row for row in self.jobs.values() if row["state"] not in HIDDEN_STATES),
+                        key=lambda row: row["started"])
+        visible = max(1, rows - len(self.messages) - 3)
+        lines += [self._row(row, now, columns) for row in active[:visible]]
+        if len(active) > visible:
+            lines.append(f"   ... et {len(active) - visible} autre(s) job(s)")
+        lines += [message[:columns] for message in self.messages]
+
+        # Remonter au début du tableau précédent et l'effacer avant de redessiner
+        if self._drawn_lines:
+            self.stream.write(f"\x1b[{self._drawn_lines}F\x1b[J")
+        self.stream.write("\n".join(lines) + "\n")
+        self._drawn_lines = len(lines)
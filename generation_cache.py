@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Cache des générations: évite de payer deux fois la même vidéo
+"""
+
+import hashlib
+import json
+from pathlib import Path
+
+
+def file_sha256(path):
+    """SHA256 du contenu d'un fichier"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def generation_key(prompt, model, duration, size, reference_image_sha256=None):
+    """
+    Clé canonique d'une génération
+
+    Le prompt est normalisé (espaces) et l'image de référence est identifiée par
+    le hash de son contenu, pas par son chemin.
+    """
+    canonical = json.dumps({
+        "prompt": " ".join(prompt.split()),
+        "model": model,
+        "seconds": str(duration),
+        "size": size,
+        "reference_image_sha256": reference_image_sha256,
+    }, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """
+    Index clé de génération -> vidéo téléchargée, lu dans la base des jobs
+
+    Le job "downloaded" enregistré avec sa clé (colonne indexée cache_key) et les
+    informations du fichier est l'entrée du cache: rien n'est écrit en plus au
+    téléchargement. Un job dont le fichier vidéo a disparu (ou changé de taille)
+    passe au statut "missing" à la lecture; prune() les traite tous d'un coup.
+    """
+
+    def __init__(self, job_store):
+        self.job_store = job_store
+
+    @staticmethod
+    def _entry(record):
+        return {
+            "video_id": record["video_id"],
+            "file_path": record.get("file_path"),
+            "file_size": record.get("file_size"),
+            "sha256": record.get("sha256"),
+            "created": record.get("created_at"),
+        }
+
+    @staticmethod
+    def _is_valid(entry):
+        path = Path(entry.get("file_path") or "")
+        return path.is_file() and path.stat().st_size == entry.get("file_size")
+
+    def _evict(self, entry):
+        self.job_store.record(entry["video_id"], "missing",
+                              error=f"fichier introuvable ou modifié: {entry['file_path']}")
+
+    def lookup(self, key):
+        """Retourne l'entrée du cache si la vidéo existe encore sur disque"""
+        for record in self.job_store.find(status="downloaded", cache_key=key):
+            entry = self._entry(record)
+            if self._is_valid(entry):
+                return entry
+            self._evict(entry)
+        return None
+
+    def __len__(self):
+        return len({record["cache_key"] for record in self.job_store.find(status="downloaded")
+                    if record.get("cache_key")})
+
+    def prune(self):
+        """Évince toutes les entrées dont le fichier vidéo a été supprimé"""
+        stale = [self._entry(record) for record in self.job_store.find(status="downloaded")
+                 if record.get("cache_key")]
+        stale = [entry for entry in stale if not self._is_valid(entry)]
+        for entry in stale:
+            self._evict(entry)
+        return len(stale)
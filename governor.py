@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Régulation des appels à l'API: débit par endpoint, budget de dépense et priorités
+"""
+
+import threading
+import time
+
+# Requêtes par minute autorisées par endpoint (0 = illimité). À ajuster selon le palier
+# du compte OpenAI: c'est la création de vidéos qui est limitée le plus strictement.
+RATE_LIMITS = {"submit": 25, "status": 0, "download": 0}
+
+# Priorités des jobs: la plus petite valeur passe en premier
+PRIORITIES = {"urgent": 0, "normal": 10, "bulk": 20}
+DEFAULT_PRIORITY = "normal"
+
+
+def parse_priority(value, default=DEFAULT_PRIORITY):
+    """Convertit une priorité (nom ou entier) en entier; None prend la valeur par défaut"""
+    if value is None or value == "":
+        value = default
+    if isinstance(value, str) and value in PRIORITIES:
+        return PRIORITIES[value]
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"priorité '{value}' inconnue ({', '.join(PRIORITIES)} ou un entier)")
+
+
+def priority_name(priority):
+    """Nom d'une priorité pour l'affichage"""
+    for name, value in PRIORITIES.items():
+        if value == priority:
+            return name
+    return str(priority)
+
+
+class TokenBucket:
+    """
+    Seau à jetons: `rate_per_minute` jetons par minute, au plus `burst` d'avance
+
+    acquire() bloque jusqu'à ce qu'un jeton soit disponible. pause() vide le seau
+    pour une durée donnée (Retry-After d'une réponse 429): tous les threads
+    attendent alors ensemble au lieu de relancer chacun leur requête.
+    """
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst if burst is not None else max(1.0, rate_per_minute))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self._updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+    def acquire(self):
+        """Prend un jeton et retourne le temps passé à attendre (secondes)"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return waited
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def wait_time(self):
+        """Secondes avant qu'un jeton soit disponible (sans le prendre)"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def pause(self, seconds):
+        """Aucun jeton n'est distribué pendant `seconds` secondes"""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self.tokens = min(1.0, self.capacity)  # une seule requête repart à la fin de la pause
+            self._updated = max(self._updated, self._paused_until)
+
+
+class RateLimiter:
+    """Un seau à jetons par endpoint; un endpoint sans limite n'attend jamais"""
+
+    def __init__(self, limits=None):
+        limits = RATE_LIMITS if limits is None else limits
+        self.buckets = {endpoint: TokenBucket(rpm) for endpoint, rpm in limits.items() if rpm and rpm > 0}
+
+    def acquire(self, endpoint):
+        bucket = self.buckets.get(endpoint)
+        return bucket.acquire() if bucket else 0.0
+
+    def wait_time(self, endpoint):
+        bucket = self.buckets.get(endpoint)
+        return bucket.wait_time() if bucket else 0.0
+
+    def pause(self, endpoint, seconds):
+        bucket = self.buckets.get(endpoint)
+        if bucket:
+            bucket.pause(seconds)
+
+
+class SpendBudget:
+    """
+    Plafond de dépense (USD) pour une exécution
+
+    Le coût estimé d'un job est réservé avant sa soumission et rendu si la
+    génération échoue; un job dont la réservation dépasserait le plafond n'est
+    pas soumis. Sans plafond (limit=None), tout est accepté mais compté.
+    """
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.committed = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self, amount):
+        with self._lock:
+            if self.limit is not None and self.committed + amount > self.limit + 1e-9:
+                return False
+            self.committed += amount
+            return True
+
+    def release(self, amount):
+        with self._lock:
+            self.committed = max(0.0, self.committed - amount)
+
+    @property
+    def remaining(self):
+        with self._lock:
+            return None if self.limit is None else max(0.0, self.limit - self.committed)
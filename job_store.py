@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Stockage indexé des jobs de génération (SQLite en mode WAL)
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+JOB_DB = Path("metadata") / "jobs.db"
+
+# Colonnes indexées; tout le reste (fichier, hash, stats de téléchargement...) va dans `data`
+JOB_COLUMNS = ("video_id", "prompt", "prompt_hash", "model", "duration", "size",
+               "reference_image", "status", "error", "cache_key", "created_at", "timestamp")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    video_id TEXT PRIMARY KEY,
+    prompt TEXT,
+    prompt_hash TEXT,
+    model TEXT,
+    duration TEXT,
+    size TEXT,
+    reference_image TEXT,
+    status TEXT,
+    error TEXT,
+    cache_key TEXT,
+    created_at INTEGER,
+    timestamp INTEGER,
+    data TEXT NOT NULL DEFAULT '{}'
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_model ON jobs (model, size);
+CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at);
+CREATE INDEX IF NOT EXISTS jobs_prompt_hash ON jobs (prompt_hash);
+CREATE INDEX IF NOT EXISTS jobs_cache_key ON jobs (cache_key);
+CREATE INDEX IF NOT EXISTS jobs_sha256 ON jobs (json_extract(data, '$.sha256'));
+
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    video_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT,
+    timestamp REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_video_id ON events (video_id);
+
+CREATE TABLE IF NOT EXISTS rejections (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    prompt TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    model TEXT,
+    size TEXT,
+    error TEXT,
+    timestamp REAL NOT NULL
+);
+"""
+
+
+def prompt_hash(prompt):
+    """Hash d'un prompt normalisé (espaces) pour regrouper les variantes identiques"""
+    return hashlib.sha256(" ".join((prompt or "").split()).encode("utf-8")).hexdigest()
+
+
+class JobStore:
+    """
+    Base des jobs: une ligne par vidéo et un journal des transitions de statut
+
+    Un changement de statut est un INSERT dans `events` plus un UPDATE de la
+    ligne du job. Les recherches par statut, modèle, date ou hash de prompt
+    passent par des index.
+    """
+
+    def __init__(self, db_path=JOB_DB):
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def record(self, video_id, status, error=None, extra=None, **fields):
+        """Enregistre une transition de statut (et crée le job au premier appel)"""
+        now = time.time()
+        fields = {key: value for key, value in fields.items() if key in JOB_COLUMNS and value is not None}
+        if "prompt" in fields:
+            fields["prompt_hash"] = prompt_hash(fields["prompt"])
+
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO events (video_id, status, error, timestamp) VALUES (?, ?, ?, ?)",
+                    (video_id, status, error, now))
+
+                row = connection.execute("SELECT data FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+                if row is None:
+                    connection.execute(
+                        "INSERT INTO jobs (video_id, created_at) VALUES (?, ?)", (video_id, int(now)))
+                    data = {}
+                else:
+                    data = json.loads(row["data"])
+
+                fields.update(status=status, error=error, timestamp=int(now))
+                assignments = ", ".join(f"{column} = ?" for column in fields)
+                values = list(fields.values())
+                if extra:
+                    data.update(extra)
+                    assignments += ", data = ?"
+                    values.append(json.dumps(data, ensure_ascii=False))
+                connection.execute(f"UPDATE jobs SET {assignments} WHERE video_id = ?",
+                                   (*values, video_id))
+
+    def update(self, video_id, **extra):
+        """Ajoute des champs libres à un job sans changer son statut"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                row = connection.execute("SELECT data FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+                if row is None:
+                    return False
+                data = json.loads(row["data"])
+                data.update(extra)
+                connection.execute("UPDATE jobs SET data = ? WHERE video_id = ?",
+                                   (json.dumps(data, ensure_ascii=False), video_id))
+                return True
+
+    @staticmethod
+    def _to_metadata(row):
+        """Convertit une ligne au format des anciens fichiers metadata/<id>.json"""
+        metadata = {
+            "video_id": row["video_id"],
+            "prompt": row["prompt"],
+            "model": row["model"],
+            "duration": row["duration"],
+            "size": row["size"],
+            "status": row["status"],
+            "timestamp": row["timestamp"],
+            "error": row["error"],
+        }
+        if row["reference_image"]:
+            metadata["reference_image"] = row["reference_image"]
+        if row["cache_key"]:
+            metadata["cache_key"] = row["cache_key"]
+        metadata["created_at"] = row["created_at"]
+        metadata.update(json.loads(row["data"]))
+        return metadata
+
+    def get(self, video_id):
+        """Métadonnées d'un job, ou None"""
+        with self._lock:
+            row = self._connect().execute("SELECT * FROM jobs WHERE video_id = ?", (video_id,)).fetchone()
+        return self._to_metadata(row) if row else None
+
+    def find(self, status=None, model=None, size=None, since=None, until=None,
+             prompt=None, cache_key=None, limit=None):
+        """Recherche indexée des jobs; status peut être une valeur ou une liste"""
+        clauses, values = [], []
+        if status:
+            statuses = [status] if isinstance(status, str) else list(status)
+            clauses.append(f"status IN ({', '.join('?' * len(statuses))})")
+            values.extend(statuses)
+        if model:
+            clauses.append("model = ?")
+            values.append(model)
+        if size:
+            clauses.append("size = ?")
+            values.append(size)
+        if since is not None:
+            clauses.append("created_at >= ?")
+            values.append(int(since))
+        if until is not None:
+            clauses.append("created_at < ?")
+            values.append(int(until))
+        if prompt is not None:
+            clauses.append("prompt_hash = ?")
+            values.append(prompt_hash(prompt))
+        if cache_key is not None:
+            clauses.append("cache_key = ?")
+            values.append(cache_key)
+
+        query = "SELECT * FROM jobs"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY created_at DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self._connect().execute(query, values).fetchall()
+        return [self._to_metadata(row) for row in rows]
+
+    def find_by_sha256(self, sha256, status="downloaded"):
+        """Jobs dont la vidéo a ce SHA256 (index sur data.sha256)"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT * FROM jobs WHERE json_extract(data, '$.sha256') = ? AND status = ? "
+                "ORDER BY created_at", (sha256, status)).fetchall()
+        return [self._to_metadata(row) for row in rows]
+
+    def usage_by_key(self, since=None):
+        """Jobs par clé API (pool de clés), modèle, taille, durée et statut [(clé, modèle, taille, durée, statut, nombre)]"""
+        query = """
+            SELECT json_extract(data, '$.api_key') AS api_key, model, size, duration, status, COUNT(*)
+            FROM jobs WHERE json_extract(data, '$.api_key') IS NOT NULL
+        """
+        values = []
+        if since is not None:
+            query += " AND created_at >= ?"
+            values.append(int(since))
+        query += " GROUP BY api_key, model, size, duration, status ORDER BY api_key"
+        with self._lock:
+            rows = self._connect().execute(query, values).fetchall()
+        return [tuple(row) for row in rows]
+
+    def events(self, video_id):
+        """Historique des statuts d'un job [(statut, erreur, timestamp)]"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT status, error, timestamp FROM events WHERE video_id = ? ORDER BY id",
+                (video_id,)).fetchall()
+        return [tuple(row) for row in rows]
+
+    def record_rejection(self, prompt, error=None, model=None, size=None):
+        """Enregistre un prompt refusé à la soumission (aucun video_id n'a été créé)"""
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "INSERT INTO rejections (prompt, prompt_hash, model, size, error, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (prompt, prompt_hash(prompt), model, size, error, time.time()))
+
+    def rejected_prompts(self):
+        """Prompts refusés à la soumission et prompts des jobs en échec, avec leur erreur [(prompt, erreur)]"""
+        query = """
+            SELECT prompt, error FROM rejections
+            UNION ALL
+            SELECT prompt, error FROM jobs WHERE status = 'failed' AND prompt IS NOT NULL AND error IS NOT NULL
+        """
+        with self._lock:
+            rows = self._connect().execute(query).fetchall()
+        return [tuple(row) for row in rows]
+
+    def average_generation_seconds(self):
+        """Temps moyen entre 'queued' et 'completed' par (modèle, taille, durée)"""
+        query = """
+            SELECT jobs.model, jobs.size, jobs.duration, AVG(done.at - queued.at)
+            FROM jobs
+            JOIN (SELECT video_id, MIN(timestamp) AS at FROM events
+                  WHERE status = 'queued' GROUP BY video_id) AS queued USING (video_id)
+            JOIN (SELECT video_id, MIN(timestamp) AS at FROM events
+                  WHERE status = 'completed' GROUP BY video_id) AS done USING (video_id)
+            GROUP BY jobs.model, jobs.size, jobs.duration
+        """
+        with self._lock:
+            rows = self._connect().execute(query).fetchall()
+        return {(model, size, duration): seconds for model, size, duration, seconds in rows}
+
+    def import_json(self, metadata_dir="metadata"):
+        """Importe les anciens fichiers metadata/<id>.json (les jobs déjà présents sont ignorés)"""
+        imported = 0
+        for metadata_file in sorted(Path(metadata_dir).glob("*.json")):
+            try:
+                with open(metadata_file, "r", encoding="utf-8") as f:
+                    metadata = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️  Fichier ignoré {metadata_file}: {e}")
+                continue
+            video_id = metadata.get("video_id")
+            if not video_id or self.get(video_id) is not None:
+                continue
+
+            metadata = dict(metadata)
+            fields = {column: metadata.pop(column, None) for column in JOB_COLUMNS}
+            fields["reference_image"] = fields["reference_image"] or metadata.pop("reference_image", None)
+            status = fields.pop("status") or "unknown"
+            error = fields.pop("error")
+            timestamp = fields.pop("timestamp") or int(metadata_file.stat().st_mtime)
+            fields.pop("video_id")
+            fields.pop("prompt_hash")
+            self.record(video_id, status, error=error, extra=metadata or None, **fields)
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute(
+                        "UPDATE jobs SET timestamp = ?, created_at = COALESCE(?, created_at) WHERE video_id = ?",
+                        (timestamp, fields.get("created_at") or timestamp, video_id))
+                    connection.execute(
+                        "UPDATE events SET timestamp = ? WHERE video_id = ?", (timestamp, video_id))
+            imported += 1
+        return imported
+
+    def export_json(self, output_dir="metadata", **filters):
+        """Exporte les jobs au format metadata/<id>.json"""
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        jobs = self.find(**filters)
+        for metadata in jobs:
+            with open(output_dir / f"{metadata['video_id']}.json", "w", encoding="utf-8") as f:
+                json.dump(metadata, f, indent=2, ensure_ascii=False)
+        return len(jobs)
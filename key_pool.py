@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Répartition des jobs sur plusieurs clés API (comptes ou projets OpenAI)
+
+Chaque clé a sa propre session HTTP, ses propres limites de débit et, si elle
+est précisée, sa propre limite de générations simultanées. Une soumission part
+sur la clé disponible le plus tôt; si elle répond 429, la clé est suspendue
+pendant le Retry-After et la soumission passe immédiatement sur une autre.
+Une vidéo n'est visible que depuis le projet qui l'a créée: son suivi et son
+téléchargement passent toujours par la clé qui l'a soumise.
+"""
+
+import json
+import os
+import threading
+import time
+
+from api_client import ApiClient, API_BASE_URL, POOL_SIZE, MAX_ATTEMPTS, BASE_BACKOFF, MAX_BACKOFF, parse_retry_after
+from governor import RateLimiter, RATE_LIMITS
+
+# Une soumission refusée par une clé en 429 est aussitôt tentée sur une autre clé
+SPILLOVER_STATUS = 429
+# Statuts rejoués sur la même clé (la requête n'a pas été acceptée)
+SAME_KEY_RETRY_STATUS = {503}
+
+
+class KeyPoolError(Exception):
+    """Configuration des clés invalide"""
+
+
+def load_api_keys(path, default_limits=None):
+    """
+    Lit la configuration des clés: une liste JSON d'objets
+
+        [{"name": "principal", "key_env": "SORA_API_KEY", "submit_rpm": 25, "concurrency": 10},
+         {"name": "projet-b", "key": "sk-...", "submit_rpm": 10}]
+
+    "key_env" désigne la variable d'environnement qui contient la clé (pour ne pas
+    écrire les secrets dans le fichier). "<endpoint>_rpm" remplace la limite de
+    débit par défaut de l'endpoint pour cette clé; "concurrency" borne le nombre
+    de générations en cours sur la clé.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise KeyPoolError(f"fichier de clés illisible {path}: {e}")
+    if not isinstance(entries, list) or not entries:
+        raise KeyPoolError(f"{path}: une liste non vide de clés est attendue")
+
+    keys = []
+    for index, entry in enumerate(entries, start=1):
+        if not isinstance(entry, dict):
+            raise KeyPoolError(f"{path}: l'entrée {index} doit être un objet JSON")
+        name = str(entry.get("name") or f"cle-{index}")
+        secret = entry.get("key") or (os.environ.get(entry["key_env"]) if entry.get("key_env") else None)
+        if not secret:
+            raise KeyPoolError(f"clé '{name}': ni 'key' ni variable '{entry.get('key_env')}' définie")
+        if name in (key["name"] for key in keys):
+            raise KeyPoolError(f"clé '{name}' définie deux fois")
+        limits = dict(RATE_LIMITS if default_limits is None else default_limits)
+        for endpoint in limits:
+            if f"{endpoint}_rpm" in entry:
+                try:
+                    limits[endpoint] = float(entry[f"{endpoint}_rpm"])
+                except (TypeError, ValueError):
+                    raise KeyPoolError(f"clé '{name}': '{endpoint}_rpm' doit être un nombre")
+        concurrency = None
+        if entry.get("concurrency") is not None:
+            try:
+                concurrency = int(entry["concurrency"])
+            except (TypeError, ValueError):
+                raise KeyPoolError(f"clé '{name}': 'concurrency' doit être un entier")
+            if concurrency < 1:
+                raise KeyPoolError(f"clé '{name}': 'concurrency' doit être supérieur à 0")
+        keys.append({"name": name, "key": secret, "rate_limits": limits, "concurrency": concurrency})
+    return keys
+
+
+class PoolKey:
+    """Une clé du pool: son client HTTP, sa limite de générations simultanées et son usage"""
+
+    def __init__(self, name, client, concurrency=None):
+        self.name = name
+        self.client = client
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.paused_until = 0.0  # time.monotonic() de fin de suspension après un 429
+        self.throttled_in_row = 0  # 429 consécutifs: la suspension double à chaque fois
+        self.usage = {"submitted": 0, "spilled": 0}
+
+    @property
+    def full(self):
+        return self.concurrency is not None and self.in_flight >= self.concurrency
+
+    def paused(self, now):
+        return self.paused_until > now
+
+
+class KeyPool:
+    """
+    Ensemble de clés API utilisé comme un ApiClient (submit, get_status, download)
+
+    lookup(video_id) retourne le nom de la clé d'une vidéo soumise lors d'une
+    exécution précédente (base des jobs); une vidéo inconnue passe par la
+    première clé. activate() / finished() comptent les générations en cours de
+    chaque clé pour sa limite "concurrency".
+    """
+
+    def __init__(self, keys, base_url=API_BASE_URL, pool_size=POOL_SIZE, lookup=None):
+        if not keys:
+            raise KeyPoolError("aucune clé API")
+        self.keys = {}
+        for entry in keys:
+            client = ApiClient(entry["key"], base_url, pool_size=pool_size,
+                               rate_limiter=RateLimiter(entry.get("rate_limits")))
+            self.keys[entry["name"]] = PoolKey(entry["name"], client, entry.get("concurrency"))
+        self.default = next(iter(self.keys.values()))
+        self._lookup = lookup
+        self._pins = {}
+        self._active = set()
+        self._condition = threading.Condition()
+
+    def close(self):
+        for key in self.keys.values():
+            key.client.close()
+
+    def video_url(self, video_id=None, suffix=None):
+        return self.default.client.video_url(video_id, suffix)
+
+    @property
+    def stats(self):
+        """Compteurs cumulés de toutes les clés (mêmes champs que ApiClient.stats)"""
+        total = {}
+        for key in self.keys.values():
+            for name, value in key.client.stats.items():
+                total[name] = total.get(name, 0) + value
+            # Les 429 renvoyés sur une autre clé ne passent pas par la politique de retry du client
+            total["throttled"] += key.usage["spilled"]
+        return total
+
+    def usage(self):
+        """{nom de clé: {"submitted", "spilled", "in_flight", "requests", "throttled"}}"""
+        with self._condition:
+            return {name: dict(key.usage, in_flight=key.in_flight, requests=key.client.stats["requests"],
+                               throttled=key.client.stats["throttled"] + key.usage["spilled"])
+                    for name, key in self.keys.items()}
+
+    # Choix de la clé
+
+    def _acquire(self, exclude):
+        """
+        Réserve une génération sur la clé disponible le plus tôt (hors `exclude` si possible)
+
+        Les clés suspendues après un 429 sont ignorées; si aucune clé n'est utilisable,
+        on attend qu'une génération se termine ou que la première suspension expire.
+        """
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                candidates = [key for key in self.keys.values() if not key.full and not key.paused(now)]
+                if candidates:
+                    preferred = [key for key in candidates if key.name not in exclude] or candidates
+                    key = min(preferred, key=lambda key: (key.client.rate_limiter.wait_time("submit"),
+                                                          key.in_flight, key.usage["submitted"]))
+                    key.in_flight += 1
+                    return key
+                # Toutes les clés sont à leur limite ou suspendues
+                pauses = [key.paused_until - now for key in self.keys.values()
+                          if not key.full and key.paused(now)]
+                self._condition.wait(min(pauses) if pauses else None)
+
+    def _release(self, key):
+        with self._condition:
+            key.in_flight -= 1
+            self._condition.notify_all()
+
+    def key_for(self, video_id):
+        """Clé qui a créé cette vidéo"""
+        with self._condition:
+            key = self._pins.get(video_id)
+            if key is not None:
+                return key
+        name = self._lookup(video_id) if self._lookup else None
+        key = self.keys.get(name, self.default)
+        with self._condition:
+            return self._pins.setdefault(video_id, key)
+
+    def activate(self, video_id):
+        """Compte une vidéo reprise (soumise lors d'une exécution précédente) comme en cours"""
+        key = self.key_for(video_id)
+        with self._condition:
+            if video_id not in self._active:
+                self._active.add(video_id)
+                key.in_flight += 1
+
+    def finished(self, video_id):
+        """La génération est terminée: sa clé peut en accepter une autre"""
+        with self._condition:
+            if video_id in self._active:
+                self._active.discard(video_id)
+                self._pins[video_id].in_flight -= 1
+                self._condition.notify_all()
+
+    # Requêtes
+
+    def submit(self, data, upload=None):
+        """
+        POST /videos sur une clé du pool; response.api_key est le nom de la clé utilisée
+
+        Un 429 suspend la clé pendant le Retry-After et la requête repart sur une
+        autre clé; si aucune autre n'est utilisable, elle attend la fin de la
+        première suspension (ou une génération terminée) avant de réessayer.
+        """
+        tried = set()
+        attempts = max(MAX_ATTEMPTS, len(self.keys) + 1)
+        for attempt in range(attempts):
+            key = self._acquire(tried if len(tried) < len(self.keys) else ())
+            try:
+                response = key.client.submit(data, upload, retry_status=SAME_KEY_RETRY_STATUS)
+            except Exception:
+                self._release(key)
+                raise
+            response.api_key = key.name
+
+            if response.status_code == SPILLOVER_STATUS and attempt < attempts - 1:
+                retry_after = parse_retry_after(response.headers.get("Retry-After")) or 0
+                with self._condition:
+                    # Suspendue dans le pool lui-même: le limiteur de la clé ne fait rien sans limite de débit
+                    delay = max(retry_after, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** key.throttled_in_row))
+                    key.throttled_in_row += 1
+                    key.paused_until = max(key.paused_until, time.monotonic() + delay)
+                    key.usage["spilled"] += 1
+                key.client.rate_limiter.pause("submit", delay)
+                response.close()
+                self._release(key)
+                tried.add(key.name)
+                continue
+
+            if response.status_code != SPILLOVER_STATUS:
+                key.throttled_in_row = 0
+            video_id = None
+            if response.ok:
+                try:
+                    video_id = response.json().get("id")
+                except ValueError:
+                    pass
+            if not video_id:
+                self._release(key)
+                return response
+
+            with self._condition:
+                key.usage["submitted"] += 1
+                self._pins[video_id] = key
+                self._active.add(video_id)
+            return response
+
+    def get_status(self, video_id):
+        return self.key_for(video_id).client.get_status(video_id)
+
+    def download(self, video_id, headers=None):
+        return self.key_for(video_id).client.download(video_id, headers=headers)
+
@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Serveur local imitant l'API vidéo Sora2, pour tester le client sans être facturé
+
+Usage:
+    python mock_server.py --port 8000 --generation-time 20 --rate-429 0.05
+    SORA_API_BASE_URL=http://127.0.0.1:8000/v1/videos python generate.py batch jobs.jsonl -y
+
+Endpoints: POST /v1/videos, GET /v1/videos/{id}, GET /v1/videos/{id}/content
+(avec support de Range), plus GET /_stats pour les compteurs du serveur. Avec
+--webhook-url, un événement video.completed / video.failed est envoyé à la fin
+de chaque génération. Comme l'API, une vidéo n'est visible qu'avec la clé qui
+l'a créée (404 pour les autres clés).
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import random
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from webhooks import sign_payload
+
+# Options par défaut (toutes modifiables à la création du serveur ou en ligne de commande)
+DEFAULT_OPTIONS = {
+    "latency": 0.05,            # latence de base de chaque requête (secondes)
+    "latency_jitter": 0.05,     # latence aléatoire ajoutée, entre 0 et cette valeur
+    "generation_time": 20.0,    # durée d'une génération (secondes)
+    "generation_jitter": 0.2,   # variation relative de la durée de génération (±20%)
+    "progress_curve": "linear", # forme de la progression rapportée, voir PROGRESS_CURVES
+    "rate_429": 0.0,            # probabilité qu'une requête reçoive un 429
+    "rate_5xx": 0.0,            # probabilité qu'une requête reçoive un 500/502/503
+    "retry_after": 1,           # Retry-After envoyé avec les 429 (secondes)
+    "moderation_rate": 0.0,     # probabilité qu'une soumission soit refusée par la modération
+    "moderation_keywords": ("forbidden",),  # mots qui font toujours refuser un prompt
+    "failure_rate": 0.0,        # probabilité qu'une génération échoue (rejet après génération)
+    "payload_bytes": 4 * 1024 * 1024,  # taille du MP4 servi
+    "chunk_size": 64 * 1024,    # taille des blocs envoyés en streaming
+    "bandwidth": 0,             # débit maximum par téléchargement en octets/s (0 = illimité)
+    "webhook_url": None,        # URL qui reçoit video.completed / video.failed
+    "webhook_secret": None,     # secret de signature des webhooks (whsec_...)
+    "webhook_delay": 0.0,       # délai d'envoi d'un webhook après la fin de la génération
+    "webhook_drop_rate": 0.0,   # probabilité qu'un webhook ne soit jamais envoyé
+    "throttled_keys": (),       # clés API dont toutes les soumissions reçoivent un 429
+}
+
+# Progression rapportée en fonction de la fraction de temps écoulée (0 à 1)
+PROGRESS_CURVES = {
+    "linear": lambda t: t,
+    "ease-in": lambda t: t * t,                  # démarre lentement
+    "ease-out": lambda t: 1 - (1 - t) ** 2,      # ralentit vers la fin
+    "stall": lambda t: min(t, 0.9),              # reste bloquée à 90% jusqu'à la fin
+    "steps": lambda t: int(t * 4) / 4,           # avance par paliers de 25%
+}
+
+MODERATION_MESSAGE = "Your request was blocked by our moderation system."
+GENERATION_FAILURE_MESSAGE = "The generated video was blocked by our content policy."
+
+# Bloc pseudo-aléatoire répété pour servir des vidéos de n'importe quelle taille sans les stocker
+PAYLOAD_BLOCK = random.Random(0).randbytes(1024 * 1024)
+
+
+def payload_slice(start, end):
+    """Octets [start, end) de la vidéo servie (contenu identique d'un appel à l'autre)"""
+    block_size = len(PAYLOAD_BLOCK)
+    parts = []
+    position = start
+    while position < end:
+        offset = position % block_size
+        length = min(block_size - offset, end - position)
+        parts.append(PAYLOAD_BLOCK[offset:offset + length])
+        position += length
+    return b"".join(parts)
+
+
+def parse_form(content_type, body):
+    """Champs texte d'un corps urlencoded ou multipart (les fichiers sont ignorés)"""
+    if content_type.startswith("application/x-www-form-urlencoded"):
+        return {key: values[0] for key, values in parse_qs(body.decode("utf-8", "replace")).items()}
+
+    fields = {}
+    if "boundary=" not in content_type:
+        return fields
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    for part in body.split(b"--" + boundary):
+        headers, _, value = part.partition(b"\r\n\r\n")
+        if b"filename=" in headers or b'name="' not in headers:
+            continue
+        name = headers.split(b'name="', 1)[1].split(b'"', 1)[0].decode()
+        fields[name] = value.rstrip(b"\r\n").decode("utf-8", "replace")
+    return fields
+
+
+class _HTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # des centaines de clients peuvent se connecter en même temps
+
+
+class MockSoraServer:
+    """
+    Faux serveur Sora2 dans des threads (ThreadingHTTPServer, keep-alive HTTP/1.1)
+
+    Chaque vidéo suit sa propre horloge: sa progression dépend du temps écoulé
+    depuis la soumission et de la courbe choisie. stats() retourne les compteurs
+    (requêtes par endpoint, erreurs injectées, octets envoyés...).
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, **options):
+        unknown = set(options) - set(DEFAULT_OPTIONS)
+        if unknown:
+            raise ValueError(f"Option(s) inconnue(s): {', '.join(sorted(unknown))}")
+        self.options = dict(DEFAULT_OPTIONS, **options)
+        if self.options["progress_curve"] not in PROGRESS_CURVES:
+            raise ValueError(f"Courbe de progression inconnue: {self.options['progress_curve']}")
+
+        self.videos = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._random = random.Random()
+        self._stats = dict.fromkeys(("submit", "status", "content", "throttled", "server_errors",
+                                     "moderated", "failed", "completed", "bytes_sent",
+                                     "webhooks_sent", "webhooks_dropped"), 0)
+
+        self.httpd = _HTTPServer((host, port), make_handler(self))
+        self._thread = None
+        self._webhooks = []  # tas (échéance, numéro, vidéo)
+        self._webhook_condition = threading.Condition()
+        self._running = False
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1/videos"
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="mock-sora", daemon=True)
+        self._thread.start()
+        if self.options["webhook_url"]:
+            threading.Thread(target=self._send_webhooks, name="mock-webhooks", daemon=True).start()
+        return self
+
+    def stop(self):
+        with self._webhook_condition:
+            self._running = False
+            self._webhook_condition.notify_all()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, videos=len(self.videos))
+
+    def chance(self, rate):
+        with self._lock:
+            return rate > 0 and self._random.random() < rate
+
+    def create_video(self, fields, owner=None):
+        """Enregistre une nouvelle génération (créée avec la clé owner) et retourne sa représentation"""
+        options = self.options
+        with self._lock:
+            video_id = f"video_mock_{next(self._ids):06d}"
+            jitter = options["generation_jitter"]
+            duration = options["generation_time"] * (1 + self._random.uniform(-jitter, jitter))
+            fails = options["failure_rate"] > 0 and self._random.random() < options["failure_rate"]
+        video = {
+            "id": video_id,
+            "object": "video",
+            "model": fields.get("model", "sora-2"),
+            "seconds": fields.get("seconds", "4"),
+            "size": fields.get("size", "1280x720"),
+            "created_at": int(time.time()),
+            "_started": time.monotonic(),
+            "_duration": max(0.0, duration),
+            "_fails": fails,
+            "_owner": owner,
+        }
+        with self._lock:
+            self.videos[video_id] = video
+        if options["webhook_url"]:
+            with self._webhook_condition:
+                due_at = video["_started"] + video["_duration"] + options["webhook_delay"]
+                heapq.heappush(self._webhooks, (due_at, video_id, video))
+                self._webhook_condition.notify_all()
+        return self.describe(video)
+
+    def _send_webhooks(self):
+        """Envoie les webhooks à leur échéance (un seul thread pour toutes les vidéos)"""
+        while True:
+            with self._webhook_condition:
+                if not self._running:
+                    return
+                if not self._webhooks:
+                    self._webhook_condition.wait()
+                    continue
+                wait = self._webhooks[0][0] - time.monotonic()
+                if wait > 0:
+                    self._webhook_condition.wait(wait)
+                    continue
+                _, _, video = heapq.heappop(self._webhooks)
+            self.send_webhook(video)
+
+    def send_webhook(self, video):
+        """POST d'un événement de fin de génération vers webhook_url"""
+        if self.chance(self.options["webhook_drop_rate"]):
+            self.count("webhooks_dropped")
+            return
+        event_id = f"evt_{video['id']}"
+        body = json.dumps({
+            "id": event_id,
+            "object": "event",
+            "type": "video.failed" if video["_fails"] else "video.completed",
+            "created_at": int(time.time()),
+            "data": {"id": video["id"]},
+        }).encode("utf-8")
+        headers = {"Content-Type": "application/json"}
+        if self.options["webhook_secret"]:
+            timestamp = str(int(time.time()))
+            headers.update({
+                "webhook-id": event_id,
+                "webhook-timestamp": timestamp,
+                "webhook-signature": sign_payload(self.options["webhook_secret"], event_id, timestamp, body),
+            })
+        request = urllib.request.Request(self.options["webhook_url"], data=body, headers=headers, method="POST")
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+            self.count("webhooks_sent")
+        except OSError:
+            self.count("webhooks_dropped")
+
+    def describe(self, video):
+        """Représentation JSON d'une vidéo à l'instant présent"""
+        elapsed = time.monotonic() - video["_started"]
+        fraction = 1.0 if video["_duration"] == 0 else min(1.0, elapsed / video["_duration"])
+        result = {key: value for key, value in video.items() if not key.startswith("_")}
+
+        if fraction >= 1.0:
+            if video["_fails"]:
+                result.update(status="failed", progress=100,
+                              error={"code": "moderation_blocked", "message": GENERATION_FAILURE_MESSAGE})
+                outcome = "failed"
+            else:
+                result.update(status="completed", progress=100,
+                              completed_at=int(video["created_at"] + video["_duration"]))
+                outcome = "completed"
+            with self._lock:
+                if not video.get("_counted"):
+                    video["_counted"] = True
+                    self._stats[outcome] += 1
+            return result
+
+        status = "queued" if fraction < 0.05 else "in_progress"
+        progress = int(100 * PROGRESS_CURVES[self.options["progress_curve"]](fraction))
+        result.update(status=status, progress=min(progress, 99))
+        return result
+
+
+def make_handler(server):
+    """Classe de handler HTTP liée à une instance de MockSoraServer"""
+    options = server.options
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def send_json(self, payload, status=200, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_error_json(self, status, message, code=None, headers=None):
+            self.send_json({"error": {"message": message, "type": "invalid_request_error", "code": code}},
+                           status, headers)
+
+        def read_body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return self.rfile.read(length) if length else b""
+
+        def simulate_network(self):
+            """Latence puis éventuelle erreur injectée; retourne True si la requête doit continuer"""
+            delay = options["latency"] + random.uniform(0, options["latency_jitter"])
+            if delay > 0:
+                time.sleep(delay)
+            if server.chance(options["rate_429"]):
+                server.count("throttled")
+                self.send_error_json(429, "Rate limit reached", "rate_limit_exceeded",
+                                     {"Retry-After": str(options["retry_after"])})
+                return False
+            if server.chance(options["rate_5xx"]):
+                server.count("server_errors")
+                self.send_error_json(random.choice((500, 502, 503)), "The server had an error", "server_error")
+                return False
+            return True
+
+        def authorized(self):
+            authorization = self.headers.get("Authorization", "")
+            if not authorization.startswith("Bearer "):
+                self.send_error_json(401, "Missing bearer authentication", "invalid_api_key")
+                return False
+            self.api_key = authorization[len("Bearer "):]
+            return True
+
+        def route(self):
+            """Découpe le chemin en (video_id, suffixe); None si hors de /v1/videos"""
+            parts = self.path.split("?", 1)[0].strip("/").split("/")
+            if parts[:2] != ["v1", "videos"] or len(parts) > 4:
+                return None
+            return (parts[2] if len(parts) > 2 else None), (parts[3] if len(parts) > 3 else None)
+
+        def do_POST(self):
+            body = self.read_body()  # lu avant toute réponse pour garder la connexion réutilisable
+            route = self.route()
+            if route != (None, None):
+                self.send_error_json(404, "Not found")
+                return
+            server.count("submit")
+            if not self.authorized() or not self.simulate_network():
+                return
+            if self.api_key in options["throttled_keys"]:
+                server.count("throttled")
+                self.send_error_json(429, "Rate limit reached", "rate_limit_exceeded",
+                                     {"Retry-After": str(options["retry_after"])})
+                return
+
+            fields = parse_form(self.headers.get("Content-Type", ""), body)
+            prompt = fields.get("prompt", "").lower()
+            if not prompt:
+                self.send_error_json(400, "Missing required parameter: 'prompt'", "missing_required_parameter")
+                return
+            if any(word in prompt for word in options["moderation_keywords"]) \
+                    or server.chance(options["moderation_rate"]):
+                server.count("moderated")
+                self.send_error_json(400, MODERATION_MESSAGE, "moderation_blocked")
+                return
+
+            self.send_json(server.create_video(fields, owner=self.api_key))
+
+        def do_GET(self):
+            if self.path == "/_stats":
+                self.send_json(server.stats())
+                return
+
+            route = self.route()
+            if route is None or route[0] is None or route[1] not in (None, "content"):
+                self.send_error_json(404, "Not found")
+                return
+            video_id, suffix = route
+            server.count("content" if suffix else "status")
+            if not self.authorized() or not self.simulate_network():
+                return
+
+            video = server.videos.get(video_id)
+            if video is None or video["_owner"] != self.api_key:
+                self.send_error_json(404, f"Video '{video_id}' not found", "not_found")
+                return
+            description = server.describe(video)
+            if suffix is None:
+                self.send_json(description)
+            elif description["status"] != "completed":
+                self.send_error_json(404, "Video is not ready yet", "video_not_ready")
+            else:
+                self.send_content()
+
+        def send_content(self):
+            total = options["payload_bytes"]
+            start, end = 0, total  # [start, end)
+            range_header = self.headers.get("Range", "")
+            if range_header.startswith("bytes="):
+                first, _, last = range_header[len("bytes="):].partition("-")
+                start = int(first or 0)
+                end = min(total, int(last) + 1) if last else total
+                if start >= total:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{total}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end - 1}/{total}")
+            else:
+                self.send_response(200)
+
+            self.send_header("Content-Type", "video/mp4")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Length", str(end - start))
+            self.end_headers()
+
+            chunk_size = options["chunk_size"]
+            bandwidth = options["bandwidth"]
+            started = time.monotonic()
+            sent = 0
+            try:
+                for position in range(start, end, chunk_size):
+                    chunk = payload_slice(position, min(end, position + chunk_size))
+                    self.wfile.write(chunk)
+                    sent += len(chunk)
+                    if bandwidth:
+                        ahead = sent / bandwidth - (time.monotonic() - started)
+                        if ahead > 0:
+                            time.sleep(ahead)
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+            finally:
+                server.count("bytes_sent", sent)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur local imitant l'API vidéo Sora2")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=DEFAULT_OPTIONS["latency"],
+                        help="Latence de base de chaque requête en secondes")
+    parser.add_argument("--generation-time", type=float, default=DEFAULT_OPTIONS["generation_time"],
+                        help="Durée d'une génération en secondes")
+    parser.add_argument("--progress-curve", choices=list(PROGRESS_CURVES), default=DEFAULT_OPTIONS["progress_curve"])
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Probabilité d'un 429 par requête")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Probabilité d'un 5xx par requête")
+    parser.add_argument("--moderation-rate", type=float, default=0.0,
+                        help="Probabilité qu'une soumission soit refusée par la modération")
+    parser.add_argument("--failure-rate", type=float, default=0.0,
+                        help="Probabilité qu'une génération échoue")
+    parser.add_argument("--payload-mb", type=float, default=DEFAULT_OPTIONS["payload_bytes"] / (1024 * 1024),
+                        help="Taille des vidéos servies en Mo")
+    parser.add_argument("--bandwidth-mbps", type=float, default=0,
+                        help="Débit maximum par téléchargement en Mo/s (0 = illimité)")
+    parser.add_argument("--webhook-url", help="Envoyer video.completed / video.failed à cette URL")
+    parser.add_argument("--webhook-secret", help="Secret de signature des webhooks (whsec_...)")
+    parser.add_argument("--webhook-drop-rate", type=float, default=0.0,
+                        help="Probabilité qu'un webhook soit perdu")
+    parser.add_argument("--throttled-key", action="append", default=[], metavar="CLÉ",
+                        help="Répondre 429 à toutes les soumissions de cette clé API (répétable)")
+    args = parser.parse_args()
+
+    server = MockSoraServer(
+        args.host, args.port,
+        latency=args.latency,
+        generation_time=args.generation_time,
+        progress_curve=args.progress_curve,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        moderation_rate=args.moderation_rate,
+        failure_rate=args.failure_rate,
+        payload_bytes=int(args.payload_mb * 1024 * 1024),
+        bandwidth=int(args.bandwidth_mbps * 1024 * 1024),
+        webhook_url=args.webhook_url,
+        webhook_secret=args.webhook_secret,
+        webhook_drop_rate=args.webhook_drop_rate,
+        throttled_keys=tuple(args.throttled_key),
+    )
+    print(f"🧪 Faux serveur Sora2 sur {server.base_url}")
+    print(f"   export SORA_API_BASE_URL={server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        print(f"\n📊 {json.dumps(server.stats())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Pré-filtrage local des prompts avant soumission
+
+Deux signaux, calculés sans appel réseau: des règles de mots-clés configurables
+et la similarité avec les prompts déjà refusés par la modération (historique de
+la base des jobs). Un prompt signalé peut être retenu avant d'être soumis, pour
+ne pas payer une génération qui a toutes les chances d'être refusée.
+"""
+
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from pathlib import Path
+
+MODERATION_RULES = Path("moderation_rules.txt")
+
+# Modes du pré-filtrage: retenir le job, seulement le signaler, ou désactivé
+SCREEN_MODES = ("hold", "flag", "off")
+DEFAULT_SCREEN_MODE = "hold"
+
+# Similarité cosinus (mots et paires de mots) à partir de laquelle un prompt est signalé
+SIMILARITY_THRESHOLD = 0.6
+
+# Un terme présent dans plus de cette fraction de l'historique ne sert pas à chercher
+# les candidats (il est compté dans le score, mais ne discrimine rien)
+COMMON_TERM_FRACTION = 0.05
+COMMON_TERM_MIN_POSTINGS = 100
+
+# Nombre de candidats (ceux qui partagent le plus de termes) dont le score est calculé
+MAX_CANDIDATES = 50
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """Mots en minuscules, sans accents ni ponctuation"""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def prompt_features(text):
+    """Ensemble des mots et des paires de mots consécutifs d'un prompt"""
+    tokens = tokenize(text)
+    return frozenset(tokens) | frozenset(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+
+
+def load_rules(path=MODERATION_RULES):
+    """
+    Lit les règles de mots-clés: un mot ou une expression par ligne, # pour les commentaires
+
+    Une règle correspond si tous ses mots apparaissent consécutivement dans le
+    prompt (insensible à la casse et aux accents). Fichier absent = aucune règle.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line and tokenize(line):
+            rules.append(line)
+    return rules
+
+
+class RejectionIndex:
+    """
+    Index inversé des prompts refusés, pour retrouver le plus proche d'un nouveau prompt
+
+    Les candidats sont cherchés par les paires de mots (les mots seuls pour un prompt
+    d'un mot), en ignorant les termes trop fréquents; seuls les MAX_CANDIDATES qui en
+    partagent le plus avec la requête sont comparés. La recherche reste ainsi rapide
+    avec des dizaines de milliers d'entrées. Le score est la similarité cosinus des
+    ensembles de termes (mots et paires de mots).
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self._prompts = []
+        self._features = []
+        self._postings = {}
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._prompts)
+
+    def add(self, prompt, error=None):
+        """Ajoute un prompt refusé (les doublons sont ignorés)"""
+        features = prompt_features(prompt)
+        if not features:
+            return
+        with self._lock:
+            if features in self._seen:
+                return
+            self._seen.add(features)
+            index = len(self._prompts)
+            self._prompts.append((prompt, error))
+            self._features.append(features)
+            for feature in self._search_terms(features):
+                self._postings.setdefault(feature, []).append(index)
+
+    @staticmethod
+    def _search_terms(features):
+        pairs = [feature for feature in features if " " in feature]
+        return pairs or features
+
+    def best_match(self, prompt):
+        """(score, prompt refusé, erreur) le plus proche au-dessus du seuil, ou None"""
+        features = prompt_features(prompt)
+        if not features:
+            return None
+        with self._lock:
+            common = max(COMMON_TERM_MIN_POSTINGS, len(self._prompts) * COMMON_TERM_FRACTION)
+            shared = Counter()
+            for feature in self._search_terms(features):
+                postings = self._postings.get(feature)
+                if postings and len(postings) <= common:
+                    shared.update(postings)
+
+            best = None
+            for index, _ in shared.most_common(MAX_CANDIDATES):
+                other = self._features[index]
+                score = len(features & other) / math.sqrt(len(features) * len(other))
+                if score >= self.threshold and (best is None or score > best[0]):
+                    best = (score, *self._prompts[index])
+        return best
+
+
+class PromptScreen:
+    """
+    Pré-filtrage d'un prompt: règles de mots-clés puis historique des refus
+
+    load_history() retourne les prompts refusés [(prompt, erreur)]; il n'est
+    appelé qu'au premier contrôle. check() retourne None ou un dict avec le
+    motif ("reason") et, pour la similarité, le score et le prompt refusé.
+    """
+
+    def __init__(self, load_history=None, rules=(), threshold=SIMILARITY_THRESHOLD):
+        self.rules = [(rule, " ".join(tokenize(rule))) for rule in rules]
+        self.index = RejectionIndex(threshold)
+        self._load_history = load_history
+        self._loaded = load_history is None
+        self._lock = threading.Lock()
+
+    def _ensure_loaded(self):
+        with self._lock:
+            if not self._loaded:
+                for prompt, error in self._load_history():
+                    self.index.add(prompt, error)
+                self._loaded = True
+
+    def add_rejection(self, prompt, error=None):
+        """Ajoute un refus constaté pendant l'exécution (les prompts suivants en tiennent compte)"""
+        self._ensure_loaded()
+        self.index.add(prompt, error)
+
+    def check(self, prompt):
+        text = f" {' '.join(tokenize(prompt))} "
+        for rule, normalized in self.rules:
+            if f" {normalized} " in text:
+                return {"reason": f"mot-clé « {rule} »", "rule": rule}
+
+        self._ensure_loaded()
+        match = self.index.best_match(prompt)
+        if match:
+            score, rejected_prompt, error = match
+            return {"reason": f"{score:.0%} similaire à un prompt refusé: « {rejected_prompt[:60]} »",
+                    "score": round(score, 3), "rejected_prompt": rejected_prompt, "error": error}
+        return None
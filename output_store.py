@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Gestion du dossier des vidéos téléchargées
+
+- une vidéo a un chemin stable (output/video_<id>.mp4): un nouveau téléchargement
+  remplace le fichier au lieu d'en créer une copie
+- les vidéos identiques (même SHA256) partagent le même fichier (liens physiques)
+- des quotas de taille et d'ancienneté évincent les vidéos les moins récemment
+  utilisées, sauf celles qui sont épinglées
+- les fichiers .tmp abandonnés par un téléchargement interrompu sont supprimés
+- la base des jobs reste l'index: une vidéo évincée passe au statut "evicted",
+  une vidéo supprimée à la main au statut "missing"
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+OUTPUT_DIR = Path("output")
+
+# Un .tmp sans écriture depuis ce délai (secondes) n'appartient plus à un téléchargement en cours
+TEMP_MAX_AGE = 24 * 3600
+
+
+def format_size(size):
+    for unit in ("B", "Ko", "Mo", "Go"):
+        if size < 1024 or unit == "Go":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+class OutputStore:
+    """
+    Fichiers vidéo du dossier de sortie, indexés par la base des jobs
+
+    max_bytes et max_age (secondes) sont les quotas (None = pas de limite); une
+    vidéo est « utilisée » à son téléchargement puis à chaque réutilisation depuis
+    le cache (last_access). Les fichiers liés entre eux comptent une seule fois.
+    """
+
+    def __init__(self, job_store, output_dir=OUTPUT_DIR, max_bytes=None, max_age=None,
+                 temp_max_age=TEMP_MAX_AGE):
+        self.job_store = job_store
+        self.output_dir = Path(output_dir)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.temp_max_age = temp_max_age
+        self._lock = threading.Lock()
+
+    def video_path(self, video_id):
+        return self.output_dir / f"video_{video_id}.mp4"
+
+    def _find_copy(self, sha256, exclude):
+        """Un fichier existant de même contenu (autre que exclude), ou None"""
+        for record in self.job_store.find_by_sha256(sha256):
+            path = Path(record.get("file_path") or "")
+            if path != exclude and path.is_file() and path.stat().st_size == record.get("file_size"):
+                return path
+        return None
+
+    def commit(self, temp_file, video_id, sha256):
+        """
+        Range un téléchargement terminé à son chemin définitif
+
+        Si une vidéo de même SHA256 est déjà sur disque, le chemin définitif devient
+        un lien physique vers elle et temp_file est supprimé. Retourne (chemin,
+        fichier existant partagé ou None).
+        """
+        target = self.video_path(video_id)
+        with self._lock:
+            existing = self._find_copy(sha256, target)
+            if existing is not None:
+                link = target.with_name(target.name + ".link")
+                try:
+                    if link.exists():
+                        link.unlink()
+                    os.link(existing, link)
+                except OSError:
+                    # Système de fichiers sans liens physiques: on garde la copie
+                    existing = None
+                else:
+                    os.replace(link, target)
+                    temp_file.unlink()
+            if existing is None:
+                os.replace(temp_file, target)
+        return target, existing
+
+    def touch(self, video_id):
+        """Marque une vidéo comme utilisée (elle sera évincée plus tard)"""
+        self.job_store.update(video_id, last_access=int(time.time()))
+
+    def pin(self, video_id, pinned=True):
+        """Épingle (ou non) une vidéo: elle n'est jamais évincée par les quotas"""
+        return self.job_store.update(video_id, pinned=pinned)
+
+    def _groups(self):
+        """Vidéos téléchargées regroupées par fichier physique (les liens comptent une fois)"""
+        groups = {}
+        for record in self.job_store.find(status="downloaded"):
+            path = Path(record.get("file_path") or "")
+            try:
+                stat = path.stat()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+            group = groups.setdefault((stat.st_dev, stat.st_ino), {
+                "size": stat.st_size, "records": [], "paths": set(), "last_used": 0, "pinned": False})
+            group["records"].append(record)
+            group["paths"].add(path)
+            group["last_used"] = max(group["last_used"], record.get("last_access") or record["timestamp"] or 0)
+            group["pinned"] = group["pinned"] or bool(record.get("pinned"))
+        return list(groups.values())
+
+    def usage(self):
+        """Occupation du dossier: {"files", "videos", "bytes", "pinned", "linked_videos"}"""
+        groups = self._groups()
+        return {
+            "files": len(groups),
+            "videos": sum(len(group["records"]) for group in groups),
+            "bytes": sum(group["size"] for group in groups),
+            "pinned": sum(1 for group in groups if group["pinned"]),
+            "linked_videos": sum(len(group["records"]) - 1 for group in groups),
+        }
+
+    def enforce(self, keep=(), now=None):
+        """Applique les quotas (LRU, vidéos épinglées et `keep` exclues); retourne les video_id évincés"""
+        if self.max_bytes is None and self.max_age is None:
+            return []
+        now = now or time.time()
+        evicted = []
+        with self._lock:
+            groups = self._groups()
+            total = sum(group["size"] for group in groups)
+            keep = set(keep)
+            candidates = [group for group in groups if not group["pinned"]
+                          and not keep & {record["video_id"] for record in group["records"]}]
+            for group in sorted(candidates, key=lambda group: group["last_used"]):
+                if self.max_age is not None and now - group["last_used"] > self.max_age:
+                    reason = "ancienneté"
+                elif self.max_bytes is not None and total > self.max_bytes:
+                    reason = "taille"
+                else:
+                    break  # les suivants sont plus récents et le quota de taille est respecté
+                for path in group["paths"]:
+                    try:
+                        path.unlink()
+                    except FileNotFoundError:
+                        pass
+                for record in group["records"]:
+                    self.job_store.record(record["video_id"], "evicted",
+                                          error=f"quota de {reason} du dossier de sortie",
+                                          extra={"evicted_at": int(now)})
+                    evicted.append(record["video_id"])
+                total -= group["size"]
+        return evicted
+
+    def collect_temp(self, now=None):
+        """Supprime les .tmp abandonnés (sans écriture depuis temp_max_age); retourne les octets libérés"""
+        now = now or time.time()
+        freed = 0
+        for path in self.output_dir.glob("*.tmp*"):
+            try:
+                stat = path.stat()
+                if path.is_file() and now - stat.st_mtime > self.temp_max_age:
+                    path.unlink()
+                    freed += stat.st_size
+            except FileNotFoundError:
+                continue
+        return freed
+
+    def dedupe(self):
+        """Remplace les copies identiques déjà sur disque par des liens physiques; retourne les octets libérés"""
+        by_hash = {}
+        for group in self._groups():
+            sha256 = group["records"][0].get("sha256")
+            if sha256:
+                by_hash.setdefault(sha256, []).append(group)
+
+        freed = 0
+        with self._lock:
+            for groups in by_hash.values():
+                keep = next(iter(groups[0]["paths"]))
+                for group in groups[1:]:
+                    for path in group["paths"]:
+                        link = path.with_name(path.name + ".link")
+                        try:
+                            os.link(keep, link)
+                            os.replace(link, path)
+                        except OSError:
+                            break
+                    else:
+                        freed += group["size"]
+        return freed
+
+    def reconcile(self):
+        """
+        Aligne la base des jobs sur le disque
+
+        Les vidéos "downloaded" dont le fichier a disparu passent au statut "missing".
+        Retourne (video_id manquants, fichiers .mp4 qu'aucun job ne référence).
+        """
+        missing = []
+        referenced = set()
+        for record in self.job_store.find(status="downloaded"):
+            path = Path(record.get("file_path") or "")
+            if path.is_file():
+                referenced.add(path.resolve())
+            else:
+                self.job_store.record(record["video_id"], "missing", error=f"fichier introuvable: {path}")
+                missing.append(record["video_id"])
+        orphans = sorted(path for path in self.output_dir.glob("*.mp4") if path.resolve() not in referenced)
+        return missing, orphans
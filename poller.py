@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Planificateur de polling partagé pour suivre plusieurs générations Sora2
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Intervalles de polling (secondes)
+MIN_POLL_INTERVAL = 5
+MAX_POLL_INTERVAL = 30
+# Tant qu'une seule mesure de progression existe, la vitesse est inconnue: intervalle historique
+EARLY_POLL_INTERVAL = 10
+POLL_JITTER = 0.2  # +/- 20%
+
+# Tolérance aux erreurs
+MAX_CONSECUTIVE_ERRORS = 8
+ERROR_BACKOFF = 5  # secondes, doublé à chaque erreur consécutive
+MAX_ERROR_BACKOFF = 120
+
+# Durée maximale de suivi d'une vidéo
+POLL_TIMEOUT = 6000  # 100 minutes
+
+TERMINAL_STATUSES = {"completed", "failed", "error"}
+
+
+def next_poll_interval(progress, previous=None, now=None,
+                       min_interval=MIN_POLL_INTERVAL, max_interval=MAX_POLL_INTERVAL,
+                       early_interval=EARLY_POLL_INTERVAL):
+    """
+    Calcule le délai avant le prochain poll à partir de la progression rapportée
+
+    Loin de la fin on interroge rarement, près de 100% on interroge souvent.
+    Si une mesure précédente (timestamp, progression) est disponible, on estime
+    le temps restant et on vise la moitié de cette estimation; sans elle, le
+    délai est borné à early_interval pour ne pas retarder une génération courte.
+    """
+    progress = max(0, min(100, progress or 0))
+    interval = max_interval - (max_interval - min_interval) * progress / 100
+
+    if previous is not None and now is not None:
+        previous_time, previous_progress = previous
+        elapsed = now - previous_time
+        gained = progress - (previous_progress or 0)
+        if elapsed > 0 and gained > 0:
+            remaining = (100 - progress) * elapsed / gained
+            interval = min(interval, remaining / 2)
+    else:
+        interval = min(interval, early_interval)
+
+    return max(min_interval, min(max_interval, interval))
+
+
+def with_jitter(interval, jitter=POLL_JITTER):
+    """Ajoute une gigue aléatoire pour éviter que les polls ne se synchronisent"""
+    return interval * random.uniform(1 - jitter, 1 + jitter)
+
+
+class _TrackedVideo:
+    """État de suivi d'une vidéo dans le poller"""
+
+    def __init__(self, video_id, on_done, on_update):
+        self.video_id = video_id
+        self.on_done = on_done
+        self.on_update = on_update
+        self.started_at = time.monotonic()
+        self.last_sample = None  # (timestamp, progression)
+        self.errors = 0
+        self.polls = 0
+        self.token = None  # seule l'entrée de planification la plus récente est valide
+        self.in_flight = False
+        self.wake = False  # poll immédiat demandé pendant un poll en cours
+
+
+class StatusPoller:
+    """
+    Un seul planificateur qui interroge le statut de toutes les vidéos en cours
+
+    Chaque vidéo est replanifiée selon sa progression (voir next_poll_interval),
+    les erreurs transitoires sont retentées avec backoff et, à l'état terminal,
+    on_done(video_id, status, result) est appelé une seule fois. status vaut
+    "completed", "failed", "error" ou "timeout". poll_now() avance le prochain
+    poll d'une vidéo (par exemple à la réception d'un webhook). Une exception levée
+    par on_update est affichée avec log() sans interrompre le suivi de la vidéo.
+    """
+
+    def __init__(self, fetch_status, max_workers=4, timeout=POLL_TIMEOUT,
+                 max_errors=MAX_CONSECUTIVE_ERRORS, is_fatal=None, log=print):
+        self.fetch_status = fetch_status
+        self.log = log
+        self.timeout = timeout
+        self.max_errors = max_errors
+        self.is_fatal = is_fatal or (lambda error: False)
+
+        self._videos = {}
+        self._schedule = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="poller")
+        self._running = False
+        self._thread = None
+        self._early_wakeups = set()
+        self.requests_sent = 0
+        self.wakeups = 0
+
+    def start(self):
+        """Démarre le thread de planification"""
+        with self._condition:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="status-poller", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Arrête le planificateur (les vidéos encore suivies sont abandonnées)"""
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        if self._thread:
+            self._thread.join()
+        self._workers.shutdown(wait=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def track(self, video_id, on_done, on_update=None, delay=0):
+        """Ajoute une vidéo à suivre; le premier poll a lieu après `delay` secondes"""
+        with self._condition:
+            self._videos[video_id] = _TrackedVideo(video_id, on_done, on_update)
+            if video_id in self._early_wakeups:
+                # Le webhook est arrivé avant même la fin de la soumission
+                self._early_wakeups.discard(video_id)
+                delay = 0
+            self._push(video_id, delay)
+
+    def poll_now(self, video_id):
+        """Interroge une vidéo dès que possible; retourne False si elle n'est pas (encore) suivie"""
+        with self._condition:
+            self.wakeups += 1
+            video = self._videos.get(video_id)
+            if video is None:
+                self._early_wakeups.add(video_id)
+                return False
+            if video.in_flight:
+                video.wake = True
+            else:
+                self._push(video_id, 0)
+            return True
+
+    def pending(self):
+        """Nombre de vidéos encore suivies"""
+        with self._condition:
+            return len(self._videos)
+
+    def _push(self, video_id, delay):
+        token = next(self._sequence)
+        self._videos[video_id].token = token
+        heapq.heappush(self._schedule, (time.monotonic() + delay, token, video_id))
+        self._condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                if not self._running:
+                    return
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+                due_at, token, video_id = self._schedule[0]
+                wait = due_at - time.monotonic()
+                if wait > 0:
+                    self._condition.wait(wait)
+                    continue
+                heapq.heappop(self._schedule)
+                video = self._videos.get(video_id)
+                if video is None or video.token != token:
+                    continue  # vidéo terminée ou replanifiée entre-temps
+                video.in_flight = True
+            self._workers.submit(self._poll, video)
+
+    def _finish(self, video, status, result):
+        with self._condition:
+            self._videos.pop(video.video_id, None)
+        video.on_done(video.video_id, status, result)
+
+    def _reschedule(self, video, delay):
+        with self._condition:
+            video.in_flight = False
+            if video.wake:
+                video.wake = False
+                delay = 0
+            if video.video_id in self._videos:
+                self._push(video.video_id, delay)
+
+    def _notify(self, video, result, error):
+        """Appelle on_update; une erreur du callback ne doit ni replanifier ni terminer la vidéo à sa place"""
+        if not video.on_update:
+            return
+        try:
+            video.on_update(video.video_id, result, error)
+        except Exception as e:
+            self.log(f"⚠️  [{video.video_id}] Erreur dans le suivi du statut (ignorée): {e!r}")
+
+    def _poll(self, video):
+        now = time.monotonic()
+        if now - video.started_at > self.timeout:
+            self._finish(video, "timeout", None)
+            return
+
+        with self._condition:
+            self.requests_sent += 1
+        video.polls += 1
+        try:
+            result = self.fetch_status(video.video_id)
+        except Exception as e:
+            video.errors += 1
+            if self.is_fatal(e) or video.errors >= self.max_errors:
+                self._finish(video, "error", {"error": {"message": str(e)}})
+                return
+            self._notify(video, None, e)
+            backoff = min(MAX_ERROR_BACKOFF, ERROR_BACKOFF * (2 ** (video.errors - 1)))
+            self._reschedule(video, with_jitter(backoff))
+            return
+
+        video.errors = 0
+        status = result.get("status")
+        self._notify(video, result, None)
+
+        if status in TERMINAL_STATUSES:
+            self._finish(video, status, result)
+            return
+
+        progress = result.get("progress", 0)
+        interval = next_poll_interval(progress, video.last_sample, now)
+        video.last_sample = (now, progress)
+        self._reschedule(video, with_jitter(interval))
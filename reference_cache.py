@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Cache disque des images de référence adaptées à une résolution Sora
+"""
+
+import os
+import threading
+from pathlib import Path
+
+from generation_cache import file_sha256
+
+REFERENCE_CACHE_DIR = Path("cache") / "references"
+REFERENCE_CACHE_MAX_BYTES = 500 * 1024 * 1024
+REFERENCE_CACHE_MAX_ENTRIES = 1000
+
+
+class ReferenceCache:
+    """
+    Images dérivées (letterbox/crop) indexées par hash de la source, taille et mode
+
+    Chaque conversion n'est faite qu'une fois, même si plusieurs jobs d'un batch
+    la demandent en même temps. La date de modification sert de date de dernier
+    accès: les entrées les moins récemment utilisées sont évincées en premier.
+    """
+
+    def __init__(self, cache_dir=REFERENCE_CACHE_DIR, max_bytes=REFERENCE_CACHE_MAX_BYTES,
+                 max_entries=REFERENCE_CACHE_MAX_ENTRIES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _key_lock(self, name):
+        with self._lock:
+            return self._key_locks.setdefault(name, threading.Lock())
+
+    def get(self, source_path, target_size, mode):
+        """Retourne le chemin de l'image adaptée, en la créant si nécessaire"""
+        source_hash = file_sha256(source_path)
+        name = f"{source_hash[:32]}_{target_size[0]}x{target_size[1]}_{mode}.jpg"
+        path = self.cache_dir / name
+
+        with self._key_lock(name):
+            if path.exists():
+                os.utime(path)  # marque l'entrée comme récemment utilisée
+                return path, False
+
+            # Import tardif: Pillow n'est nécessaire que pour une vraie conversion
+            from resize_image import open_for_sizes, fit_image
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f"{name}.{threading.get_ident()}.tmp")
+            with open_for_sizes(source_path, [target_size]) as img:
+                fit_image(img, target_size, mode).save(temp_path, 'JPEG', quality=95)
+            os.replace(temp_path, path)
+
+        self.evict()
+        return path, True
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà des limites"""
+        with self._lock:
+            try:
+                entries = [(entry.stat().st_mtime, entry.stat().st_size, entry)
+                           for entry in self.cache_dir.glob("*.jpg")]
+            except FileNotFoundError:
+                return 0
+            entries.sort()
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            while entries and (total > self.max_bytes or len(entries) > self.max_entries):
+                _, size, entry = entries.pop(0)
+                try:
+                    entry.unlink()
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            return evicted
@@ -1,93 +1,300 @@
 #!/usr/bin/env python3
 """
-Script to resize an image to 1280x720 and save it to input_reference/
+Script to resize images to the Sora sizes (1280x720 by default) and save them to input_reference/
+
+Usage:
+    python resize_image.py image.jpg                      # one image
+    python resize_image.py photos/ --sizes 1280x720,720x1280 --workers 8   # whole folder
 """
 
+import argparse
+import hashlib
+import json
 import os
-from PIL import Image
 import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+DEFAULT_OUTPUT_DIR = Path(__file__).resolve().parent / "input_reference"
+DEFAULT_SIZES = [(1280, 720)]
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
+
+# Index of generated files: output name -> sha256 of the source it was made from
+INDEX_FILE = ".resize_index.json"
+
+# Letterbox (black bars) or crop (fill the frame, cut the overflow)
+FIT_MODES = ("letterbox", "crop")
+
+# Let Pillow reduce large sources cheaply (JPEG draft / reduce()) before the final LANCZOS pass
+REDUCING_GAP = 3.0
+
+
+def parse_size(value):
+    """Parse a 'WIDTHxHEIGHT' string into a (width, height) tuple"""
+    width, height = value.lower().split('x')
+    return int(width), int(height)
 
-def resize_image(input_path, output_path, target_size=(1280, 720)):
+
+def file_sha256(path):
+    """SHA256 of a file's content"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def open_for_sizes(input_path, target_sizes):
+    """
+    Open an image, letting JPEG decode at a reduced scale when every target is much smaller
+
+    draft() picks the smallest power-of-two scale that is still at least as large
+    as the requested size, so the final resample keeps its quality.
+    """
+    img = Image.open(input_path)
+    largest = (max(w for w, _ in target_sizes), max(h for _, h in target_sizes))
+    if img.format == "JPEG":
+        img.draft("RGB", largest)
+    return img
+
+
+def fit_image(img, target_size=(1280, 720), mode="letterbox"):
+    """
+    Fit an image into target_size while keeping its aspect ratio
+
+    mode="letterbox" scales the whole image inside the target and pads with black,
+    mode="crop" scales it to cover the target and crops the centered overflow.
+    """
+    if mode not in FIT_MODES:
+        raise ValueError(f"Unknown fit mode: {mode} (expected one of {', '.join(FIT_MODES)})")
+    original_width, original_height = img.size
+
+    # Calculate the scaling factor to fit within (or cover) the target size
+    scale_width = target_size[0] / original_width
+    scale_height = target_size[1] / original_height
+    scale = max(scale_width, scale_height) if mode == "crop" else min(scale_width, scale_height)
+
+    # Calculate new dimensions
+    new_width = max(1, int(original_width * scale))
+    new_height = max(1, int(original_height * scale))
+
+    # Resize the image (reducing_gap lets Pillow use a fast integer reduce first)
+    resized_img = img.convert('RGB').resize((new_width, new_height), Image.Resampling.LANCZOS,
+                                            reducing_gap=REDUCING_GAP)
+
+    if mode == "crop":
+        left = (new_width - target_size[0]) // 2
+        top = (new_height - target_size[1]) // 2
+        return resized_img.crop((left, top, left + target_size[0], top + target_size[1]))
+
+    # Create a new image with the target size and paste the resized image centered
+    final_img = Image.new('RGB', target_size, (0, 0, 0))  # Black background
+    x_offset = (target_size[0] - new_width) // 2
+    y_offset = (target_size[1] - new_height) // 2
+    final_img.paste(resized_img, (x_offset, y_offset))
+    return final_img
+
+
+def resize_image(input_path, output_path, target_size=(1280, 720), mode="letterbox"):
     """
     Resize an image to the target size while maintaining aspect ratio
-    
+
     Args:
         input_path (str): Path to the input image
         output_path (str): Path to save the resized image
         target_size (tuple): Target size as (width, height)
+        mode (str): "letterbox" (pad with black) or "crop" (fill and crop)
     """
     try:
         # Open the image
-        with Image.open(input_path) as img:
-            # Get original dimensions
-            original_width, original_height = img.size
-            print(f"Original image size: {original_width}x{original_height}")
-            
-            # Calculate the scaling factor to fit within target size while maintaining aspect ratio
-            scale_width = target_size[0] / original_width
-            scale_height = target_size[1] / original_height
-            scale = min(scale_width, scale_height)
-            
-            # Calculate new dimensions
-            new_width = int(original_width * scale)
-            new_height = int(original_height * scale)
-            
-            print(f"Resizing to: {new_width}x{new_height}")
-            
-            # Resize the image
-            resized_img = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
-            
-            # Create a new image with the target size and paste the resized image centered
-            final_img = Image.new('RGB', target_size, (0, 0, 0))  # Black background
-            
-            # Calculate position to center the image
-            x_offset = (target_size[0] - new_width) // 2
-            y_offset = (target_size[1] - new_height) // 2
-            
-            # Paste the resized image onto the final image
-            final_img.paste(resized_img, (x_offset, y_offset))
-            
+        with open_for_sizes(input_path, [target_size]) as img:
+            print(f"Original image size: {img.size[0]}x{img.size[1]}")
+            final_img = fit_image(img, target_size, mode)
+
             # Save the final image
             final_img.save(output_path, 'JPEG', quality=95)
             print(f"Image saved to: {output_path}")
-            
+
     except Exception as e:
         print(f"Error processing image: {e}")
         return False
-    
+
     return True
 
+
+def output_name(input_path, target_size, mode="letterbox", keep_extension=False):
+    """
+    Output file name for a source image and a target size
+
+    keep_extension adds the source extension (photo_png_1280x720.jpg), for sources
+    that share a name with another image of the folder (photo.png and photo.jpg).
+    """
+    base_name, extension = os.path.splitext(os.path.basename(input_path))
+    if keep_extension:
+        base_name += "_" + extension.lstrip(".").lower()
+    suffix = "_crop" if mode == "crop" else ""
+    return f"{base_name}_{target_size[0]}x{target_size[1]}{suffix}.jpg"
+
+
+def process_source(input_path, target_sizes, output_dir, index, mode="letterbox", keep_extension=False):
+    """
+    Worker: resize one source to every target size it is still missing
+
+    index only needs the entries of this source's outputs (name -> source hash).
+    Returns (input_path, source_hash, [(output name, status)]) with status
+    'created', 'skipped' or an error message.
+    """
+    try:
+        source_hash = file_sha256(input_path)
+    except OSError as e:
+        return input_path, None, [(None, f"error: {e}")]
+
+    results = []
+    missing = []
+    for target_size in target_sizes:
+        name = output_name(input_path, target_size, mode, keep_extension)
+        if index.get(name) == source_hash and (Path(output_dir) / name).exists():
+            results.append((name, "skipped"))
+        else:
+            missing.append((name, target_size))
+
+    if missing:
+        try:
+            with open_for_sizes(input_path, [size for _, size in missing]) as img:
+                img.load()
+                for name, target_size in missing:
+                    temp_path = Path(output_dir) / f"{name}.tmp"
+                    fit_image(img, target_size, mode).save(temp_path, 'JPEG', quality=95)
+                    os.replace(temp_path, Path(output_dir) / name)
+                    results.append((name, "created"))
+        except Exception as e:
+            results.extend((name, f"error: {e}") for name, _ in missing)
+
+    return input_path, source_hash, results
+
+
+def load_index(output_dir):
+    try:
+        with open(Path(output_dir) / INDEX_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_index(output_dir, index):
+    index_path = Path(output_dir) / INDEX_FILE
+    temp_path = index_path.with_name(INDEX_FILE + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(temp_path, index_path)
+
+
+def find_images(directory):
+    """Image files in a directory (non recursive), sorted by name"""
+    return sorted(str(path) for path in Path(directory).iterdir()
+                  if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS)
+
+
+def resize_directory(input_dir, output_dir, target_sizes, workers=None, mode="letterbox"):
+    """
+    Resize every image of a folder to all target sizes on a process pool
+
+    Outputs whose (source hash, size) already exists are skipped, so running it
+    again on a growing folder only processes new or modified images.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    sources = find_images(input_dir)
+    if not sources:
+        print(f"No image file found in {input_dir}")
+        return True
+
+    index = load_index(output_dir)
+    created = skipped = failed = 0
+    print(f"Processing {len(sources)} image(s) to {', '.join(f'{w}x{h}' for w, h in target_sizes)}")
+
+    # Sources with the same name (photo.png, photo.jpg) keep their extension in the output name
+    stems = Counter(Path(source).stem for source in sources)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        for source in sources:
+            keep_extension = stems[Path(source).stem] > 1
+            names = (output_name(source, size, mode, keep_extension) for size in target_sizes)
+            # Only this source's entries are sent to the worker, not the whole index
+            entries = {name: index[name] for name in names if name in index}
+            futures.append(executor.submit(process_source, source, target_sizes, output_dir, entries, mode,
+                                           keep_extension))
+        for future in futures:
+            source, source_hash, results = future.result()
+            for name, status in results:
+                if status == "created":
+                    created += 1
+                    index[name] = source_hash
+                elif status == "skipped":
+                    skipped += 1
+                else:
+                    failed += 1
+                    print(f"❌ {source}: {status}")
+
+    save_index(output_dir, index)
+    print(f"✅ {created} created, {skipped} already up to date, {failed} failed -> {output_dir}")
+    return failed == 0
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resize images to the Sora sizes")
+    parser.add_argument("input", nargs="?",
+                        help="Image file or folder of images (default: first image in the current directory)")
+    parser.add_argument("--sizes", "-s", default=",".join(f"{w}x{h}" for w, h in DEFAULT_SIZES),
+                        help="Comma-separated target sizes, e.g. 1280x720,720x1280")
+    parser.add_argument("--output-dir", "-o", default=str(DEFAULT_OUTPUT_DIR),
+                        help="Output folder (default: input_reference/ next to this script)")
+    parser.add_argument("--fit", choices=FIT_MODES, default="letterbox",
+                        help="letterbox: pad with black bars, crop: fill the frame and crop (default: letterbox)")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="Number of worker processes for folders (default: CPU count)")
+    args = parser.parse_args()
+
+    target_sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+
     # Check if image path is provided as command line argument
-    if len(sys.argv) > 1:
-        input_image = sys.argv[1]
+    if args.input:
+        input_image = args.input
     else:
         # Look for common image files in current directory
-        image_extensions = ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.webp']
         input_image = None
-        
+
         for file in os.listdir('.'):
-            if any(file.lower().endswith(ext) for ext in image_extensions):
+            if any(file.lower().endswith(ext) for ext in IMAGE_EXTENSIONS):
                 input_image = file
                 break
-        
+
         if not input_image:
             print("No image file found. Please provide the path to the image as an argument:")
             print("python resize_image.py path/to/your/image.jpg")
             sys.exit(1)
-    
+
+    if os.path.isdir(input_image):
+        if not resize_directory(input_image, args.output_dir, target_sizes, args.workers, args.fit):
+            sys.exit(1)
+        sys.exit(0)
+
     # Ensure input_reference directory exists
-    output_dir = "/Users/recarnot/dev/Sora2/input_reference"
+    output_dir = args.output_dir
     os.makedirs(output_dir, exist_ok=True)
-    
-    # Generate output filename based on input filename
-    base_name = os.path.splitext(os.path.basename(input_image))[0]
-    output_image = os.path.join(output_dir, f"{base_name}_1280x720.jpg")
-    
+
     print(f"Processing image: {input_image}")
-    print(f"Output will be saved to: {output_image}")
-    
-    if resize_image(input_image, output_image):
+    success = True
+    for target_size in target_sizes:
+        # Generate output filename based on input filename
+        output_image = os.path.join(output_dir, output_name(input_image, target_size, args.fit))
+        print(f"Output will be saved to: {output_image}")
+        success = resize_image(input_image, output_image, target_size, args.fit) and success
+
+    if success:
         print("✅ Image resizing completed successfully!")
     else:
         print("❌ Failed to resize image.")
@@ -0,0 +1,1262 @@
+#!/usr/bin/env python3
+"""
+Bibliothèque cliente de l'API vidéo Sora2, utilisable dans un processus longue durée
+
+Chaque génération est décrite par un VideoJob (prompt, modèle, durée, taille, image
+de référence): aucun paramètre n'est lu dans l'environnement ni dans une variable
+globale. SoraClient regroupe ce qui est partagé entre les jobs (connexions
+keep-alive, poller des statuts, webhooks, base des jobs, caches, budget) et expose
+une API synchrone; AsyncSoraClient en est la variante asyncio.
+
+    with SoraClient(api_key, model="sora-2") as sora:
+        job = sora.run(VideoJob("Un chat joue du piano", duration="4"))
+        print(job.status, job.file_path)
+
+    async with AsyncSoraClient(api_key) as sora:
+        jobs = await asyncio.gather(*(sora.run(VideoJob(prompt)) for prompt in prompts))
+
+La bibliothèque ne demande jamais de confirmation et n'appelle jamais sys.exit:
+des paramètres invalides lèvent SoraError, l'issue d'une génération est portée
+par le job (status, error).
+"""
+
+import hashlib
+import itertools
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from api_client import ApiClient, API_BASE_URL, POOL_SIZE
+from generation_cache import GenerationCache, generation_key, file_sha256
+from governor import RateLimiter, SpendBudget, PRIORITIES, DEFAULT_PRIORITY, priority_name
+from job_store import JobStore
+from key_pool import KeyPool
+from output_store import OutputStore
+from moderation import PromptScreen, DEFAULT_SCREEN_MODE, SCREEN_MODES, SIMILARITY_THRESHOLD
+from poller import StatusPoller, POLL_TIMEOUT
+from reference_cache import ReferenceCache
+from sweep import estimate_cost
+from telemetry import EventLog, PhaseTracker
+from webhooks import WebhookListener
+
+# Paramètres par défaut d'une génération
+DEFAULT_MODEL = "sora-2-pro"
+DEFAULT_DURATION = "8"
+DEFAULT_SIZE = "1280x720"
+DEFAULT_FIT = "letterbox"
+VALID_MODELS = {"sora-2", "sora-2-pro"}
+VALID_DURATIONS = {"4", "8", "12"}
+
+# Formats d'image acceptés pour la référence
+IMAGE_MIME_TYPES = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png'}
+FIT_MODES = ("letterbox", "crop")
+
+# Configuration retry
+MAX_RETRIES = 3
+INITIAL_BACKOFF = 5  # secondes
+
+# Configuration du téléchargement
+OUTPUT_DIR = Path("output")
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024  # taille des lectures réseau, indépendante de l'affichage
+PROGRESS_INTERVAL = 0.5  # secondes minimum entre deux affichages de la progression
+PARALLEL_DOWNLOAD_SEGMENTS = 4
+PARALLEL_DOWNLOAD_MIN_SEGMENT = 8 * 1024 * 1024  # pas de découpage en dessous de 8 Mo par plage
+
+# Threads de soumission et de téléchargement
+SUBMIT_WORKERS = 4
+DOWNLOAD_WORKERS = 4
+
+# Sans webhook reçu après ce délai (secondes), la vidéo est suivie par polling
+WEBHOOK_FALLBACK_DELAY = 600
+
+# Issues d'un job qui ont produit une vidéo
+SUCCESS_STATUSES = ("downloaded", "cached")
+
+_job_keys = itertools.count(1)
+
+
+class SoraError(Exception):
+    """Paramètres de génération invalides ou client mal configuré"""
+
+
+def check_moderation_error(error_response):
+    """Détecte si l'erreur est liée à la modération"""
+    if not error_response:
+        return False
+
+    error_text = str(error_response).lower()
+    moderation_keywords = [
+        "moderation",
+        "content policy",
+        "violates",
+        "inappropriate",
+        "blocked",
+        "prohibited"
+    ]
+
+    return any(keyword in error_text for keyword in moderation_keywords)
+
+
+def compute_cache_key(prompt, job_params):
+    """Clé de cache d'une génération, image de référence identifiée par son contenu"""
+    reference_image_path = job_params.get("reference_image_path")
+    reference_sha256 = file_sha256(reference_image_path) if reference_image_path else None
+    return generation_key(prompt, job_params["model"], job_params["duration"],
+                          job_params["size"], reference_sha256)
+
+
+def is_fatal_status_error(error):
+    """Une erreur 4xx (hors 408/429) ne se corrigera pas en réessayant"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return False
+    return 400 <= response.status_code < 500 and response.status_code not in (408, 429)
+
+
+def new_download_stats():
+    """Compteurs de téléchargement partagés entre les tentatives d'une même vidéo"""
+    return {
+        "attempts": 0,
+        "bytes_transferred": 0,  # octets reçus du réseau, toutes tentatives confondues
+        "seconds": 0.0,
+        "resumed_bytes": 0,  # octets repris depuis des fichiers partiels
+        "preexisting_bytes": 0,  # octets partiels déjà présents avant la première tentative
+        "ttfb_seconds": None,  # temps jusqu'au premier octet reçu (première tentative qui en reçoit)
+    }
+
+
+def parse_content_range(value):
+    """Extrait (début, taille totale) d'un en-tête Content-Range ("bytes 0-99/1000")"""
+    if not value or not value.startswith("bytes "):
+        return None, None
+    byte_range, _, total = value[len("bytes "):].partition("/")
+    start = int(byte_range.split("-")[0]) if byte_range != "*" else None
+    return start, (int(total) if total.isdigit() else None)
+
+
+def split_byte_ranges(total_size, segments):
+    """Découpe [0, total_size) en `segments` plages contiguës (début, fin exclusive)"""
+    segment_size = -(-total_size // segments)
+    return [(start, min(start + segment_size, total_size))
+            for start in range(0, total_size, segment_size)]
+
+
+def stream_to_file(response, file_handle, hasher, on_bytes):
+    """Écrit une réponse en streaming dans un fichier ouvert; retourne le nombre d'octets"""
+    written = 0
+    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+        if chunk:
+            file_handle.write(chunk)
+            if hasher is not None:
+                hasher.update(chunk)
+            written += len(chunk)
+            on_bytes(len(chunk))
+    return written
+
+
+def hash_existing_file(path, hasher):
+    """Ajoute le contenu d'un fichier partiel déjà présent au hash"""
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+
+
+def _quiet(*args, **kwargs):
+    pass
+
+
+class VideoJob:
+    """
+    Une génération: ses paramètres et, une fois exécutée, son résultat
+
+    Les paramètres laissés à None prennent les valeurs par défaut du client.
+    Après exécution: video_id, status (downloaded, cached, held, rejected, failed,
+    timeout, error, download_failed, over_budget), error et file_info. screening
+    contient le motif du pré-filtrage de modération si le prompt a été signalé;
+    api_key le nom de la clé qui l'a soumis (pool de clés).
+    """
+
+    def __init__(self, prompt, model=None, duration=None, size=None, reference_image=None, fit=None,
+                 priority=None, use_cache=True, key=None, label=None):
+        self.prompt = prompt
+        self.model = model
+        self.duration = str(duration) if duration is not None else None
+        self.size = size
+        self.reference_image = reference_image
+        self.fit = fit
+        self.priority = PRIORITIES[DEFAULT_PRIORITY] if priority is None else priority
+        self.use_cache = use_cache
+        self.key = key if key is not None else next(_job_keys)
+        self.label = label or f"[job {self.key}]"
+
+        self.cache_key = None
+        self.screening = None
+        self.screened = False
+        self.upload = None  # image de référence prête à envoyer (voir SoraClient.load_reference)
+        self.video_id = None
+        self.api_key = None  # nom de la clé du pool qui a soumis la vidéo
+        self.previous_status = None  # statut enregistré avant une reprise
+        self.status = "pending"
+        self.error = None
+        self.result = None  # dernière réponse de statut de l'API
+        self.file_info = None
+        self.reserved_cost = 0.0
+        self.charged = False
+
+    @classmethod
+    def from_record(cls, record):
+        """Job déjà soumis, reconstruit depuis la base des jobs (reprise)"""
+        job = cls(record["prompt"], record["model"], record["duration"], record["size"],
+                  record.get("reference_image"), key=record["video_id"], label=f"[{record['video_id']}]")
+        job.video_id = record["video_id"]
+        job.previous_status = job.status = record["status"]
+        job.cache_key = record.get("cache_key")
+        job.api_key = record.get("api_key")
+        return job
+
+    @property
+    def params(self):
+        """Paramètres enregistrés avec chaque statut (base des jobs, journal des phases)"""
+        return {
+            "model": self.model,
+            "duration": self.duration,
+            "size": self.size,
+            "reference_image_path": self.reference_image,
+            "cache_key": self.cache_key,
+        }
+
+    @property
+    def ok(self):
+        return self.status in SUCCESS_STATUSES
+
+    @property
+    def file_path(self):
+        return (self.file_info or {}).get("file_path")
+
+    def __repr__(self):
+        return f"VideoJob({self.label} {self.status}, video_id={self.video_id})"
+
+
+class SoraClient:
+    """
+    Client synchrone: ressources partagées entre les jobs et étapes d'une génération
+
+    prepare() -> submit() -> wait() -> download(), ou run() pour l'ensemble.
+    Toutes les vidéos en cours sont suivies par un seul StatusPoller (réveillé par
+    les webhooks si webhook_port est donné). Le coût estimé de chaque soumission
+    est réservé sur le budget (USD, None = pas de plafond) pour toute la durée de
+    vie du client et rendu si la génération échoue. Avant la soumission, chaque
+    prompt passe par le pré-filtrage local (moderation.PromptScreen): prescreen
+    "hold" retient les prompts signalés, "flag" les signale seulement, "off" le
+    désactive. Utilisable depuis plusieurs threads; verbose=False supprime tous
+    les affichages, log remplace print. progress (par exemple dashboard.Dashboard)
+    reçoit update(job, état, **champs) à chaque étape et finish(job) à la fin.
+
+    api_keys (voir key_pool.load_api_keys) remplace api_key par un pool de clés:
+    les soumissions sont réparties entre elles et chaque vidéo est suivie et
+    téléchargée avec la clé qui l'a créée (nom enregistré dans la base des jobs).
+    """
+
+    def __init__(self, api_key=None, base_url=API_BASE_URL, model=DEFAULT_MODEL, duration=DEFAULT_DURATION,
+                 size=DEFAULT_SIZE, fit=DEFAULT_FIT, budget=None, rate_limits=None, pool_size=POOL_SIZE,
+                 download_segments=PARALLEL_DOWNLOAD_SEGMENTS, output_dir=OUTPUT_DIR,
+                 webhook_port=None, webhook_host="0.0.0.0", webhook_secret=None,
+                 webhook_fallback_delay=WEBHOOK_FALLBACK_DELAY, job_store=None, generation_cache=None,
+                 reference_cache=None, event_log=None, prescreen=DEFAULT_SCREEN_MODE, moderation_rules=(),
+                 similarity_threshold=SIMILARITY_THRESHOLD, output_store=None, api_keys=None, verbose=True,
+                 log=None, progress=None):
+        if not api_keys and (not api_key or api_key == "your_api_key_here"):
+            raise SoraError("clé API manquante")
+        if prescreen not in SCREEN_MODES:
+            raise SoraError(f"mode de pré-filtrage '{prescreen}' inconnu ({', '.join(SCREEN_MODES)})")
+        self.defaults = {"model": model, "duration": str(duration), "size": size, "fit": fit}
+        self.job_store = job_store if job_store is not None else JobStore()
+        self.key_pool = None
+        if api_keys:
+            self.key_pool = KeyPool(api_keys, base_url, pool_size=pool_size, lookup=self._stored_api_key)
+            self.api = self.key_pool
+        else:
+            self.api = ApiClient(api_key, base_url, pool_size=pool_size, rate_limiter=RateLimiter(rate_limits))
+        self.budget = SpendBudget(budget)
+        self.download_segments = download_segments
+        self.output_dir = Path(output_dir)
+        self.generation_cache = generation_cache if generation_cache is not None else GenerationCache(self.job_store)
+        self.reference_cache = reference_cache if reference_cache is not None else ReferenceCache()
+        self.output_store = (output_store if output_store is not None
+                             else OutputStore(self.job_store, self.output_dir))
+        self.phases = PhaseTracker(event_log if event_log is not None else EventLog())
+        self.prescreen = prescreen
+        self.screener = PromptScreen(self._rejection_history, moderation_rules, similarity_threshold)
+        self.log = log or (print if verbose else _quiet)
+        self.poller = StatusPoller(self.fetch_status, is_fatal=is_fatal_status_error, log=self.log)
+        self.webhook_port = webhook_port
+        self.webhook_host = webhook_host
+        self.webhook_secret = webhook_secret
+        self.webhook_fallback_delay = webhook_fallback_delay
+        self.listener = None
+        self.progress = progress
+        self._started = False
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Démarre le poller et l'écoute des webhooks (fait automatiquement au premier suivi)"""
+        with self._lock:
+            if self._started:
+                return self
+            self._started = True
+            freed = self.output_store.collect_temp()
+            if freed:
+                self.log(f"🧹 Fichiers temporaires abandonnés supprimés ({freed:,} bytes)")
+            self.poller.start()
+            if self.webhook_port:
+                self.listener = WebhookListener(lambda video_id, event_type: self.poller.poll_now(video_id),
+                                                self.webhook_host, self.webhook_port,
+                                                self.webhook_secret).start()
+                self.log(f"🪝 Webhooks attendus sur http://{self.webhook_host}:{self.listener.port}/webhook "
+                         f"(polling après {self.webhook_fallback_delay:.0f}s sans événement)")
+        return self
+
+    def close(self):
+        """Arrête le suivi (les vidéos encore suivies sont abandonnées) et ferme les connexions"""
+        with self._lock:
+            if self._started:
+                if self.listener:
+                    self.listener.stop()
+                self.poller.stop()
+        self.api.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # Préparation
+
+    def report(self, job, state, **fields):
+        """Transmet l'état d'un job au suivi de progression (s'il y en a un)"""
+        if self.progress is not None:
+            self.progress.update(job, state, **fields)
+
+    def report_finished(self, job):
+        if self.progress is not None:
+            self.progress.finish(job)
+
+    def prepare(self, job):
+        """Complète le job avec les valeurs par défaut du client et le valide (SoraError sinon)"""
+        job.model = job.model or self.defaults["model"]
+        job.duration = str(job.duration or self.defaults["duration"])
+        job.size = job.size or self.defaults["size"]
+        job.fit = job.fit or self.defaults["fit"]
+        if job.model not in VALID_MODELS:
+            raise SoraError(f"modèle '{job.model}' non supporté")
+        if job.duration not in VALID_DURATIONS:
+            raise SoraError(f"durée '{job.duration}' non supportée")
+        if job.fit not in ("none",) + FIT_MODES:
+            raise SoraError(f"mode d'adaptation '{job.fit}' non supporté")
+        # Une image introuvable sera signalée à son chargement
+        if job.cache_key is None and (not job.reference_image or Path(job.reference_image).is_file()):
+            job.cache_key = compute_cache_key(job.prompt, job.params)
+        return job
+
+    def lookup_cached(self, job):
+        """Réutilise une vidéo déjà générée avec exactement les mêmes paramètres (statut "cached")"""
+        entry = self.generation_cache.lookup(job.cache_key) if job.cache_key else None
+        if entry:
+            self.log(f"♻️  Vidéo déjà générée avec ces paramètres: {entry['file_path']}")
+            self.log(f"   Video ID: {entry['video_id']} (aucun appel API, utilisez --no-cache pour régénérer)")
+            job.video_id = entry["video_id"]
+            job.file_info = entry
+            job.status = "cached"
+            self.output_store.touch(entry["video_id"])
+            self.report(job, "cached")
+        return entry
+
+    def _stored_api_key(self, video_id):
+        """Nom de la clé qui a soumis une vidéo, d'après la base des jobs"""
+        return (self.job_store.get(video_id) or {}).get("api_key")
+
+    def _rejection_history(self):
+        """Prompts refusés par la modération dans l'historique de la base des jobs"""
+        return [(prompt, error) for prompt, error in self.job_store.rejected_prompts()
+                if check_moderation_error(error)]
+
+    def screen(self, job):
+        """
+        Pré-filtrage local du prompt (une seule fois par job)
+
+        Retourne le motif si un refus de modération est probable, None sinon.
+        En mode "hold", le job passe au statut "held" et ne sera pas soumis.
+        """
+        if self.prescreen == "off" or job.screened:
+            return job.screening
+        job.screened = True
+        job.screening = self.screener.check(job.prompt)
+        if job.screening:
+            reason = job.screening["reason"]
+            if self.prescreen == "hold":
+                job.status = "held"
+                job.error = f"refus de modération probable ({reason})"
+                self.log(f"🛡️  {job.label} Retenu avant soumission: refus de modération probable ({reason})")
+            else:
+                self.log(f"⚠️  {job.label} Refus de modération probable ({reason}), soumis quand même")
+        return job.screening
+
+    def load_reference(self, job):
+        """Valide (et adapte si besoin) l'image de référence du job; False si elle est inutilisable"""
+        job.upload = self.read_reference_image(job.reference_image, job.size or self.defaults["size"],
+                                               job.fit or self.defaults["fit"])
+        if job.upload is None:
+            job.status = "failed"
+            job.error = f"image de référence inutilisable: {job.reference_image}"
+            return False
+        return True
+
+    def read_reference_image(self, image_path, size, fit):
+        """Valide une image de référence et retourne sa description pour l'upload (ou None)"""
+        if not image_path:
+            return None
+
+        # Vérifier si c'est une URL
+        if image_path.startswith(('http://', 'https://')):
+            self.log("❌ Erreur: Les URLs ne sont pas supportées pour les images de référence")
+            self.log("   Veuillez placer votre image dans le répertoire 'input_reference/'")
+            return None
+
+        # Fichier local - vérifier qu'il est dans input_reference/
+        image_file = Path(image_path)
+        if not image_file.exists():
+            self.log(f"❌ Erreur: Le fichier image '{image_path}' n'existe pas")
+            return None
+
+        # Vérifier que le fichier est dans le répertoire input_reference/
+        try:
+            image_file_abs = image_file.resolve()
+            input_ref_dir = Path("input_reference").resolve()
+            if not str(image_file_abs).startswith(str(input_ref_dir)):
+                self.log(f"❌ Erreur: L'image doit être placée dans le répertoire 'input_reference/'")
+                self.log(f"   Chemin actuel: {image_file}")
+                self.log(f"   Répertoire requis: input_reference/")
+                return None
+        except Exception:
+            self.log(f"❌ Erreur: Impossible de vérifier le chemin de l'image")
+            return None
+
+        # Vérifier l'extension
+        valid_extensions = set(IMAGE_MIME_TYPES)
+        if image_file.suffix.lower() not in valid_extensions:
+            self.log(f"❌ Erreur: Format d'image non supporté. Formats supportés: {', '.join(valid_extensions)}")
+            return None
+
+        mime_type = IMAGE_MIME_TYPES[image_file.suffix.lower()]
+        expected_size = size  # Format "1280x720"
+        expected_width, expected_height = map(int, expected_size.split('x'))
+        needs_fit = False
+        try:
+            from PIL import Image
+            # Vérifier les dimensions de l'image (seul l'en-tête est lu, pas les pixels)
+            with Image.open(image_file) as img:
+                width, height = img.size
+                mime_type = Image.MIME.get(img.format, mime_type)
+
+                self.log(f"📏 Dimensions de l'image: {width}x{height}")
+                self.log(f"📏 Dimensions requises: {expected_width}x{expected_height}")
+
+                if width != expected_width or height != expected_height:
+                    if fit in FIT_MODES:
+                        needs_fit = True
+                    else:
+                        self.log(f"❌ Erreur: Les dimensions de l'image ne correspondent pas à SORA_SIZE={size}")
+                        self.log(f"   Image actuelle: {width}x{height}")
+                        self.log(f"   Attendu: {expected_width}x{expected_height}")
+                        self.log(f"   Veuillez redimensionner l'image, modifier SORA_SIZE ou utiliser SORA_REFERENCE_FIT=letterbox|crop")
+                        return None
+                else:
+                    self.log(f"✅ Dimensions de l'image correctes")
+        except ImportError:
+            self.log("⚠️  Attention: PIL/Pillow n'est pas installé. Impossible de vérifier les dimensions de l'image.")
+            self.log("   Installez avec: pip install Pillow")
+        except Exception as e:
+            self.log(f"⚠️  Attention: Impossible de vérifier les dimensions de l'image: {e}")
+
+        # Adapter l'image à la résolution demandée (une seule conversion par source/taille/mode)
+        upload_name = image_file.name
+        if needs_fit:
+            try:
+                fitted_file, created = self.reference_cache.get(image_file, (expected_width, expected_height), fit)
+            except Exception as e:
+                self.log(f"❌ Erreur lors de l'adaptation de l'image à {size}: {e}")
+                return None
+            origin = "créée" if created else "depuis le cache"
+            self.log(f"🪄 Image adaptée à {size} en mode {fit} ({origin}): {fitted_file}")
+            image_file = fitted_file
+            mime_type = "image/jpeg"
+            upload_name = f"{Path(upload_name).stem}_{size}.jpg"
+
+        # L'image n'est pas chargée en mémoire: elle sera streamée depuis le disque à l'envoi
+        try:
+            file_size = image_file.stat().st_size
+        except OSError as e:
+            self.log(f"❌ Erreur lors de la lecture du fichier image: {e}")
+            return None
+
+        self.log(f"✅ Image de référence prête ({file_size:,} bytes, {mime_type})")
+        return {
+            "path": str(image_file),
+            "filename": upload_name,
+            "mime_type": mime_type,
+            "size": file_size,
+        }
+
+    # Soumission
+
+    def release(self, job):
+        """Rend le coût réservé d'un job qui n'a pas été facturé"""
+        if job.reserved_cost and not job.charged:
+            self.budget.release(job.reserved_cost)
+            job.reserved_cost = 0.0
+
+    def submit(self, job):
+        """
+        Soumet la génération et retourne son video_id
+
+        None si le job n'a pas été soumis (budget atteint, image de référence
+        inutilisable, refus de modération, erreur de l'API): job.status et
+        job.error en donnent la raison.
+        """
+        self.prepare(job)
+        self.report(job, "submitting")
+        if self.screen(job) and self.prescreen == "hold":
+            self.report(job, job.status)
+            return None
+        cost = estimate_cost([job.params])
+        if not self.budget.reserve(cost):
+            self.log(f"💸 {job.label} Budget atteint ({self.budget.limit:.2f} $), job non soumis")
+            job.status = "over_budget"
+            job.error = "budget atteint"
+            self.report(job, job.status)
+            return None
+        job.reserved_cost = cost
+
+        if job.reference_image and job.upload is None and not self.load_reference(job):
+            self.log(f"❌ {job.label} Impossible de charger l'image de référence")
+            self.release(job)
+            return None
+
+        video_id = self._submit(job)
+        if not video_id:
+            self.release(job)
+        self.report(job, job.status)
+        return video_id
+
+    def _submit(self, job):
+        import requests  # déjà chargé par ApiClient
+        self.log("\nEnvoi de la requête à l'API...")
+
+        # Préparer les données pour multipart/form-data
+        data = {
+            "model": job.model,
+            "prompt": job.prompt,
+            "seconds": job.duration,
+            "size": job.size
+        }
+
+        upload = None
+
+        # Ajouter l'image de référence si fournie (streamée depuis le disque avec son vrai type MIME)
+        if job.upload:
+            upload = {
+                "field": "input_reference",
+                "path": job.upload["path"],
+                "filename": job.upload["filename"],
+                "mime_type": job.upload["mime_type"],
+            }
+
+        job.status = "failed"
+        submit_started = time.monotonic()
+        try:
+            response = self.api.submit(data, upload)
+            submit_seconds = time.monotonic() - submit_started
+
+            # Vérifier les erreurs de modération AVANT de facturer
+            if response.status_code == 400:
+                error_data = response.json() if response.text else {}
+                error_msg = error_data.get("error", {}).get("message", response.text)
+                job.error = error_msg
+
+                if check_moderation_error(error_msg):
+                    self._record_rejection(job, error_msg, submit_seconds)
+                    self.log("\n❌ ERREUR DE MODÉRATION:")
+                    self.log(f"   {error_msg}")
+                    self.log("\n💡 Suggestions:")
+                    self.log("   - Reformulez votre prompt pour éviter le contenu sensible")
+                    self.log("   - Évitez les descriptions violentes, sexuelles ou inappropriées")
+                    self.log("   - Utilisez un langage plus neutre et descriptif")
+                    self.log("\n⚠️  IMPORTANT: Vous n'avez PAS été débité car la requête a été rejetée avant la génération")
+                    return None
+                else:
+                    self.log(f"\n❌ Erreur de requête: {error_msg}")
+                    return None
+
+            response.raise_for_status()
+            result = response.json()
+            self.log(f"Réponse de l'API: {result}")
+
+            # L'API retourne un ID de vidéo
+            if "id" in result:
+                job.video_id = result["id"]
+                job.api_key = getattr(response, "api_key", None)
+                job.status = "queued"
+                self.log(f"\n✓ Tâche de génération créée: {job.video_id}")
+                self.log("⏳ La génération peut prendre quelques minutes...")
+
+                # Sauvegarder les métadonnées (avec la clé qui devra suivre la vidéo)
+                self.save(job, "queued", extra={"api_key": job.api_key} if job.api_key else None)
+                self.phases.submitted(job.video_id, job.params, submit_seconds, getattr(response, "retries", 0))
+                return job.video_id
+
+            job.error = f"format de réponse inattendu: {result}"
+            self.log("Format de réponse inattendu:", result)
+            return None
+
+        except requests.exceptions.RequestException as e:
+            job.error = str(e)
+            self.log(f"\n❌ Erreur lors de la requête API: {e}")
+            if hasattr(e, 'response') and e.response is not None:
+                try:
+                    error_data = e.response.json()
+                    error_msg = error_data.get("error", {}).get("message", e.response.text)
+                except:
+                    error_msg = e.response.text
+                self.log(f"   Détails: {error_msg}")
+
+                if check_moderation_error(error_msg):
+                    job.error = error_msg
+                    self._record_rejection(job, error_msg, time.monotonic() - submit_started)
+                    self.log("\n⚠️  Erreur de modération détectée - Vous n'avez pas été débité")
+            return None
+
+    def _record_rejection(self, job, error_msg, submit_seconds):
+        """Refus de modération à la soumission: journal des phases, base des refus et pré-filtre local"""
+        job.status = "rejected"
+        self.phases.rejected(job.params, submit_seconds, "submit", error_msg)
+        self.job_store.record_rejection(job.prompt, error_msg, job.model, job.size)
+        self.screener.add_rejection(job.prompt, error_msg)
+
+    def save(self, job, status, error=None, extra=None):
+        """Enregistre une transition de statut du job dans la base des jobs"""
+        self.job_store.record(
+            job.video_id,
+            status,
+            error=error,
+            extra=extra,
+            prompt=job.prompt,
+            model=job.model,
+            duration=job.duration,
+            size=job.size,
+            reference_image=job.reference_image,
+            cache_key=job.cache_key,
+        )
+
+    # Suivi
+
+    def fetch_status(self, video_id):
+        """Récupère le statut d'une vidéo auprès de l'API"""
+        response = self.api.get_status(video_id)
+        response.raise_for_status()
+        return response.json()
+
+    def track(self, job, on_done):
+        """Confie un job soumis au poller partagé; on_done(video_id, status, result) à la fin"""
+        self.start()
+        # Avec les webhooks, une nouvelle vidéo n'est interrogée que si son événement
+        # n'arrive pas à temps; une vidéo reprise est interrogée tout de suite (son
+        # webhook a pu être envoyé pendant l'interruption)
+        delay = self.webhook_fallback_delay if self.listener and not job.previous_status else 0
+        if self.key_pool:
+            self.key_pool.activate(job.video_id)
+        self.poller.track(job.video_id, on_done, on_update=self._status_logger(job), delay=delay)
+
+    def _status_logger(self, job):
+        """Retourne un callback on_update qui affiche le statut et sauvegarde ses changements"""
+        last_status = {"value": job.previous_status or "queued"}
+
+        def on_update(video_id, result, error):
+            if error is not None:
+                self.log(f"\n⚠️  [{video_id}] Erreur transitoire lors de la vérification du status: {error}")
+                self.phases.status_error(video_id)
+                return
+
+            status = result.get("status")
+            progress = result.get("progress", 0)
+            self.log(f"📊 [{video_id}] Status: {status} - Progression: {progress}%")
+            self.report(job, status, progress=progress)
+            if status not in ("completed", "failed"):
+                self.phases.status_changed(video_id, job.params, status)
+
+            # Mettre à jour les métadonnées uniquement quand le statut change
+            if status != last_status["value"] and status not in ("completed", "failed", "error"):
+                last_status["value"] = status
+                job.status = status
+                self.save(job, status)
+
+        return on_update
+
+    def finish_generation(self, job, status, result):
+        """Traite l'état terminal renvoyé par le poller; retourne True si la vidéo est prête"""
+        video_id = job.video_id
+        job.result = result
+        job.status = status
+        if self.key_pool:
+            self.key_pool.finished(video_id)
+        self.report(job, "failed" if status not in ("completed", "timeout", "error") else status)
+        if status == "completed":
+            job.charged = True  # facturée même si le téléchargement échoue
+            self.save(job, "completed")
+            self.phases.finished(video_id, job.params, "completed")
+            self.log(f"\n✅ [{video_id}] Vidéo générée avec succès!")
+            return True
+
+        if status == "timeout":
+            self.release(job)
+            job.error = f"la génération prend trop de temps (>{POLL_TIMEOUT}s)"
+            self.log(f"\n⏰ Timeout: La génération prend trop de temps (>{POLL_TIMEOUT}s)")
+            self.log(f"   Video ID: {video_id}")
+            self.log(f"   Vous pouvez reprendre le suivi plus tard avec: python generate.py resume {video_id}")
+            self.save(job, "timeout")
+            self.phases.finished(video_id, job.params, "timeout")
+            return False
+
+        error_info = (result or {}).get("error") or {}
+        error_msg = error_info.get("message", "Erreur inconnue")
+        job.error = error_msg
+
+        if status == "error":
+            # Le suivi a échoué (erreurs réseau répétées), la génération continue peut-être
+            self.release(job)
+            self.log(f"\n⚠️  [{video_id}] Impossible de suivre le status: {error_msg}")
+            self.save(job, "error", error=error_msg)
+            self.phases.finished(video_id, job.params, "error", error=error_msg)
+            self.log(f"\n💾 Métadonnées sauvegardées pour récupération: {self.job_store.db_path} ({video_id})")
+            self.log(f"   Reprise: python generate.py resume {video_id}")
+            return False
+
+        job.status = "failed"
+        moderated = check_moderation_error(error_msg)
+        if moderated:
+            job.charged = True  # un refus de la modération après génération est facturé
+        else:
+            self.release(job)
+        error_code = error_info.get("code", "")
+        self.log(f"\n❌ [{video_id}] Erreur lors de la génération:")
+        self.log(f"   Message: {error_msg}")
+        if error_code:
+            self.log(f"   Code: {error_code}")
+
+        # Sauvegarder l'erreur dans les métadonnées
+        self.save(job, "failed", error=error_msg)
+        self.phases.finished(video_id, job.params, "failed", error=error_msg, moderation=moderated)
+
+        if moderated:
+            self.screener.add_rejection(job.prompt, error_msg)
+            self.log("\n⚠️  ATTENTION: Vous avez été débité mais la vidéo a été rejetée par la modération")
+            self.log("   Contactez le support OpenAI pour un remboursement avec cet ID: " + video_id)
+
+        return False
+
+    def wait(self, job):
+        """Attend la fin de la génération d'un job soumis; retourne True si la vidéo est prête"""
+        done = threading.Event()
+        outcome = {}
+
+        def on_done(video_id, status, result):
+            outcome["status"] = status
+            outcome["result"] = result
+            done.set()
+
+        self.track(job, on_done)
+        done.wait()
+        return self.finish_generation(job, outcome["status"], outcome["result"])
+
+    # Téléchargement
+
+    def download(self, job, max_retries=MAX_RETRIES):
+        """Télécharge la vidéo avec retry en cas d'erreur réseau; retourne True si elle est sur disque"""
+        video_id = job.video_id
+        content_url = self.api.video_url(video_id, "content")
+        # Statistiques cumulées sur toutes les tentatives (les fichiers partiels sont repris)
+        download_stats = new_download_stats()
+
+        def on_progress(downloaded, total):
+            self.report(job, "downloading", downloaded=downloaded, total=total)
+
+        for attempt in range(max_retries):
+            try:
+                self.log(f"\n📥 Tentative de téléchargement {attempt + 1}/{max_retries}...")
+                self.report(job, "downloading", attempt=attempt + 1)
+
+                file_info = self.download_video(video_id, download_stats, on_progress)
+                if file_info:
+                    file_info["download_attempts"] = attempt + 1
+                    job.file_info = file_info
+                    job.status = "downloaded"
+                    self.report(job, "downloaded")
+                    # Avec sa cache_key, cet enregistrement est aussi l'entrée du cache des générations
+                    self.save(job, "downloaded", extra=file_info)
+                    self.phases.downloaded(video_id, job.params, file_info)
+                    evicted = self.output_store.enforce(keep=[video_id])
+                    if evicted:
+                        self.log(f"🗑️  {len(evicted)} vidéo(s) évincée(s) par les quotas du dossier de sortie")
+                    return True
+
+            except Exception as e:
+                wait_time = INITIAL_BACKOFF * (2 ** attempt)
+                if attempt < max_retries - 1:
+                    self.log(f"\n⚠️  Erreur: {e}")
+                    self.log(f"   Reprise du téléchargement dans {wait_time}s...")
+                    time.sleep(wait_time)
+                else:
+                    self.log(f"\n❌ Échec après {max_retries} tentatives")
+                    self.log(f"   Video ID: {video_id}")
+                    self.log(f"   URL: {content_url}")
+                    self.log(f"\n💡 Reprise automatique: python generate.py resume {video_id}")
+                    self.log(f"   Ou téléchargement manuel avec:")
+                    self.log(f"   curl -H 'Authorization: Bearer YOUR_API_KEY' '{content_url}' > output/{video_id}.mp4")
+                    job.status = "download_failed"
+                    job.error = str(e)
+                    self.report(job, "download_failed")
+                    self.save(job, "download_failed", error=str(e))
+                    self.phases.download_failed(video_id, job.params, str(e), max_retries)
+                    return False
+
+        return False
+
+    def download_video(self, video_id, download_stats=None, on_progress=None):
+        """
+        Télécharge la vidéo générée depuis l'API
+
+        Un fichier .tmp existant est repris avec une requête Range. Les gros fichiers
+        sont téléchargés en plusieurs plages parallèles (.tmp.0, .tmp.1, ...) puis
+        assemblés; le SHA256 est calculé au fil de l'écriture du fichier final.
+        on_progress(octets reçus, taille totale) est appelé à chaque bloc lu; la ligne
+        de progression n'est affichée qu'une fois par PROGRESS_INTERVAL.
+        Retourne les informations du fichier pour les métadonnées.
+        """
+        self.log("📥 Téléchargement de la vidéo...")
+        if download_stats is None:
+            download_stats = new_download_stats()
+        first_attempt = download_stats["attempts"] == 0
+        download_stats["attempts"] += 1
+
+        # Créer le dossier de sortie si nécessaire
+        output_dir = self.output_dir
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+        # Fichier temporaire stable pour pouvoir reprendre un téléchargement interrompu
+        temp_file = output_dir / f"video_{video_id}.mp4.tmp"
+        resume_from = temp_file.stat().st_size if temp_file.exists() else 0
+
+        lock = threading.Lock()
+        progress = {"downloaded": 0, "total": 0, "shown_at": 0.0}
+        segments = 1
+        started_at = time.monotonic()
+
+        def show_progress(force=False):
+            now = time.monotonic()
+            if progress["total"] > 0 and (force or now - progress["shown_at"] >= PROGRESS_INTERVAL):
+                progress["shown_at"] = now
+                percent = (progress["downloaded"] / progress["total"]) * 100
+                self.log(f"\r📥 Téléchargement: {percent:.1f}% ({progress['downloaded']}/{progress['total']} bytes)", end="", flush=True)
+
+        def on_bytes(count):
+            with lock:
+                if download_stats["ttfb_seconds"] is None:
+                    download_stats["ttfb_seconds"] = round(time.monotonic() - started_at, 3)
+                download_stats["bytes_transferred"] += count
+                progress["downloaded"] += count
+                show_progress()
+                if on_progress:
+                    on_progress(progress["downloaded"], progress["total"])
+
+        def on_resumed(count):
+            with lock:
+                download_stats["resumed_bytes"] += count
+                if first_attempt:
+                    download_stats["preexisting_bytes"] += count
+                progress["downloaded"] += count
+
+        try:
+            response = self.api.download(video_id, headers={"Range": f"bytes={resume_from}-"})
+
+            if response.status_code == 416:
+                # La plage demandée dépasse le fichier: le .tmp est complet ou invalide
+                _, total_size = parse_content_range(response.headers.get("Content-Range"))
+                response.close()
+                if total_size is None or total_size != resume_from:
+                    temp_file.unlink()
+                    raise Exception("Fichier partiel invalide, reprise depuis le début")
+                hasher = hashlib.sha256()
+                hash_existing_file(temp_file, hasher)
+                downloaded = total_size
+                on_resumed(resume_from)
+            else:
+                response.raise_for_status()
+
+                if response.status_code == 206:
+                    range_start, total_size = parse_content_range(response.headers.get("Content-Range"))
+                    if range_start != resume_from:
+                        response.close()
+                        temp_file.unlink()
+                        raise Exception("Plage renvoyée inattendue, reprise depuis le début")
+                else:
+                    # Le serveur a ignoré Range: on repart de zéro
+                    total_size = int(response.headers.get('content-length', 0)) or None
+                    resume_from = 0
+
+                supports_ranges = (response.status_code == 206
+                                   or response.headers.get("Accept-Ranges", "").lower() == "bytes")
+                segments = 1
+                if total_size and supports_ranges and resume_from == 0:
+                    segments = min(self.download_segments,
+                                   max(1, total_size // PARALLEL_DOWNLOAD_MIN_SEGMENT))
+                progress["total"] = total_size or 0
+
+                if segments > 1:
+                    response.close()
+                    downloaded, hasher = self._download_parallel(video_id, temp_file, total_size,
+                                                                 segments, on_bytes, on_resumed)
+                else:
+                    hasher = hashlib.sha256()
+                    if resume_from:
+                        self.log(f"↩️  Reprise à partir de {resume_from:,} bytes")
+                        hash_existing_file(temp_file, hasher)
+                        on_resumed(resume_from)
+
+                    # Télécharger dans un fichier temporaire
+                    with open(temp_file, "ab" if resume_from else "wb") as f:
+                        written = stream_to_file(response, f, hasher, on_bytes)
+                    downloaded = resume_from + written
+
+                show_progress(force=True)
+                self.log()  # Nouvelle ligne après la barre de progression
+
+                # Vérifier que le téléchargement est complet (le .tmp est conservé pour reprise)
+                if total_size and downloaded != total_size:
+                    raise Exception(f"Téléchargement incomplet: {downloaded}/{total_size} bytes")
+        finally:
+            download_stats["seconds"] += time.monotonic() - started_at
+
+        # Vérifier que le fichier n'est pas vide
+        if downloaded == 0:
+            temp_file.unlink()
+            raise Exception("Le fichier téléchargé est vide")
+
+        # Ranger le fichier à son chemin définitif (lien vers une vidéo identique déjà présente)
+        file_hash = hasher.hexdigest()
+        output_file, shared_with = self.output_store.commit(temp_file, video_id, file_hash)
+        transferred = download_stats["bytes_transferred"]
+        throughput = transferred / download_stats["seconds"] if download_stats["seconds"] > 0 else 0
+        # Octets reçus plus d'une fois (plages perdues puis re-téléchargées)
+        retried_bytes = max(0, transferred - (downloaded - download_stats["preexisting_bytes"]))
+
+        self.log(f"\n✅ Vidéo sauvegardée: {output_file}")
+        self.log(f"   Taille: {downloaded:,} bytes")
+        self.log(f"   SHA256: {file_hash[:16]}...")
+        if shared_with:
+            self.log(f"   Contenu identique à {shared_with}: lien physique, aucune copie")
+        self.log(f"   Débit: {throughput / 1_000_000:.2f} MB/s")
+
+        return {
+            "file_path": str(output_file),
+            "file_size": downloaded,
+            "sha256": file_hash,
+            "deduplicated": shared_with is not None,
+            "download_throughput_bps": int(throughput),
+            "download_seconds": round(download_stats["seconds"], 3),
+            "ttfb_seconds": download_stats["ttfb_seconds"],
+            "download_segments": segments,
+            "resumed_bytes": download_stats["resumed_bytes"],
+            "retried_bytes": retried_bytes,
+        }
+
+    def _download_range(self, video_id, part_file, start, end, on_bytes):
+        """Télécharge la plage [start, end) dans part_file en reprenant ce qui existe déjà"""
+        expected = end - start
+        have = part_file.stat().st_size if part_file.exists() else 0
+        if have > expected:
+            part_file.unlink()
+            have = 0
+        if have == expected:
+            return 0
+
+        response = self.api.download(video_id, headers={"Range": f"bytes={start + have}-{end - 1}"})
+        response.raise_for_status()
+        if response.status_code != 206:
+            response.close()
+            raise Exception("Le serveur ne supporte plus les requêtes Range")
+
+        with open(part_file, "ab") as f:
+            written = stream_to_file(response, f, None, on_bytes)
+
+        if have + written != expected:
+            raise Exception(f"Plage incomplète: {have + written}/{expected} bytes")
+        return written
+
+    def _download_parallel(self, video_id, temp_file, total_size, segments, on_bytes, on_resumed):
+        """Télécharge un fichier en plages parallèles puis les assemble dans temp_file"""
+        ranges = split_byte_ranges(total_size, segments)
+        part_files = [temp_file.with_name(f"{temp_file.name}.{index}") for index in range(len(ranges))]
+        self.log(f"⚡ Téléchargement parallèle en {len(ranges)} plages")
+
+        resumed = sum(min(part.stat().st_size, end - start)
+                      for part, (start, end) in zip(part_files, ranges) if part.exists())
+        if resumed:
+            self.log(f"↩️  Reprise de {resumed:,} bytes déjà téléchargés")
+            on_resumed(resumed)
+
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="range") as executor:
+            futures = [executor.submit(self._download_range, video_id, part, start, end, on_bytes)
+                       for part, (start, end) in zip(part_files, ranges)]
+            for future in futures:
+                future.result()
+
+        # Assembler les plages en un seul passage, en calculant le hash au fil de l'eau
+        hasher = hashlib.sha256()
+        downloaded = 0
+        with open(temp_file, "wb") as out:
+            for part in part_files:
+                with open(part, "rb") as f:
+                    for block in iter(lambda: f.read(1024 * 1024), b""):
+                        out.write(block)
+                        hasher.update(block)
+                        downloaded += len(block)
+
+        for part in part_files:
+            part.unlink()
+
+        return downloaded, hasher
+
+    # Enchaînement complet
+
+    def run(self, job):
+        """Génère et télécharge une vidéo (ou la reprend du cache, ou reprend son suivi); retourne le job"""
+        try:
+            if job.video_id is None:
+                self.prepare(job)
+                if job.use_cache and self.lookup_cached(job):
+                    return job
+                if not self.submit(job):
+                    return job
+            if self.wait(job):
+                self.download(job)
+            return job
+        finally:
+            self.report_finished(job)
+
+    def run_many(self, jobs, concurrency=4, download_workers=DOWNLOAD_WORKERS):
+        """Exécute des jobs avec au plus `concurrency` générations en vol; retourne {clé: succès}"""
+        return BatchPipeline(self, concurrency, download_workers).run(jobs)
+
+
+class BatchPipeline:
+    """
+    Exécution d'un lot de jobs: soumissions bornées, poller partagé et pool de téléchargement
+
+    Au plus `concurrency` jobs sont en vol (soumis mais pas encore téléchargés).
+    Les jobs en attente forment une file de priorité: quand un slot se libère,
+    le job le plus urgent part en premier (ordre d'ajout à priorité égale).
+    Les vidéos terminées sont confiées directement au pool de téléchargement.
+    Un job qui a déjà un video_id (reprise) est seulement suivi et téléchargé.
+    Avec keep_open, run() attend les jobs ajoutés par add() jusqu'à close();
+    on_finish(job) est appelé à la fin de chaque job.
+    """
+
+    def __init__(self, sora, concurrency=4, download_workers=DOWNLOAD_WORKERS, keep_open=False,
+                 on_finish=None):
+        self.sora = sora
+        self.slots = threading.Semaphore(concurrency)
+        self.queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self.submitters = ThreadPoolExecutor(max_workers=min(concurrency, SUBMIT_WORKERS),
+                                             thread_name_prefix="submit")
+        self.downloaders = ThreadPoolExecutor(max_workers=download_workers,
+                                              thread_name_prefix="download")
+        self.results = {}
+        self.over_budget = []
+        self.on_finish = on_finish
+        self._lock = threading.Lock()
+        self._remaining = 0
+        self._open = keep_open
+
+    def add(self, job):
+        """Ajoute un job à la file; il passe devant les jobs en attente moins prioritaires"""
+        with self._lock:
+            self._remaining += 1
+        self.sora.report(job, "pending")
+        self.queue.put((job.priority, next(self._sequence), job))
+
+    def close(self):
+        """N'attend plus de nouveaux jobs: run() se termine après ceux en cours"""
+        with self._lock:
+            self._open = False
+            if self._remaining == 0:
+                self.queue.put((float("inf"), next(self._sequence), None))
+
+    def run(self, jobs):
+        """Exécute tous les jobs (et ceux ajoutés entre-temps) et retourne {clé du job: succès}"""
+        for job in jobs:
+            self.add(job)
+        if not self._remaining and not self._open:
+            return self.results
+
+        self.sora.start()
+        try:
+            while True:
+                # Le job est choisi au moment où un slot se libère, pas avant
+                self.slots.acquire()
+                _, _, job = self.queue.get()
+                if job is None:
+                    break
+                self.submitters.submit(self._start_job, job)
+        finally:
+            self.submitters.shutdown(wait=True)
+            self.downloaders.shutdown(wait=True)
+
+        return self.results
+
+    def _start_job(self, job):
+        log = self.sora.log
+        try:
+            if job.video_id:
+                # Vidéo déjà soumise (reprise): on se rattache directement au poller
+                log(f"\n🔁 {job.label} Reprise du suivi (statut précédent: {job.previous_status})")
+                self.sora.report(job, job.previous_status or "queued")
+            else:
+                log(f"\n▶️  {job.label} Démarrage (priorité {priority_name(job.priority)}): "
+                    f"{job.prompt[:60]}...")
+                if not self.sora.submit(job):
+                    self._finish(job)
+                    return
+
+            self.sora.track(job, lambda video_id, status, result: self._on_generation_done(job, status, result))
+        except Exception as e:
+            log(f"❌ {job.label} Erreur inattendue: {e}")
+            job.error = str(e)
+            self._finish(job)
+
+    def _on_generation_done(self, job, status, result):
+        try:
+            ready = self.sora.finish_generation(job, status, result)
+        except Exception as e:
+            self.sora.log(f"❌ {job.label} Erreur inattendue: {e}")
+            ready = False
+
+        if ready:
+            self.downloaders.submit(self._download, job)
+        else:
+            self._finish(job)
+
+    def _download(self, job):
+        try:
+            self.sora.download(job)
+        except Exception as e:
+            self.sora.log(f"❌ {job.label} Erreur inattendue: {e}")
+            job.status = "download_failed"
+        finally:
+            self.sora.phases.discard(job.video_id)
+        self._finish(job)
+
+    def _finish(self, job):
+        self.sora.log(f"{'✅' if job.ok else '❌'} {job.label} Terminé")
+        self.sora.report_finished(job)
+        if not job.ok:
+            self.sora.release(job)
+        if self.on_finish is not None:
+            try:
+                self.on_finish(job)
+            except Exception as e:
+                self.sora.log(f"❌ {job.label} Erreur inattendue: {e}")
+        with self._lock:
+            self.results[job.key] = job.ok
+            if job.status == "over_budget":
+                self.over_budget.append(job.key)
+            self._remaining -= 1
+            if self._remaining == 0 and not self._open:
+                self.queue.put((float("inf"), next(self._sequence), None))
+        self.slots.release()
+
+
+def _resolve(future, value):
+    if not future.done():
+        future.set_result(value)
+
+
+async def _in_thread(function, *args):
+    # asyncio n'est chargé que par AsyncSoraClient (démarrage rapide des commandes de consultation)
+    import asyncio
+    return await asyncio.to_thread(function, *args)
+
+
+class AsyncSoraClient:
+    """
+    Variante asyncio de SoraClient, pour des milliers de jobs sur une seule boucle d'événements
+
+    Les appels bloquants (soumission, téléchargement) passent par asyncio.to_thread,
+    bornés par des sémaphores; l'attente d'une génération n'occupe aucun thread:
+    le poller partagé (ou un webhook) résout directement le Future du job.
+    Les autres arguments sont ceux de SoraClient.
+    """
+
+    def __init__(self, *args, submit_concurrency=SUBMIT_WORKERS, download_concurrency=DOWNLOAD_WORKERS,
+                 **kwargs):
+        import asyncio
+        self.sync = SoraClient(*args, **kwargs)
+        self._submit_slots = asyncio.Semaphore(submit_concurrency)
+        self._download_slots = asyncio.Semaphore(download_concurrency)
+
+    async def close(self):
+        await _in_thread(self.sync.close)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def submit(self, job):
+        async with self._submit_slots:
+            return await _in_thread(self.sync.submit, job)
+
+    async def wait(self, job):
+        import asyncio
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def on_done(video_id, status, result):
+            loop.call_soon_threadsafe(_resolve, future, (status, result))
+
+        self.sync.track(job, on_done)
+        status, result = await future
+        return await _in_thread(self.sync.finish_generation, job, status, result)
+
+    async def download(self, job):
+        async with self._download_slots:
+            return await _in_thread(self.sync.download, job)
+
+    async def run(self, job):
+        """Comme SoraClient.run: génère et télécharge une vidéo; retourne le job"""
+        try:
+            if job.video_id is None:
+                # prepare() lit l'image de référence pour la clé de cache
+                await _in_thread(self.sync.prepare, job)
+                if job.use_cache and await _in_thread(self.sync.lookup_cached, job):
+                    return job
+                if not await self.submit(job):
+                    return job
+            if await self.wait(job):
+                await self.download(job)
+            return job
+        finally:
+            self.sync.report_finished(job)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Matrices de prompts: templates, expansion d'un sweep et estimation du coût
+"""
+
+import heapq
+import itertools
+import json
+import re
+from pathlib import Path
+
+# Variables de template: {{ nom }}
+TEMPLATE_VARIABLE = re.compile(r"\{\{\s*([A-Za-z_][A-Za-z0-9_]*)\s*\}\}")
+
+# Résolution d'une vidéo: <largeur>x<hauteur>
+SIZE_PATTERN = re.compile(r"^\d+x\d+$")
+
+# Tarifs publics par seconde de vidéo (USD); les résolutions non listées prennent "default"
+PRICING = {
+    "sora-2": {"default": 0.10},
+    "sora-2-pro": {"default": 0.30, "1024x1792": 0.50, "1792x1024": 0.50},
+}
+
+# Temps de génération estimé par seconde de vidéo quand l'historique est vide (secondes)
+DEFAULT_GENERATION_SECONDS_PER_VIDEO_SECOND = {"sora-2": 10, "sora-2-pro": 25}
+
+
+class SweepError(ValueError):
+    """Spécification de sweep ou template invalide"""
+
+
+def clean_prompt(content):
+    """Retire les titres markdown et lignes vides d'un prompt (même règle que prompt.md)"""
+    lines = [line for line in content.strip().split("\n") if line.strip() and not line.startswith("#")]
+    return "\n".join(lines)
+
+
+def template_variables(template):
+    """Noms des variables utilisées par un template"""
+    return set(TEMPLATE_VARIABLE.findall(template))
+
+
+def render_template(template, variables):
+    """Remplace les {{ variables }}; une variable non définie est une erreur"""
+    missing = template_variables(template) - set(variables)
+    if missing:
+        raise SweepError(f"Variable(s) non définie(s) dans le prompt: {', '.join(sorted(missing))}")
+    return TEMPLATE_VARIABLE.sub(lambda match: str(variables[match.group(1)]), template)
+
+
+def _as_list(value, default):
+    if value is None:
+        return [default]
+    return value if isinstance(value, list) else [value]
+
+
+def load_prompt_source(source, base_dir):
+    """Un prompt du sweep: chemin vers un fichier .md/.txt ou texte inline"""
+    path = Path(base_dir) / source
+    if path.suffix.lower() in (".md", ".txt") and path.is_file():
+        return clean_prompt(path.read_text(encoding="utf-8")), str(source)
+    return clean_prompt(source), None
+
+
+def expand_sweep(spec, defaults, base_dir="."):
+    """
+    Produit cartésien prompts × variables × modèles × durées × tailles × images
+
+    spec est un dict (fichier JSON): prompts, variables, models, seconds, sizes,
+    reference_images, fit et priority, tous optionnels sauf prompts. Retourne des jobs au
+    même format que ceux d'un manifeste batch.
+    """
+    if not isinstance(spec, dict):
+        raise SweepError("Le sweep doit être un objet JSON (prompts, variables, models...)")
+    if not spec.get("prompts"):
+        raise SweepError("Le sweep doit définir au moins un prompt ('prompts')")
+
+    prompts = [load_prompt_source(source, base_dir) for source in _as_list(spec["prompts"], None)]
+    variables = spec.get("variables") or {}
+    variable_names = sorted(variables)
+    variable_values = [_as_list(variables[name], None) for name in variable_names]
+    sizes = _as_list(spec.get("sizes"), defaults["size"])
+    invalid_sizes = [str(size) for size in sizes if not SIZE_PATTERN.fullmatch(str(size))]
+    if invalid_sizes:
+        raise SweepError(f"Taille(s) invalide(s), format attendu 1280x720: {', '.join(invalid_sizes)}")
+
+    axes = itertools.product(
+        prompts,
+        itertools.product(*variable_values),
+        _as_list(spec.get("models"), defaults["model"]),
+        [str(seconds) for seconds in _as_list(spec.get("seconds"), defaults["duration"])],
+        sizes,
+        _as_list(spec.get("reference_images"), None),
+    )
+
+    jobs = []
+    for index, ((template, prompt_file), values, model, duration, size, reference_image) in enumerate(axes, start=1):
+        job_variables = dict(zip(variable_names, values))
+        jobs.append({
+            "line": index,
+            "key": index,
+            "label": f"[#{index}]",
+            "prompt": render_template(template, job_variables),
+            "model": model,
+            "duration": duration,
+            "size": size,
+            "reference_image": reference_image,
+            "fit": spec.get("fit"),
+            "priority": spec.get("priority"),
+            "variables": job_variables,
+            "prompt_file": prompt_file,
+        })
+    return jobs
+
+
+def load_sweep(sweep_path, defaults):
+    """Lit un fichier de sweep JSON et l'expanse en jobs"""
+    sweep_file = Path(sweep_path)
+    with open(sweep_file, "r", encoding="utf-8") as f:
+        try:
+            spec = json.load(f)
+        except json.JSONDecodeError as e:
+            raise SweepError(f"JSON invalide: {e}")
+    return expand_sweep(spec, defaults, base_dir=sweep_file.parent)
+
+
+def price_per_second(model, size):
+    prices = PRICING.get(model, {})
+    return prices.get(size, prices.get("default", 0.0))
+
+
+def estimate_cost(jobs):
+    """Coût estimé (USD) d'une liste de jobs"""
+    return sum(price_per_second(job["model"], job["size"]) * int(job["duration"]) for job in jobs)
+
+
+def estimate_duration(jobs, concurrency, history=None):
+    """
+    Durée totale estimée (secondes) en planifiant les jobs sur `concurrency` slots
+
+    history: {(model, size, durée): secondes moyennes observées} issu de la base des
+    jobs; à défaut on utilise DEFAULT_GENERATION_SECONDS_PER_VIDEO_SECOND.
+    """
+    history = history or {}
+    durations = []
+    for job in jobs:
+        observed = history.get((job["model"], job["size"], str(job["duration"])))
+        if observed is None:
+            per_second = DEFAULT_GENERATION_SECONDS_PER_VIDEO_SECOND.get(job["model"], 25)
+            observed = per_second * int(job["duration"])
+        durations.append(observed)
+
+    # Le plus long d'abord sur le slot qui se libère le plus tôt
+    slots = [0.0] * max(1, min(concurrency, len(durations) or 1))
+    for duration in sorted(durations, reverse=True):
+        heapq.heappush(slots, heapq.heappop(slots) + duration)
+    return max(slots) if durations else 0.0
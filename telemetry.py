@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Mesures par phase des générations: journal JSONL, export Prometheus et percentiles
+"""
+
+import json
+import threading
+import time
+from pathlib import Path
+
+EVENTS_FILE = Path("metadata") / "events.jsonl"
+
+LABELS = ("model", "size")
+
+# Histogrammes exportés: nom -> (événement, champ mesuré, description, bornes des buckets)
+HISTOGRAMS = {
+    "sora_submit_seconds": (
+        "submitted", "submit_seconds", "Durée de la requête de soumission",
+        (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+    "sora_queued_seconds": (
+        "generation_started", "queued_seconds", "Temps passé en file d'attente (queued)",
+        (1, 5, 10, 30, 60, 120, 300, 600, 1800)),
+    "sora_generation_seconds": (
+        "generation_finished", "generation_seconds", "Durée entre la soumission et la fin de la génération",
+        (30, 60, 120, 180, 300, 600, 900, 1800, 3600)),
+    "sora_download_ttfb_seconds": (
+        "downloaded", "ttfb_seconds", "Temps jusqu'au premier octet du téléchargement",
+        (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)),
+    "sora_download_seconds": (
+        "downloaded", "download_seconds", "Durée du téléchargement",
+        (1, 2.5, 5, 10, 30, 60, 120, 300)),
+    "sora_download_throughput_bytes_per_second": (
+        "downloaded", "throughput_bps", "Débit de téléchargement",
+        (1e6, 5e6, 10e6, 25e6, 50e6, 100e6, 250e6)),
+}
+
+# Colonnes de la commande stats: titre -> (événement, champ, facteur d'affichage)
+SUMMARY_COLUMNS = {
+    "soumission (s)": ("submitted", "submit_seconds", 1),
+    "queued (s)": ("generation_started", "queued_seconds", 1),
+    "génération (s)": ("generation_finished", "generation_seconds", 1),
+    "1er octet (s)": ("downloaded", "ttfb_seconds", 1),
+    "débit (Mo/s)": ("downloaded", "throughput_bps", 1e-6),
+}
+
+
+class EventLog:
+    """Journal d'événements JSON lines, une ligne par événement (ajout seulement)"""
+
+    def __init__(self, path=EVENTS_FILE):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def record(self, event, video_id=None, **fields):
+        entry = {"ts": round(time.time(), 3), "event": event, "video_id": video_id}
+        entry.update((key, value) for key, value in fields.items() if value is not None)
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def read(self, since=None):
+        """Itère sur les événements (les lignes illisibles sont ignorées)"""
+        try:
+            f = open(self.path, "r", encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if since is None or entry.get("ts", 0) >= since:
+                    yield entry
+
+
+class PhaseTracker:
+    """
+    Chronomètre les phases de chaque vidéo et les écrit dans le journal
+
+    submitted -> generation_started (premier statut après queued) ->
+    generation_finished -> downloaded / download_failed. Les paramètres du job
+    (modèle, taille, durée) sont ajoutés à chaque événement pour l'agrégation.
+    """
+
+    def __init__(self, log):
+        self.log = log
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _labels(job_params):
+        job_params = job_params or {}
+        return {"model": job_params.get("model"), "size": job_params.get("size"),
+                "duration": job_params.get("duration")}
+
+    def _state(self, video_id):
+        with self._lock:
+            return self._jobs.setdefault(video_id, {"submitted_at": None, "started_at": None,
+                                                    "status_errors": 0})
+
+    def submitted(self, video_id, job_params, submit_seconds, retries=0):
+        self._state(video_id)["submitted_at"] = time.time()
+        self.log.record("submitted", video_id, submit_seconds=round(submit_seconds, 3),
+                        retries=retries, **self._labels(job_params))
+
+    def resumed(self, video_id, job_params, submitted_at=None):
+        """Vidéo reprise d'une exécution précédente: on repart de sa date de création"""
+        state = self._state(video_id)
+        state["submitted_at"] = submitted_at
+        self.log.record("resumed", video_id, **self._labels(job_params))
+
+    def rejected(self, job_params, submit_seconds, stage, message):
+        """Refus de modération (à la soumission, avant tout video_id)"""
+        self.log.record("moderation_rejected", None, stage=stage, error=message,
+                        submit_seconds=round(submit_seconds, 3), **self._labels(job_params))
+
+    def status_changed(self, video_id, job_params, status):
+        state = self._state(video_id)
+        if status == "queued" or state["started_at"] is not None:
+            return
+        now = time.time()
+        state["started_at"] = now
+        queued = now - state["submitted_at"] if state["submitted_at"] else None
+        self.log.record("generation_started", video_id, status=status,
+                        queued_seconds=round(queued, 3) if queued is not None else None,
+                        **self._labels(job_params))
+
+    def status_error(self, video_id):
+        state = self._state(video_id)
+        with self._lock:
+            state["status_errors"] += 1
+
+    def finished(self, video_id, job_params, status, error=None, moderation=False):
+        if status == "completed":
+            # Passée directement de queued à completed entre deux interrogations
+            self.status_changed(video_id, job_params, status)
+        state = self._state(video_id)
+        generation = time.time() - state["submitted_at"] if state["submitted_at"] else None
+        self.log.record("generation_finished", video_id, status=status, error=error,
+                        moderation_rejected=moderation or None,
+                        generation_seconds=round(generation, 3) if generation is not None else None,
+                        status_errors=state["status_errors"], **self._labels(job_params))
+        if status != "completed":
+            # Pas de téléchargement à suivre: l'état du job n'est plus utile
+            self.discard(video_id)
+
+    def downloaded(self, video_id, job_params, file_info):
+        self.log.record("downloaded", video_id,
+                        bytes=file_info.get("file_size"),
+                        ttfb_seconds=file_info.get("ttfb_seconds"),
+                        download_seconds=file_info.get("download_seconds"),
+                        throughput_bps=file_info.get("download_throughput_bps"),
+                        attempts=file_info.get("download_attempts"),
+                        retried_bytes=file_info.get("retried_bytes"),
+                        **self._labels(job_params))
+        self.discard(video_id)
+
+    def download_failed(self, video_id, job_params, error, attempts):
+        self.log.record("download_failed", video_id, error=error, attempts=attempts,
+                        **self._labels(job_params))
+        self.discard(video_id)
+
+    def discard(self, video_id):
+        """Oublie l'état d'une vidéo (fin de suivi, y compris sur erreur inattendue)"""
+        with self._lock:
+            self._jobs.pop(video_id, None)
+
+
+def percentile(values, fraction):
+    """Percentile par interpolation linéaire (values non vide)"""
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def summarize(events):
+    """
+    Agrège les événements par (modèle, taille)
+
+    Retourne {(modèle, taille): {"values": {colonne: [mesures]}, "jobs": n,
+    "moderation": n, "retries": n, "failed": n}}.
+    """
+    groups = {}
+    for entry in events:
+        key = (entry.get("model") or "?", entry.get("size") or "?")
+        group = groups.setdefault(key, {"values": {column: [] for column in SUMMARY_COLUMNS},
+                                        "jobs": 0, "moderation": 0, "retries": 0, "failed": 0})
+        event = entry.get("event")
+        if event == "submitted":
+            group["jobs"] += 1
+            group["retries"] += entry.get("retries", 0)
+        elif event == "moderation_rejected" or entry.get("moderation_rejected"):
+            group["moderation"] += 1
+        if event == "generation_finished" and entry.get("status") != "completed":
+            group["failed"] += 1
+        if event == "generation_finished":
+            group["retries"] += entry.get("status_errors", 0)
+        if event == "downloaded":
+            group["retries"] += max(0, entry.get("attempts", 1) - 1)
+
+        for column, (column_event, field, factor) in SUMMARY_COLUMNS.items():
+            if event == column_event and entry.get(field) is not None:
+                if event != "generation_finished" or entry.get("status") == "completed":
+                    group["values"][column].append(entry[field] * factor)
+    return groups
+
+
+def _format_labels(labels):
+    return ",".join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def prometheus_text(events):
+    """Export au format texte Prometheus (histogrammes et compteurs cumulés depuis le début du journal)"""
+    histograms = {name: {} for name in HISTOGRAMS}
+    counters = {"sora_jobs_total": {}, "sora_moderation_rejections_total": {}, "sora_retries_total": {}}
+
+    def increment(metric, labels, amount=1):
+        key = tuple(sorted(labels.items()))
+        counters[metric][key] = counters[metric].get(key, 0) + amount
+
+    for entry in events:
+        labels = {label: entry.get(label) or "unknown" for label in LABELS}
+        event = entry.get("event")
+        # Chaque job est compté une seule fois, sur son événement terminal: fin de
+        # génération en échec, ou résultat du téléchargement d'une vidéo générée
+        if event == "generation_finished" and entry.get("status") != "completed":
+            increment("sora_jobs_total", dict(labels, status=entry.get("status")))
+        elif event in ("downloaded", "download_failed"):
+            increment("sora_jobs_total", dict(labels, status=event))
+        if event == "moderation_rejected":
+            increment("sora_moderation_rejections_total", dict(labels, stage=entry.get("stage", "submit")))
+        elif entry.get("moderation_rejected"):
+            increment("sora_moderation_rejections_total", dict(labels, stage="generation"))
+        retries = (entry.get("retries", 0) + entry.get("status_errors", 0)
+                   + (max(0, entry.get("attempts", 1) - 1) if event == "downloaded" else 0))
+        if retries:
+            increment("sora_retries_total", labels, retries)
+
+        for name, (metric_event, field, _, buckets) in HISTOGRAMS.items():
+            value = entry.get(field)
+            if event != metric_event or value is None:
+                continue
+            series = histograms[name].setdefault(tuple(labels.items()),
+                                                 {"buckets": [0] * len(buckets), "sum": 0.0, "count": 0})
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    series["buckets"][index] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    lines = []
+    for name, (_, _, description, buckets) in HISTOGRAMS.items():
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+        for labels, series in sorted(histograms[name].items()):
+            labels = dict(labels)
+            for bound, count in zip(buckets, series["buckets"]):
+                lines.append(f'{name}_bucket{{{_format_labels(dict(labels, le=f"{bound:g}"))}}} {count}')
+            lines.append(f'{name}_bucket{{{_format_labels(dict(labels, le="+Inf"))}}} {series["count"]}')
+            lines.append(f"{name}_sum{{{_format_labels(labels)}}} {series['sum']:.6g}")
+            lines.append(f"{name}_count{{{_format_labels(labels)}}} {series['count']}")
+
+    descriptions = {
+        "sora_jobs_total": "Jobs terminés par statut",
+        "sora_moderation_rejections_total": "Refus de modération",
+        "sora_retries_total": "Requêtes rejouées (soumission, statut, téléchargement)",
+    }
+    for name, values in counters.items():
+        lines.append(f"# HELP {name} {descriptions[name]}")
+        lines.append(f"# TYPE {name} counter")
+        for labels, value in sorted(values.items()):
+            lines.append(f"{name}{{{_format_labels(dict(labels))}}} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(log, path):
+    """Écrit l'export Prometheus dans un fichier (compatible textfile collector)"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + ".tmp")
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text(log.read()))
+    temp_path.replace(path)
+
+
+def serve_metrics(log, port, host="127.0.0.1"):
+    """Serveur HTTP qui recalcule l'export Prometheus à chaque requête sur /metrics"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = prometheus_text(log.read()).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return ThreadingHTTPServer((host, port), Handler)
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Tests de la ligne de commande: options globales et options des sous-commandes
+
+    python -m pytest test_cli.py
+"""
+
+import unittest
+
+import cli
+
+
+class SharedOptionsTest(unittest.TestCase):
+    """--yes, --budget et --no-cache donnent le même résultat avant ou après la sous-commande"""
+
+    def parse(self, *argv):
+        return cli.build_parser().parse_args(list(argv))
+
+    def test_before_subcommand(self):
+        for command in (["batch", "m.jsonl"], ["sweep", "s.json"], ["watch"]):
+            args = self.parse("--budget", "5", "--yes", "--no-cache", *command)
+            self.assertEqual(args.budget, 5.0, command)
+            self.assertTrue(args.yes, command)
+            self.assertTrue(args.no_cache, command)
+
+    def test_after_subcommand(self):
+        for command in (["batch", "m.jsonl"], ["sweep", "s.json"], ["watch"]):
+            args = self.parse(*command, "--budget", "5", "-y", "--no-cache")
+            self.assertEqual(args.budget, 5.0, command)
+            self.assertTrue(args.yes, command)
+            self.assertTrue(args.no_cache, command)
+
+    def test_webhook_port(self):
+        for command in (["batch", "m.jsonl"], ["sweep", "s.json"], ["resume"], ["watch"]):
+            self.assertEqual(self.parse("--webhook-port", "8080", *command).webhook_port, 8080, command)
+            self.assertEqual(self.parse(*command, "--webhook-port", "8080").webhook_port, 8080, command)
+
+    def test_dashboard(self):
+        for command in (["batch", "m.jsonl"], ["sweep", "s.json"], ["resume"], ["watch"]):
+            self.assertTrue(self.parse("--dashboard", *command).dashboard, command)
+            self.assertTrue(self.parse(*command, "--dashboard").dashboard, command)
+
+    def test_defaults(self):
+        args = self.parse("batch", "m.jsonl")
+        self.assertEqual(args.budget, cli.BUDGET)
+        self.assertFalse(args.yes)
+        self.assertFalse(args.no_cache)
+        self.assertEqual(args.webhook_port, cli.WEBHOOK_PORT)
+        self.assertEqual(args.dashboard, cli.DASHBOARD)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Dossier surveillé: les fichiers de prompt déposés deviennent des jobs
+
+Un prompt (.md ou .txt) peut être accompagné d'une image de référence du même
+nom (chat.md + chat.png). Un fichier n'est pris en compte qu'une fois stable
+(taille et date inchangées depuis SETTLE_SECONDS), pour ne pas lire une copie
+en cours. Les fichiers pris en charge passent dans processing/, puis dans done/
+ou failed/ (avec un fichier .error.txt qui donne la raison de l'échec).
+
+Les changements sont détectés par inotify sous Linux; le répertoire est de toute
+façon relu toutes les POLL_INTERVAL secondes (partages réseau, où inotify ne
+voit pas les écritures des autres machines, ou systèmes sans inotify).
+"""
+
+import os
+import select
+import shutil
+import time
+from pathlib import Path
+
+WATCH_DIR = Path("watch")
+POLL_INTERVAL = 5.0  # secondes entre deux relectures du répertoire
+SETTLE_SECONDS = 2.0  # un fichier inchangé depuis ce délai est considéré comme complet
+
+PROMPT_EXTENSIONS = (".md", ".txt")
+# Fichiers en cours de copie laissés de côté
+PARTIAL_SUFFIXES = (".tmp", ".part", ".crdownload")
+
+# Événements inotify (sys/inotify.h): fichier fermé après écriture, déplacé ou créé dans le répertoire
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+
+
+class DirectoryWatcher:
+    """
+    Attend qu'un répertoire change: inotify si disponible, sinon simple attente
+
+    wait(timeout) rend la main dès qu'un fichier y est écrit ou déplacé (inotify)
+    ou au plus tard après timeout secondes; l'appelant relit alors le répertoire.
+    backend vaut "inotify" ou "polling".
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self._fd = None
+        self.backend = "polling"
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                return
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            if libc.inotify_add_watch(fd, str(self.directory).encode(), mask) < 0:
+                os.close(fd)
+                return
+            self._fd = fd
+            self.backend = "inotify"
+        except (ImportError, OSError, AttributeError):
+            # Pas de libc ou pas d'inotify (macOS, Windows): polling seul
+            pass
+
+    def wait(self, timeout):
+        """Attend un changement ou la fin du délai; retourne True si un changement a été signalé"""
+        if self._fd is None:
+            time.sleep(timeout)
+            return False
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return False
+        # Vider les événements en attente: seul le réveil compte, le répertoire est relu
+        try:
+            while os.read(self._fd, 64 * 1024):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def unique_path(path):
+    """path, ou path avec un suffixe horodaté s'il existe déjà"""
+    path = Path(path)
+    if not path.exists():
+        return path
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    candidate = path.with_name(f"{path.stem}-{stamp}{path.suffix}")
+    counter = 1
+    while candidate.exists():
+        candidate = path.with_name(f"{path.stem}-{stamp}-{counter}{path.suffix}")
+        counter += 1
+    return candidate
+
+
+class HotFolder:
+    """
+    Prompts et images de référence déposés dans un répertoire
+
+    ready() liste les paires (prompt, image ou None) complètes; claim() les
+    retire du dépôt (le prompt dans processing/, l'image sous reference_dir, où
+    les images de référence doivent se trouver); finish() les range dans done/
+    ou failed/.
+    """
+
+    def __init__(self, directory=WATCH_DIR, reference_dir=Path("input_reference") / "watch",
+                 image_extensions=(".png", ".jpg", ".jpeg", ".webp"), settle=SETTLE_SECONDS):
+        self.directory = Path(directory)
+        self.processing_dir = self.directory / "processing"
+        self.done_dir = self.directory / "done"
+        self.failed_dir = self.directory / "failed"
+        self.reference_dir = Path(reference_dir)
+        self.image_extensions = tuple(image_extensions)
+        self.settle = settle
+        for folder in (self.directory, self.processing_dir, self.done_dir, self.failed_dir,
+                       self.reference_dir):
+            folder.mkdir(parents=True, exist_ok=True)
+        # Chemin -> (signature taille/date, instant où elle a été vue pour la première fois)
+        self._observed = {}
+        self._waiting = False
+
+    def interrupted(self):
+        """Prompts restés dans processing/ après une exécution interrompue"""
+        return sorted(path for path in self.processing_dir.iterdir() if path.is_file())
+
+    @property
+    def settling(self):
+        """True si des fichiers déposés attendaient d'être stables au dernier ready()"""
+        return self._waiting
+
+    def _is_stable(self, path, stat, now):
+        signature = (stat.st_size, stat.st_mtime_ns)
+        previous = self._observed.get(path)
+        if previous is None or previous[0] != signature:
+            self._observed[path] = (signature, now)
+            return False
+        return now - previous[1] >= self.settle
+
+    def ready(self):
+        """Paires (prompt, image ou None) dont les fichiers sont complets, dans l'ordre de dépôt"""
+        now = time.monotonic()
+        files = {}
+        for path in self.directory.iterdir():
+            if path.name.startswith(".") or path.suffix.lower() in PARTIAL_SUFFIXES:
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                files[path] = stat
+
+        # Oublier les fichiers disparus (pris en charge ou retirés)
+        for path in list(self._observed):
+            if path not in files:
+                del self._observed[path]
+
+        stable = {path for path, stat in files.items() if self._is_stable(path, stat, now)}
+        self._waiting = len(stable) < len(files)
+        images = {path.stem: path for path in files if path.suffix.lower() in self.image_extensions}
+
+        pairs = []
+        for path in sorted(files, key=lambda path: files[path].st_mtime_ns):
+            if path.suffix.lower() not in PROMPT_EXTENSIONS:
+                continue
+            image = images.get(path.stem)
+            if path in stable and (image is None or image in stable):
+                pairs.append((path, image))
+        return pairs
+
+    def claim(self, prompt_path, image_path=None):
+        """Retire une paire du dépôt; retourne le dict des chemins pris en charge"""
+        claimed = {"name": prompt_path.name,
+                   "prompt": unique_path(self.processing_dir / prompt_path.name), "image": None}
+        prompt_path.rename(claimed["prompt"])
+        self._observed.pop(prompt_path, None)
+        if image_path is not None:
+            claimed["image"] = unique_path(self.reference_dir / image_path.name)
+            shutil.move(str(image_path), claimed["image"])
+            self._observed.pop(image_path, None)
+        return claimed
+
+    def finish(self, claimed, ok, error=None):
+        """Range une paire traitée dans done/ ou failed/; retourne le chemin du prompt rangé"""
+        target_dir = self.done_dir if ok else self.failed_dir
+        prompt_path = unique_path(target_dir / claimed["prompt"].name)
+        shutil.move(str(claimed["prompt"]), prompt_path)
+        if claimed["image"] is not None and claimed["image"].exists():
+            shutil.move(str(claimed["image"]), unique_path(target_dir / claimed["image"].name))
+        if not ok:
+            with open(prompt_path.with_name(prompt_path.name + ".error.txt"), "w", encoding="utf-8") as f:
+                f.write(f"{error or 'échec'}\n")
+        return prompt_path
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Réception des webhooks de fin de génération (video.completed / video.failed)
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+
+# Événements qui signalent la fin d'une génération
+VIDEO_EVENTS = {"video.completed", "video.failed"}
+
+# Écart maximum accepté entre l'horodatage signé et l'heure locale (secondes)
+SIGNATURE_TOLERANCE = 300
+
+
+def _secret_key(secret):
+    """Clé HMAC d'un secret au format whsec_<base64> (ou brut)"""
+    if secret.startswith("whsec_"):
+        return base64.b64decode(secret[len("whsec_"):])
+    return secret.encode("utf-8")
+
+
+def sign_payload(secret, webhook_id, timestamp, body):
+    """Signature "v1,<base64>" d'un corps (format Standard Webhooks utilisé par OpenAI)"""
+    signed = f"{webhook_id}.{timestamp}.".encode("utf-8") + body
+    digest = hmac.new(_secret_key(secret), signed, hashlib.sha256).digest()
+    return "v1," + base64.b64encode(digest).decode("ascii")
+
+
+def verify_signature(secret, headers, body, tolerance=SIGNATURE_TOLERANCE):
+    """Vérifie les en-têtes webhook-id / webhook-timestamp / webhook-signature"""
+    webhook_id = headers.get("webhook-id")
+    timestamp = headers.get("webhook-timestamp")
+    signatures = headers.get("webhook-signature", "")
+    if not webhook_id or not timestamp or not signatures:
+        return False
+    try:
+        if abs(time.time() - int(timestamp)) > tolerance:
+            return False
+    except ValueError:
+        return False
+    expected = sign_payload(secret, webhook_id, timestamp, body)
+    return any(hmac.compare_digest(expected, candidate) for candidate in signatures.split())
+
+
+class WebhookListener:
+    """
+    Serveur HTTP local qui reçoit les événements de fin de génération
+
+    on_event(video_id, event_type) est appelé pour chaque événement vidéo valide;
+    le traitement doit être rapide (la réponse 200 est envoyée après). Avec un
+    secret, les requêtes dont la signature est invalide sont refusées (401).
+    """
+
+    def __init__(self, on_event, host="0.0.0.0", port=8080, secret=None, path="/webhook"):
+        self.on_event = on_event
+        self.secret = secret
+        self.path = path
+        self._lock = threading.Lock()
+        self.stats = {"received": 0, "rejected": 0, "ignored": 0}
+        from http.server import ThreadingHTTPServer
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="webhooks", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def handle(self, headers, body):
+        """Traite un corps de webhook; retourne le code HTTP à renvoyer"""
+        if self.secret and not verify_signature(self.secret, headers, body):
+            self._count("rejected")
+            return 401
+        try:
+            event = json.loads(body)
+            event_type = event["type"]
+            video_id = (event.get("data") or {}).get("id")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._count("rejected")
+            return 400
+        if event_type not in VIDEO_EVENTS or not video_id:
+            self._count("ignored")
+            return 200
+        self._count("received")
+        self.on_event(video_id, event_type)
+        return 200
+
+    def _make_handler(self):
+        from http.server import BaseHTTPRequestHandler
+        listener = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if self.path.split("?", 1)[0] != listener.path:
+                    status = 404
+                else:
+                    status = listener.handle(self.headers, body)
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+        return Handler